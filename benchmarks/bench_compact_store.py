@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per sample and validation cost of the compact ConversationStore
+compared with pydantic AugmentedConversation objects and final dataset dicts.
+
+Usage: python benchmarks/bench_compact_store.py [num_samples]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.augmentation import AugmentedConversation
+from src.models.compact import ConversationStore
+from src.models.conversation import Conversation, ConversationTurn
+
+DOMAINS = ["travel", "banking", "food", "utility", "work", "auto", "home", "meta"]
+AUGMENTATION_TYPES = ["original", "paraphrase", "noise", "irrelevant"]
+WORDS = "please help me with my request about the account flight order today".split()
+
+
+def make_records(num_samples: int):
+    rng = random.Random(0)
+    records = []
+    for i in range(num_samples):
+        domain = DOMAINS[i % len(DOMAINS)]
+        action = f"{domain}_action_{i % 20}"
+        records.append(
+            {
+                "conversation": [
+                    {
+                        "role": "user" if t % 2 == 0 else "assistant",
+                        "content": " ".join(rng.choices(WORDS, k=rng.randint(8, 30))),
+                    }
+                    for t in range(rng.randint(2, 5))
+                ],
+                "domain": domain,
+                "action": action,
+                "description": f"Assist users with {action.replace('_', ' ')}.",
+                "label_score": 0.95,
+                "augmentation_type": AUGMENTATION_TYPES[i % len(AUGMENTATION_TYPES)],
+            }
+        )
+    return records
+
+
+def build_pydantic(lines):
+    records = (json.loads(line) for line in lines)
+    return [
+        AugmentedConversation(
+            conversation=Conversation(
+                turns=[ConversationTurn(**turn) for turn in r["conversation"]],
+                domain=r["domain"],
+                action=r["action"],
+                description=r["description"],
+            ),
+            augmentation_type=r["augmentation_type"],
+            label_score=r["label_score"],
+        )
+        for r in records
+    ]
+
+
+def build_dicts(lines):
+    # Parsed samples plus the copies made by ArchRouterPipeline._format_final_dataset
+    records = (json.loads(line) for line in lines)
+    return [
+        {
+            "conversation": [
+                {"role": t["role"], "content": t["content"]} for t in r["conversation"]
+            ],
+            "domain": r["domain"],
+            "action": r["action"],
+            "description": r["description"],
+            "label_score": r["label_score"],
+            "augmentation_type": r["augmentation_type"],
+        }
+        for r in records
+    ]
+
+
+def build_store(lines):
+    store = ConversationStore()
+    store.extend_records((json.loads(line) for line in lines), validate=True)
+    return store
+
+
+def measure(builder, lines):
+    """Return (bytes allocated and retained, seconds) for building a representation."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(lines)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, elapsed
+
+
+def main():
+    num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Every representation is built from serialized lines so that each one
+    # owns its strings, as when loading a dataset from disk
+    lines = [json.dumps(record) for record in make_records(num_samples)]
+    print(f"Samples: {num_samples}")
+    print(f"{'representation':<28}{'bytes/sample':>14}{'build s':>10}")
+
+    for name, builder in [
+        ("pydantic AugmentedConversation", build_pydantic),
+        ("final dataset dicts", build_dicts),
+        ("ConversationStore", build_store),
+    ]:
+        current, elapsed = measure(builder, lines)
+        print(f"{name:<28}{current / num_samples:>14.1f}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
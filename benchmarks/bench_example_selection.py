@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: first-k vs diverse example selection for LLM-1 prompts.
+
+Selects k examples per intent from every intent of the CLINC150 data file,
+either in file order or with the diverse selector, and builds the LLM-1
+policy prompt from them. Reports the estimated prompt tokens, the n-gram
+coverage of the intent's examples (mean similarity of every example to its
+closest selected one, on finer features than the selector uses), the share
+of the intent's token occurrences whose word appears in a selected example,
+and the selection time over all intents.
+
+Usage: python benchmarks/bench_example_selection.py [--data-file data/clinc150_uci/data_full.json]
+       [--k 3 5 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.phase1.data_processor import load_intent_index
+from src.prompts.llm1_policy_generator import get_policy_generation_prompt
+from src.utils.example_selector import coverage, hashed_ngram_vectors, select_diverse
+from src.utils.spend_budget import estimate_tokens
+
+MEASURE_BITS = 12
+
+
+def word_coverage(examples, selected) -> float:
+    """Share of the word occurrences in examples whose word appears in a selected example."""
+    seen = {word for i in selected for word in examples[i].lower().split()}
+    words = [word for example in examples for word in example.lower().split()]
+    return sum(word in seen for word in words) / len(words)
+
+
+def evaluate(names, groups, selections) -> dict:
+    tokens = ngram = words = 0.0
+    for name, examples, selected in zip(names, groups, selections):
+        prompt = get_policy_generation_prompt(name, [examples[i] for i in selected])
+        tokens += estimate_tokens(prompt)
+        ngram += coverage(hashed_ngram_vectors(examples, bits=MEASURE_BITS), selected)
+        words += word_coverage(examples, selected)
+    count = len(groups)
+    return {"tokens": tokens / count, "ngram": ngram / count, "words": words / count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Example selection benchmark")
+    parser.add_argument("--data-file", default="data/clinc150_uci/data_full.json")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 10])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    index = load_intent_index(args.data_file)
+    names = [name for name in sorted(index) if name != "oos"]
+    groups = [index[name] for name in names]
+    print(f"{len(groups)} intents, {sum(map(len, groups))} examples")
+    print(
+        f"{'selection':<12}{'k':>4}{'prompt tokens':>15}{'ngram cover':>13}"
+        f"{'word cover':>12}{'select ms':>11}"
+    )
+    for k in args.k:
+        for method in ("first", "diverse"):
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                if method == "first":
+                    selections = [list(range(min(k, len(group)))) for group in groups]
+                else:
+                    selections = select_diverse(groups, k)
+                timings.append(time.perf_counter() - start)
+            result = evaluate(names, groups, selections)
+            print(
+                f"{method:<12}{k:>4}{result['tokens']:>15.1f}{result['ngram']:>13.3f}"
+                f"{result['words']:>12.1%}{min(timings) * 1000:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
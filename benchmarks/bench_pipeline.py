@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end pipeline throughput against the local mock LLM server.
+
+Runs ArchRouterPipeline.run_pipeline at several dataset sizes and
+concurrency levels and records samples/sec, LLM calls per sample, peak RSS
+and LLM latency percentiles. Each scenario runs in its own process so that
+peak RSS is per scenario. Results are compared with a stored baseline and
+the exit code is 1 if any metric regressed by more than the tolerance.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 40 120] [--concurrency 1 8]
+       [--rate-limit-rate 0.02] [--malformed-rate 0.05] [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_llm_server import MockLLMServer, MockSettings
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_pipeline.json")
+
+# Metric -> True if higher is better
+METRICS = {
+    "samples_per_second": True,
+    "calls_per_sample": False,
+    "peak_rss_mb": False,
+    "latency_p95_seconds": False,
+}
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(url: str, size: int, concurrency: int, results) -> None:
+    """Run one pipeline against the mock server (in a child process)."""
+    from src.config import Config
+    from src.pipeline import ArchRouterPipeline
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = Config(
+            target_dataset_size=size,
+            max_concurrency=concurrency,
+            api_base_url=url,
+            output_file=os.path.join(temp_dir, "dataset.jsonl"),
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline = ArchRouterPipeline(config, api_key="mock")
+            start = time.perf_counter()
+            with pipeline.open_writer() as writer:
+                dataset = pipeline.run_pipeline(writer=writer)
+            elapsed = time.perf_counter() - start
+
+    report = pipeline.metrics.report()
+    calls = pipeline.llm_client.get_stats()["calls"]
+    retries = sum(stage["retries"] for stage in report["llm_stages"].values())
+    parse_failures = sum(stage["parse"]["failed"] for stage in report["llm_stages"].values())
+    latency = report["llm_latency_seconds"]
+    results.put(
+        {
+            "samples": len(dataset),
+            "seconds": round(elapsed, 3),
+            "samples_per_second": round(len(dataset) / elapsed, 2) if elapsed else 0.0,
+            "llm_calls": calls,
+            "calls_per_sample": round(calls / len(dataset), 3) if dataset else 0.0,
+            "retries": retries,
+            "parse_failures": parse_failures,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "latency_p50_seconds": latency["p50"],
+            "latency_p95_seconds": latency["p95"],
+            "latency_p99_seconds": latency["p99"],
+        }
+    )
+
+
+def run_in_process(url: str, size: int, concurrency: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_scenario, args=(url, size, concurrency, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return (scenario, metric, baseline, current) for every regression."""
+    regressions = []
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((scenario, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[40, 120])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=5000.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--output", default="", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+    )
+    results = {}
+    print(
+        f"{'scenario':<22}{'samples':>8}{'samples/s':>11}{'calls/sample':>14}"
+        f"{'retries':>9}{'parse fail':>12}{'RSS MB':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+    )
+    with MockLLMServer(settings) as server:
+        for size in args.sizes:
+            for concurrency in args.concurrency:
+                scenario = f"size={size},concurrency={concurrency}"
+                result = run_in_process(server.url, size, concurrency)
+                results[scenario] = result
+                print(
+                    f"{scenario:<22}{result['samples']:>8}{result['samples_per_second']:>11.2f}"
+                    f"{result['calls_per_sample']:>14.3f}{result['retries']:>9}"
+                    f"{result['parse_failures']:>12}{result['peak_rss_mb']:>9.1f}"
+                    f"{result['latency_p50_seconds']:>8.3f}{result['latency_p95_seconds']:>8.3f}"
+                    f"{result['latency_p99_seconds']:>8.3f}"
+                )
+        print(f"Mock server requests: {server.stats}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for scenario, metric, old, new in regressions:
+        print(f"REGRESSION {scenario} {metric}: {old} -> {new}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FIFO vs token-aware request scheduling under a tokens-per-minute limit.
+
+Items go through the pipeline's LLM path (policy, conversation, evaluation,
+then one or two augmentations) on a pool of worker threads, so requests of
+every stage are pending at once. Requests are sent through LLMClient to a
+simulated backend whose latency grows with the completion length, and the
+scheduler paces them to a token limit over a shortened window. Reports
+token quota utilization, mean scheduler wait, mean item completion time
+(from an item's first request to its last response) and total time per
+policy.
+
+Usage: python benchmarks/bench_scheduler.py [--items 120] [--workers 120]
+       [--tokens-per-window 40000] [--window-seconds 1.0]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+from src.utils.request_scheduler import RequestScheduler
+
+# (stage, prompt characters, max_tokens range) of each step of an item
+ITEM_STEPS = [
+    ("policy", 1200, (200, 200)),
+    ("conversation", 1600, (300, 900)),
+    ("evaluation", 2400, (300, 300)),
+]
+AUGMENTATIONS = [("paraphrase", 2000, (400, 1000)), ("noise", 1800, (400, 1000))]
+
+
+class SimulatedBackend(LLMBackend):
+    """Answers after a fixed overhead plus a per-token generation time."""
+
+    def __init__(self, overhead: float, tokens_per_second: float, seed: int):
+        self.overhead = overhead
+        self.tokens_per_second = tokens_per_second
+        self.seed = seed
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        prompt = messages[-1]["content"]
+        rng = random.Random(f"{self.seed}:{prompt}")
+        completion = int(max_tokens * rng.uniform(0.4, 0.8))
+        time.sleep(self.overhead + completion / self.tokens_per_second)
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=completion,
+            total_tokens=len(prompt) // 4 + completion,
+        )
+        choice = SimpleNamespace(message=SimpleNamespace(content="{}"), finish_reason="stop")
+        return SimpleNamespace(choices=[choice], usage=usage, model=model)
+
+
+def item_requests(index: int, seed: int):
+    """The (stage, prompt, max_tokens) requests of one item, in order."""
+    rng = random.Random(seed * 100003 + index)
+    steps = list(ITEM_STEPS) + rng.sample(AUGMENTATIONS, rng.randint(1, 2))
+    requests = []
+    for step, (stage, chars, (low, high)) in enumerate(steps):
+        prompt = f"item {index} step {step} " + "x" * chars
+        requests.append((stage, prompt, rng.randint(low, high)))
+    return requests
+
+
+def run_policy(policy: str, args) -> dict:
+    scheduler = RequestScheduler(
+        policy=policy,
+        tokens_per_minute=args.tokens_per_window,
+        window_seconds=args.window_seconds,
+        max_wait_seconds=args.max_wait_seconds,
+    )
+    client = LLMClient(
+        api_key="unused",
+        backend=SimulatedBackend(args.overhead, args.tokens_per_second, args.seed),
+        scheduler=scheduler,
+        coalesce=False,
+    )
+    start = time.perf_counter()
+
+    def run_item(index: int) -> float:
+        item_start = time.perf_counter()
+        for stage, prompt, max_tokens in item_requests(index, args.seed):
+            client.chat(stage, "simulated", prompt, 0.7, max_tokens)
+        return time.perf_counter() - item_start
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        completion_times = list(executor.map(run_item, range(args.items)))
+    elapsed = time.perf_counter() - start
+
+    stats = scheduler.get_stats()
+    return {
+        "policy": policy,
+        "utilization": stats["utilization"],
+        "mean_wait_seconds": stats["mean_wait_seconds"],
+        "mean_item_seconds": sum(completion_times) / len(completion_times),
+        "total_seconds": elapsed,
+        "tokens": stats["tokens"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request scheduling benchmark")
+    parser.add_argument("--items", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=120, help="Items in progress at once")
+    parser.add_argument("--tokens-per-window", type=int, default=40000)
+    parser.add_argument("--window-seconds", type=float, default=1.0)
+    parser.add_argument("--max-wait-seconds", type=float, default=5.0)
+    parser.add_argument("--overhead", type=float, default=0.02)
+    parser.add_argument("--tokens-per-second", type=float, default=20000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{args.items} items, {args.workers} workers, {args.tokens_per_window} tokens "
+        f"per {args.window_seconds:g}s window"
+    )
+    print(f"{'policy':<8}{'utilization':>13}{'mean wait s':>13}{'mean item s':>13}{'total s':>10}")
+    results = []
+    for policy in ("fifo", "token"):
+        result = run_policy(policy, args)
+        results.append(result)
+        print(
+            f"{policy:<8}{result['utilization']:>13.1%}{result['mean_wait_seconds']:>13.3f}"
+            f"{result['mean_item_seconds']:>13.2f}{result['total_seconds']:>10.2f}"
+        )
+    fifo, token = results
+    print(
+        f"token vs fifo: mean item completion {token['mean_item_seconds'] / fifo['mean_item_seconds'] - 1:+.1%}, "
+        f"total time {token['total_seconds'] / fifo['total_seconds'] - 1:+.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI/Groq-compatible chat completion server for benchmarks.
+
+Answers the pipeline's LLM-1, LLM-2, LLM-3 and augmentation prompts with
+well-formed JSON of the requested size, after a lognormal latency plus a
+per-token generation delay. Rate limiting (429) and malformed JSON can be
+injected at configurable rates.
+
+Usage: python benchmarks/mock_llm_server.py [--port 8099] [--latency-ms 50] ...
+Then point the pipeline at it with Config.api_base_url = "http://127.0.0.1:8099".
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+WORDS = (
+    "please help me with my request about the account flight order today "
+    "could you check when where price booking card transfer schedule"
+).split()
+AUGMENTATION_TURNS = 4
+
+
+class MockSettings:
+    """Behaviour of the mock server."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 2000.0,
+        acceptance_rate: float = 0.9,
+        rate_limit_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        malformed_kinds: Tuple[str, ...] = ("augmentation",),
+        seed: int = 0,
+    ):
+        # Median of the lognormal time to first token
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        # Generation speed; 0 disables the per-token delay
+        self.tokens_per_second = tokens_per_second
+        # Share of LLM-3 answers scoring above the default threshold
+        self.acceptance_rate = acceptance_rate
+        self.rate_limit_rate = rate_limit_rate
+        # Malformed JSON is only injected into these prompt kinds
+        self.malformed_rate = malformed_rate
+        self.malformed_kinds = malformed_kinds
+        self.seed = seed
+
+
+def classify(prompt: str) -> str:
+    """Prompt kind: policy, conversation, conversations, evaluation or augmentation."""
+    if "Intent Name:" in prompt:
+        return "policy"
+    if "Rate the alignment" in prompt:
+        return "evaluation"
+    if "Turn counts:" in prompt:
+        return "conversations"
+    if "Number of turns:" in prompt:
+        return "conversation"
+    return "augmentation"
+
+
+def _turns(rng: random.Random, count: int):
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": " ".join(rng.choices(WORDS, k=rng.randint(8, 24))),
+        }
+        for i in range(count)
+    ]
+
+
+def answer(prompt: str, rng: random.Random, settings: MockSettings) -> str:
+    """Content of a well-formed answer to a pipeline prompt."""
+    kind = classify(prompt)
+    if kind == "policy":
+        name = re.search(r"Intent Name: (\S+)", prompt).group(1)
+        return json.dumps(
+            {
+                "domain": name.split("_")[0],
+                "action": name,
+                "description": f"Assist users who want to {name.replace('_', ' ')}.",
+            }
+        )
+    if kind == "evaluation":
+        accepted = rng.random() < settings.acceptance_rate
+        score = 0.95 if accepted else 0.4
+        return json.dumps({"score": score, "reasoning": "mock", "is_aligned": accepted})
+    if kind == "conversations":
+        counts = json.loads(re.search(r"Turn counts: (\[[^\]]*\])", prompt).group(1))
+        return json.dumps([_turns(rng, count) for count in counts])
+    if kind == "conversation":
+        count = int(re.search(r"Number of turns: (\d+)", prompt).group(1))
+        return json.dumps(_turns(rng, count))
+    return json.dumps(_turns(rng, AUGMENTATION_TURNS))
+
+
+class MockLLMServer:
+    """Threaded HTTP server answering /chat/completions requests.
+
+    Use as a context manager or call start() and stop(); url is the base URL
+    to configure as Config.api_base_url. Request counts per prompt kind and
+    the numbers of injected faults are kept in stats.
+    """
+
+    def __init__(self, settings: Optional[MockSettings] = None, port: int = 0):
+        self.settings = settings or MockSettings()
+        self._rng = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def _request_rng(self) -> random.Random:
+        # One generator per request so concurrent handlers don't share state
+        with self._lock:
+            return random.Random(self._rng.getrandbits(64))
+
+    def _content_rng(self, prompt: str) -> random.Random:
+        # Answers depend only on the prompt, so runs are reproducible at any concurrency
+        digest = hashlib.sha256(f"{self.settings.seed}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def respond(self, body: Dict) -> Tuple[int, Dict]:
+        """Status and JSON body for a chat completion request (after sleeping)."""
+        settings = self.settings
+        rng = self._request_rng()
+        prompt = body["messages"][-1]["content"]
+        kind = classify(prompt)
+        self._count(kind)
+
+        delay = settings.latency_ms / 1000 * math.exp(rng.gauss(0, settings.latency_sigma))
+        if rng.random() < settings.rate_limit_rate:
+            self._count("rate_limited")
+            time.sleep(delay / 4)
+            error = {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}
+            return 429, {"error": error}
+
+        choices = []
+        completion_tokens = 0
+        content_rng = self._content_rng(prompt)
+        for index in range(body.get("n") or 1):
+            content = answer(prompt, content_rng, settings)
+            if kind in settings.malformed_kinds and rng.random() < settings.malformed_rate:
+                self._count("malformed")
+                content = content[: len(content) // 2]
+            completion_tokens += max(1, len(content) // CHARS_PER_TOKEN)
+            choices.append(
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            )
+        if settings.tokens_per_second > 0:
+            delay += completion_tokens / settings.tokens_per_second
+        time.sleep(delay)
+
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        return 200, {
+            "id": f"mock-{rng.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are sent separately; don't let delayed ACKs stall them
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                # Model list, used by endpoint health checks
+                if self.path.endswith("/models"):
+                    self._send(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    status, payload = 404, {"error": {"message": f"Unknown path {self.path}"}}
+                else:
+                    status, payload = server.respond(body)
+                self._send(status, payload)
+
+            def _send(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Groq-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--acceptance-rate", type=float, default=0.9)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        acceptance_rate=args.acceptance_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+    )
+    server = MockLLMServer(settings, port=args.port)
+    print(f"Mock LLM server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Requests: {server.stats}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
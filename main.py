@@ -1,22 +1,198 @@
+import argparse
+import json
 import os
 import sys
 from dotenv import load_dotenv
 from src.config import Config
-from src.pipeline import ArchRouterPipeline
+from src.pipeline import STAGES, ArchRouterPipeline, open_dataset_writer
+from src.utils.provenance_store import ProvenanceStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Arch-Router dataset generation pipeline"
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        default="",
+        help="Persist stage artifacts here and reuse stages whose inputs are unchanged",
+    )
+    parser.add_argument(
+        "--stage",
+        choices=STAGES,
+        help="Run only this stage against existing upstream artifacts",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate calls, tokens, time and cost without sending requests",
+    )
+    parser.add_argument(
+        "--plan-json",
+        default="run_plan.json",
+        help="Where --plan writes its JSON estimate ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--acceptance-rate",
+        type=float,
+        default=0.9,
+        help="Share of conversations assumed to pass LLM-3 in --plan",
+    )
+    parser.add_argument(
+        "--top-up",
+        action="store_true",
+        help="Grow the existing output to the target size, generating only missing samples",
+    )
+    parser.add_argument(
+        "--target-size",
+        type=int,
+        help="Override Config.target_dataset_size",
+    )
+    parser.add_argument(
+        "--provenance-db",
+        default="",
+        help="Record every scored conversation in this SQLite file",
+    )
+    parser.add_argument(
+        "--metrics-report",
+        default="",
+        help="Write a JSON run report with per-stage latency, tokens and throughput",
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        default="",
+        help="Write a Prometheus text-file snapshot of the run metrics",
+    )
+    parser.add_argument(
+        "--trace",
+        default="",
+        help="Write a Chrome trace-event timeline of stages and LLM calls (opens in Perfetto)",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="CASSETTE",
+        default="",
+        help="Record every LLM request and response to this .jsonl.gz cassette",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="CASSETTE",
+        default="",
+        help="Serve LLM responses from a recorded cassette instead of the API (no API key needed)",
+    )
+    parser.add_argument(
+        "--pack",
+        metavar="DIR",
+        default="",
+        help="After the run, pack the dataset into fixed-length training sequences in DIR",
+    )
+    parser.add_argument(
+        "--sweep",
+        nargs="+",
+        type=float,
+        metavar="THRESHOLD",
+        help="Print accepted conversations and samples per threshold from the provenance store",
+    )
+    parser.add_argument(
+        "--rebuild-threshold",
+        type=float,
+        help="Write the dataset for this threshold from the provenance store (no API calls)",
+    )
+    return parser.parse_args()
+
+
+def print_sweep(store: ProvenanceStore, thresholds):
+    """Print the yield curve of a provenance store."""
+    print(f"{'Threshold':>10} {'Accepted':>10} {'Rejected':>10} {'Rate':>8} {'Samples':>10}")
+    for row in store.yield_curve(thresholds):
+        print(
+            f"{row['threshold']:>10.2f} {row['accepted']:>10} {row['rejected']:>10} "
+            f"{row['acceptance_rate']:>8.1%} {row['samples']:>10}"
+        )
+
+
+def rebuild_dataset(store: ProvenanceStore, config: Config, threshold: float) -> int:
+    """Write the final dataset for a threshold from a provenance store."""
+    with open_dataset_writer(config) as writer:
+        writer.write_many(store.iter_dataset(threshold, limit=config.target_dataset_size))
+    print(f"Rebuilt {writer.total_records} samples at threshold {threshold} into {writer.output_file}")
+    return writer.total_records
 
 
 def main():
     """Main entry point for the Arch-Router dataset generation pipeline."""
+    args = parse_args()
     load_dotenv()
 
+    if args.plan:
+        from src.planner import build_plan, format_plan
+
+        config = Config()
+        if args.target_size:
+            config.target_dataset_size = args.target_size
+        plan = build_plan(config, acceptance_rate=args.acceptance_rate)
+        print(format_plan(plan))
+        plan_json = json.dumps(plan.model_dump(), indent=2)
+        if args.plan_json == "-":
+            print(plan_json)
+        else:
+            with open(args.plan_json, "w") as f:
+                f.write(plan_json)
+            print(f"Plan written to {args.plan_json}")
+        return
+
+    if args.sweep or args.rebuild_threshold is not None:
+        config = Config()
+        provenance_db = args.provenance_db or config.provenance_db
+        if not provenance_db or not os.path.exists(provenance_db):
+            print("Error: --sweep and --rebuild-threshold need an existing --provenance-db")
+            sys.exit(1)
+        store = ProvenanceStore(provenance_db)
+        if args.sweep:
+            print_sweep(store, args.sweep)
+        if args.rebuild_threshold is not None:
+            rebuild_dataset(store, config, args.rebuild_threshold)
+        return
+
     api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
+    if not api_key and not args.replay and not Config().endpoints:
         print("Error: Please set GROQ_API_KEY in your .env file")
         sys.exit(1)
 
+    pipeline = None
     try:
         config = Config()
-        pipeline = ArchRouterPipeline(config, api_key)
+        if args.target_size:
+            config.target_dataset_size = args.target_size
+        if args.provenance_db:
+            config.provenance_db = args.provenance_db
+        if args.metrics_report:
+            config.metrics_report = args.metrics_report
+        if args.metrics_prometheus:
+            config.metrics_prometheus = args.metrics_prometheus
+        if args.trace:
+            config.trace_file = args.trace
+        if args.record:
+            config.llm_backend, config.cassette_file = "record", args.record
+        if args.replay:
+            config.llm_backend, config.cassette_file = "replay", args.replay
+        if args.pack:
+            config.pack_output_dir = args.pack
+        if args.artifact_dir:
+            config.artifact_dir = args.artifact_dir
+        elif args.stage and not config.artifact_dir:
+            config.artifact_dir = "artifacts"
+        pipeline = ArchRouterPipeline(config, api_key or "")
+
+        if args.stage:
+            output = pipeline.run_stage(args.stage)
+            print(f"Stage '{args.stage}' produced {len(output)} items")
+            return
+
+        if args.top_up:
+            appended = pipeline.top_up()
+            print(f"Top-up appended {appended} samples (target: {config.target_dataset_size})")
+            return
 
         print("=" * 50)
         print("Arch-Router Dataset Generation Pipeline")
@@ -29,17 +205,35 @@ def main():
         print(f"  Output File: {config.output_file}")
         print("=" * 50)
 
-        dataset = pipeline.run_pipeline()
-        pipeline.save_dataset(dataset)
+        with pipeline.open_writer() as writer:
+            dataset = pipeline.run_pipeline(writer=writer)
+        print(f"Dataset saved to {writer.output_file}")
+        if config.pack_output_dir:
+            from src.utils.packing import format_packing_report, pack_dataset
+
+            index = pack_dataset(
+                writer.output_file,
+                config.pack_output_dir,
+                config.pack_sequence_length,
+                config.pack_tokenizer,
+                config.pack_workers,
+            )
+            print(format_packing_report(index))
 
         print("=" * 50)
-        print("Pipeline completed successfully!")
+        if pipeline.partial:
+            print("Pipeline stopped early at its spend budget (partial dataset)")
+        else:
+            print("Pipeline completed successfully!")
         print(f"Generated {len(dataset)} samples")
         print("=" * 50)
 
     except Exception as e:
         print(f"Error: Pipeline failed - {e}")
         sys.exit(1)
+    finally:
+        if pipeline is not None:
+            pipeline.close()
 
 
 if __name__ == "__main__":
@@ -1,4 +1,6 @@
+from typing import Dict, List
 from pydantic import BaseModel
+from src.models.endpoint import EndpointConfig
 
 """
 Configuration for Arch Router Dataset Pipeline
@@ -12,14 +14,36 @@ To control the pipeline size:
 class Config(BaseModel):
     # Dataset parameters
     max_samples_per_intent: int = 10
+    # Which examples of an intent reach the LLM-1 prompt: "first" (file
+    # order) or "diverse" (least similar to each other; requires numpy)
+    example_selection: str = "first"
     max_conversation_turns: int = 5
     min_conversation_turns: int = 2
 
     # Final dataset size control
     target_dataset_size: int = 3  # testing with 3 intents
 
+    # Run seed for per-item random choices (turn counts, augmentation branches)
+    seed: int = 0
+
+    # Conversation sampling
+    conversations_per_policy: int = 1
+    conversations_per_request: int = 1  # K conversations generated per LLM-2 call
+    use_n_sampling: bool = False  # Use the API's n parameter (not supported by Groq)
+
     # LLM parameters
     model_name: str = "llama-3.1-8b-instant"
+    api_base_url: str = ""  # OpenAI/Groq-compatible endpoint ("" uses Groq)
+    # "live", "record" (live, saving requests to cassette_file) or "replay"
+    # (serve cassette_file offline)
+    llm_backend: str = "live"
+    cassette_file: str = ""
+    # Endpoint pool over several API keys and servers (empty uses the single
+    # GROQ_API_KEY / api_base_url endpoint), e.g.
+    # [EndpointConfig(name="groq-a", api_key_env="GROQ_API_KEY_A", requests_per_minute=30)]
+    endpoints: List[EndpointConfig] = []
+    # Model per LLM stage, e.g. {"evaluation": "llama-3.3-70b-versatile"}
+    stage_models: Dict[str, str] = {}
     policy_generation_temperature: float = 0.7
     conversation_temperature: float = 0.8
     evaluation_temperature: float = 0.3
@@ -30,13 +54,96 @@ class Config(BaseModel):
     alignment_evaluation_max_tokens: int = 300
     augmentation_max_tokens: int = 1000
 
+    # Adaptive per-call token budgets (the limits above act as ceilings)
+    adaptive_max_tokens: bool = True
+    tokens_per_turn_estimate: int = 90  # Prior until completions are observed
+    max_tokens_safety_margin: float = 1.5
+
+    # Request concurrency
+    max_concurrency: int = 1  # LLM calls in flight at once within each stage
+    coalesce_requests: bool = True  # Share one call between identical in-flight requests
+    # Order of pending requests: "fifo", or "token" (downstream stages, then
+    # smaller requests first, packed into the rate-limit window)
+    request_scheduling: str = "fifo"
+    enforce_rate_limits: bool = False  # Pace requests to the per-minute limits below
+
+    # Pricing, rate limits and throughput (used by the --plan estimate and, with
+    # enforce_rate_limits, by the request scheduler; 0 = no limit)
+    input_price_per_million_tokens: float = 0.05
+    output_price_per_million_tokens: float = 0.08
+    requests_per_minute: int = 30
+    tokens_per_minute: int = 6000
+    request_overhead_seconds: float = 0.3  # Network and queueing time per call
+    output_tokens_per_second: float = 750.0
+
+    # Spend budgets (0 = unlimited). stage_budgets maps an LLM stage such as
+    # "conversation" or "paraphrase" to limits, e.g. {"tokens": 200000, "cost": 0.5}
+    max_run_requests: int = 0
+    max_run_tokens: int = 0
+    max_run_cost: float = 0.0
+    stage_budgets: Dict[str, Dict[str, float]] = {}
+    budget_wind_down_at: float = 0.8  # Share of the run budget where augmentation winds down
+
+    # LLM-3 transcript compaction (0 disables the limit)
+    evaluation_max_turns: int = 8
+    evaluation_max_turn_chars: int = 500
+
     # Alignment scoring
     alignment_threshold: float = 0.9
     max_regeneration_attempts: int = 3
+    # Per-item paths (queue workers, top-up): start a conversation's augmentation
+    # while LLM-3 scores it and discard it if rejected. Pauses while the
+    # acceptance rate of recent conversations is below speculation_break_even.
+    # Has no effect on run_pipeline, whose scores and augmentations are
+    # separate stages; it prints a notice when this is set
+    speculative_augmentation: bool = False
+    speculation_break_even: float = 0.5
+    speculation_min_observations: int = 20
 
     # Augmentation parameters (branching approach)
     use_domain_mixing: bool = False  # Optional domain mixing for negative samples
+    paraphrase_probability: float = 0.35
+    noise_probability: float = 0.225
+    irrelevant_probability: float = 0.125
+    domain_mix_probability: float = 0.05  # Only used with use_domain_mixing
+    # Partner of a domain-mixed conversation: "random" (any other domain) or
+    # "similar" (one of the domain_mix_candidates most similar conversations
+    # from other domains; requires numpy)
+    domain_mix_partners: str = "random"
+    domain_mix_candidates: int = 5
+
+    # Stage artifacts ("" disables; otherwise unchanged stages are reused)
+    artifact_dir: str = ""
+
+    # Provenance store of all scored conversations ("" disables)
+    provenance_db: str = ""
+
+    # Run metrics: JSON report and Prometheus text-file snapshot ("" disables)
+    metrics_report: str = ""
+    metrics_prometheus: str = ""
+    # JSON statistics of the written samples, mergeable across runs and workers ("" disables)
+    stats_report: str = ""
+    # Chrome trace-event timeline of stages and LLM calls ("" disables tracing)
+    trace_file: str = ""
+
+    # Work queue (multi-worker mode)
+    queue_file: str = "arch_router_queue.db"
+    queue_lease_seconds: float = 120.0
+    queue_max_attempts: int = 3
+    queue_wal: bool = True  # Disable when the queue file is on network storage
 
     # Output parameters
     output_file: str = "arch_router_dataset.jsonl"
+    output_format: str = "jsonl"  # "jsonl", "parquet" or "arrow" (needs pyarrow)
+    output_row_group_size: int = 10000  # Rows per Parquet row group / Arrow batch
+    output_compression: str = "none"  # "none", "gzip" or "zstd"
+    output_shard_max_records: int = 0  # 0 disables rotation by record count
+    output_shard_max_bytes: int = 0  # 0 disables rotation by uncompressed size
+    output_fsync_every: int = 1000  # Records written between fsyncs
+    # Packed training export written after a run ("" disables): samples are
+    # tokenized and bin-packed into sequences of pack_sequence_length tokens
+    pack_output_dir: str = ""
+    pack_sequence_length: int = 2048
+    pack_tokenizer: str = "bytes"  # "bytes", "hf:<local path>", "tiktoken:<encoding>"
+    pack_workers: int = 0  # Processes packing partitions (0 = all cores)
     batch_size: int = 10
@@ -7,3 +7,9 @@ class AlignmentScore(BaseModel):
     score: float
     reasoning: str
     is_aligned: bool
+
+    # Provenance of the evaluation call
+    model: str = ""
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
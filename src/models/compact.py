@@ -0,0 +1,352 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from typing_extensions import TypedDict
+from pydantic import TypeAdapter
+from src.models.augmentation import AugmentedConversation
+from src.models.conversation import Conversation, ConversationTurn
+
+
+class DatasetTurn(TypedDict):
+    role: str
+    content: str
+
+
+class DatasetSample(TypedDict):
+    """Final dataset sample as written by ArchRouterPipeline."""
+
+    conversation: List[DatasetTurn]
+    domain: str
+    action: str
+    description: str
+    label_score: float
+    augmentation_type: str
+
+
+class StoredConversation(TypedDict):
+    turns: List[DatasetTurn]
+    domain: str
+    action: str
+    description: str
+
+
+class StoredAugmentation(TypedDict):
+    """AugmentedConversation as dumped into the pipeline's augmentations artifact."""
+
+    conversation: StoredConversation
+    augmentation_type: str
+    label_score: float
+
+
+_samples_adapter = TypeAdapter(List[DatasetSample])
+_augmented_adapter = TypeAdapter(List[StoredAugmentation])
+
+
+class TurnView:
+    """Read-only view of a single turn inside a ConversationStore."""
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "ConversationStore", index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def role(self) -> str:
+        return self._store._strings[self._store._turn_roles[self._index]]
+
+    @property
+    def content(self) -> str:
+        return self._store._turn_content(self._index)
+
+
+class ConversationView:
+    """Read-only view of a single sample inside a ConversationStore."""
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "ConversationStore", index: int):
+        self._store = store
+        self._index = index
+
+    def _string(self, column: array) -> str:
+        return self._store._strings[column[self._index]]
+
+    @property
+    def domain(self) -> str:
+        return self._string(self._store._domains)
+
+    @property
+    def action(self) -> str:
+        return self._string(self._store._actions)
+
+    @property
+    def description(self) -> str:
+        return self._string(self._store._descriptions)
+
+    @property
+    def augmentation_type(self) -> str:
+        return self._string(self._store._augmentation_types)
+
+    @property
+    def label_score(self) -> float:
+        return self._store._label_scores[self._index]
+
+    @property
+    def turns(self) -> List[TurnView]:
+        start, end = self._store._turn_range(self._index)
+        return [TurnView(self._store, i) for i in range(start, end)]
+
+    def __len__(self) -> int:
+        start, end = self._store._turn_range(self._index)
+        return end - start
+
+    def to_record(self) -> Dict:
+        return self._store.to_record(self._index)
+
+
+class ConversationStore:
+    """Compact columnar store for large numbers of dataset samples.
+
+    Repeated strings (roles, domains, actions, descriptions, augmentation
+    types) are interned into a single table and referenced by index. Turn
+    contents live in one contiguous UTF-8 buffer addressed by an offset
+    array, and per-sample fields are stored in typed arrays. Samples are
+    accessed through __slots__ views; pydantic models are only built at the
+    boundaries (to_augmented) and incoming records are validated in batches.
+    """
+
+    def __init__(self):
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+        self._text = bytearray()
+        self._text_offsets = array("Q", [0])
+        self._turn_roles = array("I")
+
+        self._turn_starts = array("Q", [0])
+        self._domains = array("I")
+        self._actions = array("I")
+        self._descriptions = array("I")
+        self._augmentation_types = array("I")
+        self._label_scores = array("d")
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _turn_range(self, index: int) -> Tuple[int, int]:
+        return self._turn_starts[index], self._turn_starts[index + 1]
+
+    def _turn_content(self, turn_index: int) -> str:
+        start = self._text_offsets[turn_index]
+        end = self._text_offsets[turn_index + 1]
+        return self._text[start:end].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._label_scores)
+
+    def __getitem__(self, index: int) -> ConversationView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ConversationStore index out of range")
+        return ConversationView(self, index)
+
+    def __iter__(self) -> Iterator[ConversationView]:
+        for index in range(len(self)):
+            yield ConversationView(self, index)
+
+    @property
+    def num_turns(self) -> int:
+        return len(self._turn_roles)
+
+    def append(
+        self,
+        turns: Iterable[Tuple[str, str]],
+        domain: str,
+        action: str,
+        description: str,
+        augmentation_type: str,
+        label_score: float,
+    ) -> int:
+        """Append a sample given as (role, content) pairs and return its index."""
+        for role, content in turns:
+            self._turn_roles.append(self._intern(role))
+            self._text += content.encode("utf-8")
+            self._text_offsets.append(len(self._text))
+        self._turn_starts.append(len(self._turn_roles))
+
+        self._domains.append(self._intern(domain))
+        self._actions.append(self._intern(action))
+        self._descriptions.append(self._intern(description))
+        self._augmentation_types.append(self._intern(augmentation_type))
+        self._label_scores.append(label_score)
+        return len(self) - 1
+
+    def append_record(self, record: Dict) -> int:
+        """Append an already validated final dataset record."""
+        return self.append(
+            ((turn["role"], turn["content"]) for turn in record["conversation"]),
+            record["domain"],
+            record["action"],
+            record["description"],
+            record["augmentation_type"],
+            record["label_score"],
+        )
+
+    def append_augmented(self, augmented: AugmentedConversation) -> int:
+        """Append a pydantic AugmentedConversation."""
+        conversation = augmented.conversation
+        return self.append(
+            ((turn.role, turn.content) for turn in conversation.turns),
+            conversation.domain,
+            conversation.action,
+            conversation.description,
+            augmented.augmentation_type,
+            augmented.label_score,
+        )
+
+    def extend_augmented(self, variants: Iterable[AugmentedConversation]):
+        """Append pydantic AugmentedConversations (e.g. as an augmentation callback)."""
+        for augmented in variants:
+            self.append_augmented(augmented)
+
+    def append_augmented_dict(self, data: Dict) -> int:
+        """Append an already validated AugmentedConversation dump."""
+        conversation = data["conversation"]
+        return self.append(
+            ((turn["role"], turn["content"]) for turn in conversation["turns"]),
+            conversation["domain"],
+            conversation["action"],
+            conversation["description"],
+            data["augmentation_type"],
+            data["label_score"],
+        )
+
+    def extend_records(
+        self, records: Iterable[Dict], validate: bool = True, batch_size: int = 10000
+    ):
+        """Append records, validating them in batches with a single TypeAdapter call."""
+        self._extend(records, _samples_adapter, self.append_record, validate, batch_size)
+
+    def extend_augmented_dicts(
+        self, items: Iterable[Dict], validate: bool = True, batch_size: int = 10000
+    ):
+        """Append AugmentedConversation dumps, validated in batches like extend_records."""
+        self._extend(items, _augmented_adapter, self.append_augmented_dict, validate, batch_size)
+
+    def _extend(self, items, adapter: TypeAdapter, append, validate: bool, batch_size: int):
+        batch: List[Dict] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self._extend_batch(batch, adapter, append, validate)
+                batch = []
+        if batch:
+            self._extend_batch(batch, adapter, append, validate)
+
+    def _extend_batch(self, batch: List[Dict], adapter: TypeAdapter, append, validate: bool):
+        if validate:
+            batch = adapter.validate_python(batch)
+        for item in batch:
+            append(item)
+
+    def truncate(self, size: int):
+        """Drop every sample from index size on."""
+        if size >= len(self):
+            return
+        turns = self._turn_starts[size]
+        del self._text[self._text_offsets[turns] :]
+        del self._text_offsets[turns + 1 :]
+        del self._turn_roles[turns:]
+        del self._turn_starts[size + 1 :]
+        for column in (
+            self._domains,
+            self._actions,
+            self._descriptions,
+            self._augmentation_types,
+            self._label_scores,
+        ):
+            del column[size:]
+
+    def to_record(self, index: int) -> Dict:
+        """Return a sample in the final dataset dict format."""
+        start, end = self._turn_range(index)
+        strings = self._strings
+        return {
+            "conversation": [
+                {"role": strings[self._turn_roles[i]], "content": self._turn_content(i)}
+                for i in range(start, end)
+            ],
+            "domain": strings[self._domains[index]],
+            "action": strings[self._actions[index]],
+            "description": strings[self._descriptions[index]],
+            "label_score": self._label_scores[index],
+            "augmentation_type": strings[self._augmentation_types[index]],
+        }
+
+    def iter_records(self, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Yield samples in the final dataset dict format."""
+        count = len(self) if limit is None else min(limit, len(self))
+        for index in range(count):
+            yield self.to_record(index)
+
+    def to_augmented_dict(self, index: int) -> Dict:
+        """Return a sample as an AugmentedConversation dump, without building the model."""
+        record = self.to_record(index)
+        return {
+            "conversation": {
+                "turns": record["conversation"],
+                "domain": record["domain"],
+                "action": record["action"],
+                "description": record["description"],
+            },
+            "augmentation_type": record["augmentation_type"],
+            "label_score": record["label_score"],
+        }
+
+    def to_augmented(self, index: int) -> AugmentedConversation:
+        """Rebuild the pydantic model for a sample (boundary conversion)."""
+        record = self.to_record(index)
+        conversation = Conversation(
+            turns=[ConversationTurn(**turn) for turn in record["conversation"]],
+            domain=record["domain"],
+            action=record["action"],
+            description=record["description"],
+        )
+        return AugmentedConversation(
+            conversation=conversation,
+            augmentation_type=record["augmentation_type"],
+            label_score=record["label_score"],
+        )
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store's buffers and string table."""
+        arrays = (
+            self._text_offsets,
+            self._turn_roles,
+            self._turn_starts,
+            self._domains,
+            self._actions,
+            self._descriptions,
+            self._augmentation_types,
+            self._label_scores,
+        )
+        return (
+            len(self._text)
+            + sum(column.itemsize * len(column) for column in arrays)
+            + sum(len(value) for value in self._strings)
+        )
+
+
+def load_store(output_file: str, validate: bool = True) -> ConversationStore:
+    """Load a JSONL dataset (single file or sharded) into a ConversationStore."""
+    from src.utils.dataset_writer import iter_dataset_records
+
+    store = ConversationStore()
+    store.extend_records(iter_dataset_records(output_file), validate=validate)
+    return store
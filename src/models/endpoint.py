@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Dict
+
+
+class EndpointConfig(BaseModel):
+    """One OpenAI/Groq-compatible endpoint of an endpoint pool."""
+
+    name: str
+    base_url: str = ""  # "" uses Groq
+    api_key: str = ""
+    api_key_env: str = "GROQ_API_KEY"  # Read when api_key is empty
+    weight: float = 1.0
+    # Rate limits of this key or server (0 = no limit)
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    # Model names on this endpoint for the pipeline's model names. When set,
+    # only these models are routed here (e.g. a local server with one model)
+    models: Dict[str, str] = {}
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+
+class JobStatus(BaseModel):
+    """State of a generation job submitted to the daemon."""
+
+    id: str
+    status: str  # queued, running, succeeded, failed or cancelled
+    overrides: Dict[str, Any]
+    output_file: str
+    samples: int = 0
+    target_size: int = 0
+    partial: bool = False
+    error: Optional[str] = None
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    llm_calls: int = 0
+    tokens: float = 0.0
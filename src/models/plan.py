@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class StageEstimate(BaseModel):
+    """Estimated LLM usage of one pipeline stage."""
+
+    stage: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    seconds: float
+    cost: float
+
+
+class RunPlan(BaseModel):
+    """Dry-run estimate of a full pipeline run."""
+
+    model_name: str
+    intents: int
+    conversations: int
+    expected_samples: int
+    stages: List[StageEstimate]
+    total_calls: int
+    total_input_tokens: int
+    total_output_tokens: int
+    total_seconds: float
+    total_cost: float
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Any, Dict
+
+
+class Task(BaseModel):
+    """Work queue task leased by a worker."""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
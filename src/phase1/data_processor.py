@@ -1,6 +1,33 @@
 import json
+import os
+from functools import lru_cache
 from typing import List, Dict, Tuple
 from src.models.intent import IntentData
+from src.utils.example_selector import select_diverse
+
+SPLITS = ["train", "val", "test"]
+
+
+@lru_cache(maxsize=4)
+def _cached_intent_index(data_file: str, mtime_ns: int, size: int) -> Dict[str, List[str]]:
+    with open(data_file, "r") as f:
+        data = json.load(f)
+    index: Dict[str, List[str]] = {}
+    for split in SPLITS:
+        for item in data.get(split, []):
+            if isinstance(item, list) and len(item) >= 2:
+                index.setdefault(item[1], []).append(item[0])
+    return index
+
+
+def load_intent_index(data_file: str) -> Dict[str, List[str]]:
+    """Examples per intent label (train, val, then test), parsed once per file version.
+
+    Long-running processes such as the daemon reuse the index between runs;
+    a changed file (mtime or size) is parsed again.
+    """
+    stat = os.stat(data_file)
+    return _cached_intent_index(os.path.abspath(data_file), stat.st_mtime_ns, stat.st_size)
 
 
 class DataProcessor:
@@ -28,50 +55,32 @@ class DataProcessor:
 
     def process_intents(self) -> List[IntentData]:
         """Process CLINC150 intents into structured data."""
-        data = self.load_clinc_data()
-        intents = []
-
-        # Extract all unique intent labels from the data
-        intent_labels = set()
-        for split in ["train", "val", "test"]:
-            if split in data:
-                for item in data[split]:
-                    if isinstance(item, list) and len(item) >= 2:
-                        intent_labels.add(item[1])
-
-        intent_count = 0
-        for intent_name in sorted(intent_labels):
-            if intent_name == "oos" or intent_count >= (
-                self.config.target_dataset_size // 2
-            ):
-                continue
-
-            # Collect examples for this intent from all splits
-            text_examples = []
-            for split in ["train", "val", "test"]:
-                if split in data:
-                    for item in data[split]:
-                        if (
-                            isinstance(item, list)
-                            and len(item) >= 2
-                            and item[1] == intent_name
-                        ):
-                            text_examples.append(item[0])
-                            if len(text_examples) >= self.config.max_samples_per_intent:
-                                break
-                    if len(text_examples) >= self.config.max_samples_per_intent:
-                        break
-
-            intent_data = IntentData(
+        index = load_intent_index(self.data_file)
+        names = [name for name in sorted(index) if name != "oos"]
+        names = names[: self.config.target_dataset_size // 2]
+        examples = self.select_examples([index[name] for name in names])
+
+        return [
+            IntentData(
                 domain="",  # Let LLM determine domain
                 action="",  # Let LLM determine action
-                intent_name=intent_name,
-                examples=text_examples,
+                intent_name=name,
+                examples=intent_examples,
             )
-            intents.append(intent_data)
-            intent_count += 1
+            for name, intent_examples in zip(names, examples)
+        ]
 
-        return intents
+    def select_examples(self, groups: List[List[str]]) -> List[List[str]]:
+        """Pick up to max_samples_per_intent examples from each intent's examples."""
+        limit = self.config.max_samples_per_intent
+        if self.config.example_selection == "first":
+            return [group[:limit] for group in groups]
+        if self.config.example_selection != "diverse":
+            raise ValueError(
+                f"Unknown example_selection '{self.config.example_selection}', expected first or diverse"
+            )
+        selections = select_diverse(groups, limit)
+        return [[group[i] for i in selected] for group, selected in zip(groups, selections)]
 
     def get_domain_action_pairs(self) -> List[Tuple[str, str]]:
         """Get domain-action pairs from processed intents."""
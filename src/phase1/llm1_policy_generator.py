@@ -1,8 +1,10 @@
 import json
-from groq import Groq
-from typing import List
+from typing import List, Optional
 from src.models.policy import Policy
 from src.prompts.llm1_policy_generator import get_policy_generation_prompt
+from src.utils.llm_client import LLMClient
+from src.utils.spend_budget import BudgetExceeded
+from src.utils.tracing import policy_item
 
 
 class LLM1PolicyGenerator:
@@ -12,8 +14,9 @@ class LLM1PolicyGenerator:
         model_name: str,
         temperature: float = 0.7,
         max_tokens: int = 200,
+        llm_client: Optional[LLMClient] = None,
     ):
-        self.client = Groq(api_key=api_key)
+        self.llm_client = llm_client or LLMClient(api_key=api_key)
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
@@ -22,41 +25,49 @@ class LLM1PolicyGenerator:
         """Generate a policy description for given intent name and examples."""
         prompt = get_policy_generation_prompt(intent_name, examples)
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+        with self.llm_client.tracer.span("policy", intent=intent_name) as span:
+            try:
+                response = self.llm_client.chat(
+                    stage="policy",
+                    model=self.model_name,
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+
+                content = response.choices[0].message.content.strip()
+
+                # Extract JSON from response (handle markdown code blocks)
+                if content.startswith("```json"):
+                    start_idx = content.find("{")
+                    end_idx = content.rfind("}") + 1
+                    json_content = content[start_idx:end_idx]
+                elif content.startswith("```"):
+                    start_idx = content.find("{")
+                    end_idx = content.rfind("}") + 1
+                    json_content = content[start_idx:end_idx]
+                else:
+                    json_content = content
 
-            content = response.choices[0].message.content.strip()
-
-            # Extract JSON from response (handle markdown code blocks)
-            if content.startswith("```json"):
-                start_idx = content.find("{")
-                end_idx = content.rfind("}") + 1
-                json_content = content[start_idx:end_idx]
-            elif content.startswith("```"):
-                start_idx = content.find("{")
-                end_idx = content.rfind("}") + 1
-                json_content = content[start_idx:end_idx]
-            else:
-                json_content = content
-
-            result = json.loads(json_content)
-            return Policy(**result)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse LLM response as JSON: {e}")
-        except Exception as e:
-            raise RuntimeError(f"LLM-1 policy generation failed: {e}")
+                with self.llm_client.parsing("policy"):
+                    result = json.loads(json_content)
+                    policy = Policy(**result)
+                span.link(policy_item(policy))
+                return policy
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"LLM-1 policy generation failed: {e}")
 
     def generate_policies_batch(self, intents_data: List[dict]) -> List[Policy]:
         """Generate policies for a batch of intent data."""
-        policies = []
-        for intent_data in intents_data:
-            policy = self.generate_policy(
-                intent_data["intent_name"], intent_data["examples"]
+        return list(
+            self.llm_client.map_concurrent(
+                lambda intent_data: self.generate_policy(
+                    intent_data["intent_name"], intent_data["examples"]
+                ),
+                intents_data,
             )
-            policies.append(policy)
-        return policies
+        )
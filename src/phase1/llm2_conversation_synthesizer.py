@@ -1,10 +1,15 @@
 import json
-import random
-from groq import Groq
-from typing import List
+from typing import List, Optional
 from src.models.policy import Policy
 from src.models.conversation import Conversation, ConversationTurn
-from src.prompts.llm2_conversation_synthesizer import get_conversation_generation_prompt
+from src.prompts.llm2_conversation_synthesizer import (
+    get_conversation_generation_prompt,
+    get_multi_conversation_generation_prompt,
+)
+from src.utils.llm_client import LLMClient
+from src.utils.spend_budget import BudgetExceeded
+from src.utils.rng import item_rng
+from src.utils.tracing import policy_item
 
 
 class LLM2ConversationSynthesizer:
@@ -16,78 +21,286 @@ class LLM2ConversationSynthesizer:
         min_turns: int = 2,
         max_turns: int = 5,
         max_tokens: int = 1000,
+        conversations_per_request: int = 1,
+        use_n_sampling: bool = False,
+        llm_client: Optional[LLMClient] = None,
+        seed: int = 0,
     ):
-        self.client = Groq(api_key=api_key)
+        self.llm_client = llm_client or LLMClient(api_key=api_key)
         self.model_name = model_name
         self.temperature = temperature
         self.min_turns = min_turns
         self.max_turns = max_turns
         self.max_tokens = max_tokens
+        self.conversations_per_request = conversations_per_request
+        self.use_n_sampling = use_n_sampling
+        self.seed = seed
 
-    def generate_conversation(self, policy: Policy) -> Conversation:
-        """Generate a conversation following the given policy."""
-        num_turns = random.randint(self.min_turns, self.max_turns)
+    def _parse_turns(self, content: str) -> List[ConversationTurn]:
+        """Parse a single conversation's turns from an LLM response."""
+        content = content.strip()
+
+        # Extract JSON from response (handle cases where LLM adds extra text)
+        start_idx = content.find("[")
+        end_idx = content.rfind("]") + 1
+
+        if start_idx == -1 or end_idx == 0:
+            raise ValueError("No JSON array found in LLM response")
+
+        json_content = content[start_idx:end_idx]
+
+        # Try to parse the JSON, if it fails, try to find the first complete JSON array
+        try:
+            turns_data = json.loads(json_content)
+        except json.JSONDecodeError:
+            # Find the first complete JSON array
+            lines = content.split("\n")
+            json_lines = []
+            in_json = False
+            for line in lines:
+                if line.strip().startswith("["):
+                    in_json = True
+                    json_lines.append(line)
+                elif in_json:
+                    json_lines.append(line)
+                    if line.strip().endswith("]"):
+                        break
+
+            json_content = "\n".join(json_lines)
+            turns_data = json.loads(json_content)
+        return [ConversationTurn(**turn) for turn in turns_data]
+
+    def _extract_conversation_arrays(self, content: str) -> List[list]:
+        """Extract every complete conversation array from a multi-conversation response.
+
+        A single flat conversation (an array of turns) counts as one
+        conversation. Falls back to decoding inner arrays one by one so that
+        a response cut off by max_tokens or containing one malformed
+        conversation still yields the conversations before and after it.
+        """
+        decoder = json.JSONDecoder()
+        start_idx = content.find("[")
+        if start_idx == -1:
+            raise ValueError("No JSON array found in LLM response")
+
+        try:
+            data, _ = decoder.raw_decode(content, start_idx)
+            if isinstance(data, list) and all(isinstance(item, list) for item in data):
+                return data
+            # Small models often answer with a single flat conversation
+            if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+                return [data]
+        except json.JSONDecodeError:
+            pass
+
+        arrays = []
+        idx = content.find("[", start_idx + 1)
+        while idx != -1:
+            try:
+                value, end_idx = decoder.raw_decode(content, idx)
+                if isinstance(value, list) and value and all(
+                    isinstance(turn, dict) for turn in value
+                ):
+                    arrays.append(value)
+                    idx = content.find("[", end_idx)
+                    continue
+            except json.JSONDecodeError:
+                pass
+            idx = content.find("[", idx + 1)
+        return arrays
+
+    def _build_conversation(
+        self, policy: Policy, turns: List[ConversationTurn]
+    ) -> Conversation:
+        return Conversation(
+            turns=turns,
+            domain=policy.domain,
+            action=policy.action,
+            description=policy.description,
+        )
+
+    def _turn_count_rng(self, policy: Policy, index: int):
+        return item_rng(self.seed, "conversation", policy.domain, policy.action, index)
+
+    def generate_conversation(self, policy: Policy, index: int = 0) -> Conversation:
+        """Generate a conversation following the given policy.
+
+        index identifies the conversation among those of the same policy and
+        seeds its turn count.
+        """
+        num_turns = self._turn_count_rng(policy, index).randint(
+            self.min_turns, self.max_turns
+        )
         prompt = get_conversation_generation_prompt(
             policy.description, policy.domain, policy.action, num_turns
         )
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+        with self.llm_client.tracer.span("conversation", index=index) as span:
+            try:
+                response = self.llm_client.chat(
+                    stage="conversation",
+                    # Every call must yield a distinct conversation
+                    coalesce=False,
+                    model=self.model_name,
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    max_tokens=self.llm_client.max_tokens_for(
+                        "conversation", num_turns, self.max_tokens
+                    ),
+                    num_turns=num_turns,
+                )
+
+                content = response.choices[0].message.content.strip()
+                with self.llm_client.parsing("conversation"):
+                    turns = self._parse_turns(content)
 
-            content = response.choices[0].message.content.strip()
+                conversation = self._build_conversation(policy, turns)
+                span.link(("conversation", conversation), parent=policy_item(policy))
+                return conversation
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"LLM-2 conversation generation failed: {e}")
 
-            # Extract JSON from response (handle cases where LLM adds extra text)
-            start_idx = content.find("[")
-            end_idx = content.rfind("]") + 1
+    def generate_conversations(
+        self, policy: Policy, k: int, index: int = 0
+    ) -> List[Conversation]:
+        """Generate up to k diverse conversations for a policy in a single request.
 
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON array found in LLM response")
+        Each conversation is validated on its own, so a partially valid
+        response returns the conversations that parsed. index identifies the
+        request among those of the same policy.
+        """
+        if k <= 1:
+            return [self.generate_conversation(policy, index)]
+        if self.use_n_sampling:
+            return self._generate_conversations_n(policy, k, index)
 
-            json_content = content[start_idx:end_idx]
+        rng = self._turn_count_rng(policy, index)
+        turn_counts = [rng.randint(self.min_turns, self.max_turns) for _ in range(k)]
+        total_turns = sum(turn_counts)
+        prompt = get_multi_conversation_generation_prompt(
+            policy.description, policy.domain, policy.action, turn_counts
+        )
 
-            # Try to parse the JSON, if it fails, try to find the first complete JSON array
+        with self.llm_client.tracer.span("conversation", index=index) as span:
             try:
-                turns_data = json.loads(json_content)
-            except json.JSONDecodeError:
-                # Find the first complete JSON array
-                lines = content.split("\n")
-                json_lines = []
-                in_json = False
-                for line in lines:
-                    if line.strip().startswith("["):
-                        in_json = True
-                        json_lines.append(line)
-                    elif in_json:
-                        json_lines.append(line)
-                        if line.strip().endswith("]"):
-                            break
-
-                json_content = "\n".join(json_lines)
-                turns_data = json.loads(json_content)
-            turns = [ConversationTurn(**turn) for turn in turns_data]
-
-            return Conversation(
-                turns=turns,
-                domain=policy.domain,
-                action=policy.action,
-                description=policy.description,
+                response = self.llm_client.chat(
+                    stage="conversation",
+                    # Every call must yield a distinct conversation
+                    coalesce=False,
+                    model=self.model_name,
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    max_tokens=self.llm_client.max_tokens_for(
+                        "conversation", total_turns, self.max_tokens * k
+                    ),
+                    num_turns=total_turns,
+                )
+                content = response.choices[0].message.content.strip()
+                with self.llm_client.parsing("conversation"):
+                    arrays = self._extract_conversation_arrays(content)
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"LLM-2 multi-conversation generation failed: {e}")
+
+            conversations = []
+            for turns_data in arrays[:k]:
+                try:
+                    turns = [ConversationTurn(**turn) for turn in turns_data]
+                except (TypeError, ValueError) as e:
+                    print(f"Skipping invalid conversation in batch: {e}")
+                    continue
+                if turns:
+                    conversations.append(self._build_conversation(policy, turns))
+            span.link(
+                *(("conversation", c) for c in conversations), parent=policy_item(policy)
             )
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse LLM response as JSON: {e}")
-        except Exception as e:
-            raise RuntimeError(f"LLM-2 conversation generation failed: {e}")
+            return conversations
+
+    def _generate_conversations_n(
+        self, policy: Policy, k: int, index: int = 0
+    ) -> List[Conversation]:
+        """Generate k conversations via the API's n parameter.
+
+        Only works against providers that accept n > 1 (Groq currently
+        accepts n=1 only, OpenAI-compatible servers generally do).
+        """
+        num_turns = self._turn_count_rng(policy, index).randint(
+            self.min_turns, self.max_turns
+        )
+        prompt = get_conversation_generation_prompt(
+            policy.description, policy.domain, policy.action, num_turns
+        )
+
+        with self.llm_client.tracer.span("conversation", index=index) as span:
+            try:
+                response = self.llm_client.chat(
+                    stage="conversation",
+                    # Every call must yield a distinct conversation
+                    coalesce=False,
+                    model=self.model_name,
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    max_tokens=self.llm_client.max_tokens_for(
+                        "conversation", num_turns, self.max_tokens
+                    ),
+                    num_turns=num_turns * k,
+                    n=k,
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"LLM-2 multi-conversation generation failed: {e}")
+
+            conversations = []
+            for choice in response.choices:
+                try:
+                    with self.llm_client.parsing("conversation"):
+                        turns = self._parse_turns(choice.message.content or "")
+                except (TypeError, ValueError) as e:
+                    print(f"Skipping invalid conversation in batch: {e}")
+                    continue
+                conversations.append(self._build_conversation(policy, turns))
+            span.link(
+                *(("conversation", c) for c in conversations), parent=policy_item(policy)
+            )
+            return conversations
 
     def generate_conversations_batch(
-        self, policies: List[Policy]
+        self, policies: List[Policy], conversations_per_policy: int = 1
     ) -> List[Conversation]:
         """Generate conversations for a batch of policies."""
+
+        def for_policy(policy: Policy) -> List[Conversation]:
+            if conversations_per_policy <= 1 and self.conversations_per_request <= 1:
+                return [self.generate_conversation(policy)]
+            return self._generate_for_policy(policy, conversations_per_policy)
+
         conversations = []
-        for policy in policies:
-            conversation = self.generate_conversation(policy)
-            conversations.append(conversation)
+        for generated in self.llm_client.map_concurrent(for_policy, policies):
+            conversations.extend(generated)
         return conversations
+
+    def _generate_for_policy(self, policy: Policy, count: int) -> List[Conversation]:
+        """Generate count conversations for a policy, K per request."""
+        conversations: List[Conversation] = []
+        k = max(1, self.conversations_per_request)
+        # Allow one extra round of requests to make up for salvaged batches
+        max_requests = 2 * -(-count // k)
+        for request_index in range(max_requests):
+            remaining = count - len(conversations)
+            if remaining <= 0:
+                break
+            try:
+                conversations.extend(
+                    self.generate_conversations(policy, min(k, remaining), request_index)
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                print(f"Conversation generation failed for {policy.action}: {e}")
+        return conversations[:count]
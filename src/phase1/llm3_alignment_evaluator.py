@@ -1,10 +1,12 @@
 import json
-from groq import Groq
-from typing import List
+import time
+from typing import List, Optional
 from src.models.conversation import Conversation
 from src.models.alignment import AlignmentScore
 from src.prompts.llm3_alignment_evaluator import get_alignment_evaluation_prompt
-from src.utils.conversation_formatter import format_conversation
+from src.utils.conversation_formatter import format_conversation_compact
+from src.utils.llm_client import LLMClient
+from src.utils.spend_budget import BudgetExceeded
 
 
 class LLM3AlignmentEvaluator:
@@ -15,16 +17,23 @@ class LLM3AlignmentEvaluator:
         temperature: float = 0.3,
         threshold: float = 0.9,
         max_tokens: int = 300,
+        max_turns: int = 0,
+        max_turn_chars: int = 0,
+        llm_client: Optional[LLMClient] = None,
     ):
-        self.client = Groq(api_key=api_key)
+        self.llm_client = llm_client or LLMClient(api_key=api_key)
         self.model_name = model_name
         self.temperature = temperature
         self.threshold = threshold
         self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.max_turn_chars = max_turn_chars
 
     def evaluate_alignment(self, conversation: Conversation) -> AlignmentScore:
         """Evaluate how well a conversation aligns with its policy."""
-        conversation_text = format_conversation(conversation)
+        conversation_text = format_conversation_compact(
+            conversation, self.max_turns, self.max_turn_chars
+        )
         prompt = get_alignment_evaluation_prompt(
             conversation_text,
             conversation.description,
@@ -32,31 +41,45 @@ class LLM3AlignmentEvaluator:
             conversation.action,
         )
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
+        with self.llm_client.tracer.span("evaluation") as span:
+            try:
+                start = time.perf_counter()
+                response = self.llm_client.chat(
+                    stage="evaluation",
+                    model=self.model_name,
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                )
+                latency = time.perf_counter() - start
 
-            result = json.loads(response.choices[0].message.content.strip())
-            score = float(result.get("score", 0.5))
-            reasoning = result.get("reasoning", "No reasoning provided")
-            is_aligned = score >= self.threshold
+                with self.llm_client.parsing("evaluation"):
+                    result = json.loads(response.choices[0].message.content.strip())
+                    score = float(result.get("score", 0.5))
+                reasoning = result.get("reasoning", "No reasoning provided")
+                is_aligned = score >= self.threshold
 
-            return AlignmentScore(
-                score=score, reasoning=reasoning, is_aligned=is_aligned
-            )
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Failed to parse LLM response as JSON: {e}")
-        except Exception as e:
-            raise RuntimeError(f"LLM-3 alignment evaluation failed: {e}")
+                span.link(("score", conversation), parent=("conversation", conversation))
+                span.set(score=score)
+                usage = getattr(response, "usage", None)
+                return AlignmentScore(
+                    score=score,
+                    reasoning=reasoning,
+                    is_aligned=is_aligned,
+                    model=getattr(response, "model", None) or self.model_name,
+                    latency=latency,
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                )
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Failed to parse LLM response as JSON: {e}")
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"LLM-3 alignment evaluation failed: {e}")
 
     def evaluate_batch(self, conversations: List[Conversation]) -> List[AlignmentScore]:
         """Evaluate alignment for a batch of conversations."""
-        scores = []
-        for conversation in conversations:
-            score = self.evaluate_alignment(conversation)
-            scores.append(score)
-        return scores
+        return list(
+            self.llm_client.map_concurrent(self.evaluate_alignment, conversations)
+        )
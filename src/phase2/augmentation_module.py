@@ -1,9 +1,9 @@
 import json
 import random
-from groq import Groq
-from typing import List
+from typing import Callable, Dict, List, Optional
 from src.models.conversation import Conversation, ConversationTurn
 from src.models.augmentation import AugmentedConversation
+from src.models.compact import ConversationStore
 from pydantic import BaseModel, Field
 from src.prompts.phase2_paraphrase import (
     get_noise_injection_prompt,
@@ -12,6 +12,32 @@ from src.prompts.phase2_paraphrase import (
     get_domain_mixing_prompt,
 )
 from src.utils.conversation_formatter import format_conversation
+from src.utils.llm_client import LLMClient
+from src.utils.spend_budget import BudgetExceeded
+from src.utils.rng import conversation_key, item_rng
+from src.utils.similarity_index import DigestSet, SimilarityIndex
+from src.utils.speculation import _always
+
+LABEL_SCORES = {
+    "original": 0.95,
+    "paraphrase": 0.9,
+    "noise": 0.7,
+    "irrelevant": 0.1,
+    "domain_mix": 0.1,
+}
+
+# Expected output turns for the irrelevant prompt, which asks for 4-8 turns
+IRRELEVANT_CONVERSATION_TURNS = 8
+# Noise injection adds 1-2 interruption turns to the original conversation
+NOISE_EXTRA_TURNS = 2
+
+
+def _index_text(conversation: Conversation) -> str:
+    return " ".join(turn.content for turn in conversation.turns)
+
+
+def _index_digest(conversation: Conversation) -> int:
+    return int(conversation_key(conversation)[:16], 16)
 
 
 class ConversationResponse(BaseModel):
@@ -67,32 +93,75 @@ class AugmentationModule:
         model_name: str,
         temperature: float = 0.8,
         max_tokens: int = 1000,
+        paraphrase_probability: float = 0.35,
+        noise_probability: float = 0.225,
+        irrelevant_probability: float = 0.125,
+        domain_mix_probability: float = 0.05,
+        domain_mix_partners: str = "random",
+        domain_mix_candidates: int = 5,
+        llm_client: Optional[LLMClient] = None,
+        seed: int = 0,
     ):
-        self.client = Groq(api_key=api_key)
+        self.llm_client = llm_client or LLMClient(api_key=api_key)
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.paraphrase_probability = paraphrase_probability
+        self.noise_probability = noise_probability
+        self.irrelevant_probability = irrelevant_probability
+        self.domain_mix_probability = domain_mix_probability
+        if domain_mix_partners not in ("random", "similar"):
+            raise ValueError(
+                f"Unknown domain_mix_partners '{domain_mix_partners}', expected random or similar"
+            )
+        self.domain_mix_partners = domain_mix_partners
+        self.domain_mix_candidates = domain_mix_candidates
+        self.seed = seed
+
+        # Accepted conversations indexed for "similar" partners, grown across
+        # batches. Row i of the index is row i of the partner store
+        self.similarity_index: Optional[SimilarityIndex] = None
+        self._partners: Optional[ConversationStore] = None
+        self._partner_digests: Optional[DigestSet] = None
+
+    def _rng_for(self, conversation: Conversation, purpose: str) -> random.Random:
+        """Random generator for one conversation, independent of processing order."""
+        return item_rng(self.seed, purpose, conversation_key(conversation))
 
     def _get_label_score(self, augmentation_type: str) -> float:
-        scores = {
-            "original": 0.95,
-            "paraphrase": 0.9,
-            "noise": 0.7,
-            "irrelevant": 0.1,
-            "domain_mix": 0.1,
-        }
-        return scores.get(augmentation_type, 0.5)
+        return LABEL_SCORES.get(augmentation_type, 0.5)
+
+    def _complete(self, stage: str, prompt: str, num_turns: int):
+        """Send an augmentation prompt with a max_tokens sized for num_turns."""
+        return self.llm_client.chat(
+            stage=stage,
+            model=self.model_name,
+            prompt=prompt,
+            temperature=self.temperature,
+            max_tokens=self.llm_client.max_tokens_for(
+                stage, num_turns, self.max_tokens
+            ),
+            num_turns=num_turns,
+        )
 
-    def _parse_llm_response(self, content: str) -> List[ConversationTurn]:
+    def _parse_llm_response(
+        self, content: Optional[str], stage: str
+    ) -> List[ConversationTurn]:
         """Parse LLM response using Pydantic validation."""
-        try:
-            response = ConversationResponse.from_llm_response(content)
-            return response.turns
-        except ValueError as e:
-            print(f"Failed to parse LLM response: {e}")
-            raise
-
-    def selective_paraphrase(self, conversation: Conversation) -> AugmentedConversation:
+        with self.llm_client.parsing(stage):
+            if content is None:
+                raise ValueError("Empty response from LLM")
+            try:
+                response = ConversationResponse.from_llm_response(content)
+                return response.turns
+            except ValueError as e:
+                print(f"Failed to parse LLM response: {e}")
+                raise
+
+    def selective_paraphrase(
+        self, conversation: Conversation, rng: Optional[random.Random] = None
+    ) -> AugmentedConversation:
+        rng = rng or self._rng_for(conversation, "paraphrase")
         user_turn_indices = [
             i for i, turn in enumerate(conversation.turns) if turn.role == "user"
         ]
@@ -106,73 +175,69 @@ class AugmentationModule:
         # Select 1-3 random user turns (or all if less than 3)
         max_turns = min(3, len(user_turn_indices))
         min_turns = 1
-        num_turns = random.randint(min_turns, max_turns)
-        selected_indices = random.sample(user_turn_indices, num_turns)
+        num_turns = rng.randint(min_turns, max_turns)
+        selected_indices = rng.sample(user_turn_indices, num_turns)
 
         conversation_text = format_conversation(conversation)
         prompt = get_selective_paraphrase_prompt(conversation_text, selected_indices)
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("Empty response from LLM")
-
-            turns = self._parse_llm_response(content)
-
-            paraphrased = Conversation(
-                turns=turns,
-                domain=conversation.domain,
-                action=conversation.action,
-                description=conversation.description,
-            )
-
-            return AugmentedConversation(
-                conversation=paraphrased,
-                augmentation_type="paraphrase",
-                label_score=self._get_label_score("paraphrase"),
-            )
-        except Exception as e:
-            raise RuntimeError(f"Selective paraphrase augmentation failed: {e}")
+        with self.llm_client.tracer.span("paraphrase") as span:
+            try:
+                response = self._complete(
+                    "paraphrase", prompt, len(conversation.turns)
+                )
+
+                content = response.choices[0].message.content
+                turns = self._parse_llm_response(content, "paraphrase")
+
+                paraphrased = Conversation(
+                    turns=turns,
+                    domain=conversation.domain,
+                    action=conversation.action,
+                    description=conversation.description,
+                )
+
+                span.link(("sample", paraphrased), parent=("score", conversation))
+                return AugmentedConversation(
+                    conversation=paraphrased,
+                    augmentation_type="paraphrase",
+                    label_score=self._get_label_score("paraphrase"),
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Selective paraphrase augmentation failed: {e}")
 
     def inject_noise(self, conversation: Conversation) -> AugmentedConversation:
         conversation_text = format_conversation(conversation)
         prompt = get_noise_injection_prompt(conversation_text)
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("Empty response from LLM")
-
-            turns = self._parse_llm_response(content)
-
-            noisy_conversation = Conversation(
-                turns=turns,
-                domain=conversation.domain,
-                action=conversation.action,
-                description=conversation.description,
-            )
-
-            return AugmentedConversation(
-                conversation=noisy_conversation,
-                augmentation_type="noise",
-                label_score=self._get_label_score("noise"),
-            )
-        except Exception as e:
-            raise RuntimeError(f"Noise injection augmentation failed: {e}")
+        with self.llm_client.tracer.span("noise") as span:
+            try:
+                response = self._complete(
+                    "noise", prompt, len(conversation.turns) + NOISE_EXTRA_TURNS
+                )
+
+                content = response.choices[0].message.content
+                turns = self._parse_llm_response(content, "noise")
+
+                noisy_conversation = Conversation(
+                    turns=turns,
+                    domain=conversation.domain,
+                    action=conversation.action,
+                    description=conversation.description,
+                )
+
+                span.link(("sample", noisy_conversation), parent=("score", conversation))
+                return AugmentedConversation(
+                    conversation=noisy_conversation,
+                    augmentation_type="noise",
+                    label_score=self._get_label_score("noise"),
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Noise injection augmentation failed: {e}")
 
     def create_irrelevant_conversation(
         self, conversation: Conversation
@@ -181,72 +246,87 @@ class AugmentationModule:
             conversation.domain, conversation.action
         )
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("Empty response from LLM")
-
-            turns = self._parse_llm_response(content)
-
-            irrelevant_conversation = Conversation(
-                turns=turns,
-                domain="irrelevant",
-                action="irrelevant_chat",
-                description="Irrelevant conversation for negative training",
-            )
-
-            return AugmentedConversation(
-                conversation=irrelevant_conversation,
-                augmentation_type="irrelevant",
-                label_score=self._get_label_score("irrelevant"),
-            )
-        except Exception as e:
-            raise RuntimeError(f"Irrelevant conversation generation failed: {e}")
+        with self.llm_client.tracer.span("irrelevant") as span:
+            try:
+                response = self._complete(
+                    "irrelevant", prompt, IRRELEVANT_CONVERSATION_TURNS
+                )
+
+                content = response.choices[0].message.content
+                turns = self._parse_llm_response(content, "irrelevant")
+
+                irrelevant_conversation = Conversation(
+                    turns=turns,
+                    domain="irrelevant",
+                    action="irrelevant_chat",
+                    description="Irrelevant conversation for negative training",
+                )
+
+                span.link(("sample", irrelevant_conversation), parent=("score", conversation))
+                return AugmentedConversation(
+                    conversation=irrelevant_conversation,
+                    augmentation_type="irrelevant",
+                    label_score=self._get_label_score("irrelevant"),
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Irrelevant conversation generation failed: {e}")
 
     def create_domain_mixed_conversation(
         self, conversation: Conversation, other_conversation: Conversation
     ) -> AugmentedConversation:
         prompt = get_domain_mixing_prompt(conversation, other_conversation)
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-
-            content = response.choices[0].message.content
-            if content is None:
-                raise ValueError("Empty response from LLM")
-
-            turns = self._parse_llm_response(content)
-
-            mixed_conversation = Conversation(
-                turns=turns,
-                domain="mixed",
-                action="mixed_domains",
-                description="Domain-mixed conversation for negative training",
-            )
-
-            return AugmentedConversation(
-                conversation=mixed_conversation,
-                augmentation_type="domain_mix",
-                label_score=self._get_label_score("domain_mix"),
-            )
-        except Exception as e:
-            raise RuntimeError(f"Domain mixing augmentation failed: {e}")
+        with self.llm_client.tracer.span("domain_mix") as span:
+            try:
+                response = self._complete(
+                    "domain_mix",
+                    prompt,
+                    len(conversation.turns) + len(other_conversation.turns),
+                )
+
+                content = response.choices[0].message.content
+                turns = self._parse_llm_response(content, "domain_mix")
+
+                mixed_conversation = Conversation(
+                    turns=turns,
+                    domain="mixed",
+                    action="mixed_domains",
+                    description="Domain-mixed conversation for negative training",
+                )
+
+                span.link(("sample", mixed_conversation), parent=("score", conversation))
+                return AugmentedConversation(
+                    conversation=mixed_conversation,
+                    augmentation_type="domain_mix",
+                    label_score=self._get_label_score("domain_mix"),
+                )
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Domain mixing augmentation failed: {e}")
 
     def create_conversation_variants(
-        self, conversation: Conversation
+        self,
+        conversation: Conversation,
+        proceed: Optional[Callable[[], bool]] = None,
     ) -> List[AugmentedConversation]:
+        """Create the original sample plus its randomly drawn variants.
+
+        proceed, if given, is asked before each LLM call; once it returns
+        False the remaining branches are skipped (used to cancel speculative
+        augmentation of a rejected conversation).
+        """
+        proceed = proceed or _always
+        # All branches are drawn up front so that a skipped or failed branch
+        # doesn't shift the draws of the others
+        rng = self._rng_for(conversation, "variants")
+        branches = {
+            "paraphrase": rng.random() < self.paraphrase_probability,
+            "noise": rng.random() < self.noise_probability,
+            "irrelevant": rng.random() < self.irrelevant_probability,
+        }
         variants = []
 
         variants.append(
@@ -257,21 +337,21 @@ class AugmentationModule:
             )
         )
 
-        if random.random() < 0.35:
+        if branches["paraphrase"] and self.llm_client.can_spend("paraphrase") and proceed():
             try:
                 paraphrased = self.selective_paraphrase(conversation)
                 variants.append(paraphrased)
             except Exception as e:
                 print(f"Paraphrase failed: {e}")
 
-        if random.random() < 0.225:
+        if branches["noise"] and self.llm_client.can_spend("noise") and proceed():
             try:
                 noisy = self.inject_noise(conversation)
                 variants.append(noisy)
             except Exception as e:
                 print(f"Noise injection failed: {e}")
 
-        if random.random() < 0.125:
+        if branches["irrelevant"] and self.llm_client.can_spend("irrelevant") and proceed():
             try:
                 irrelevant = self.create_irrelevant_conversation(conversation)
                 variants.append(irrelevant)
@@ -280,20 +360,68 @@ class AugmentationModule:
 
         return variants
 
+    def create_typed_variants(
+        self,
+        conversation: Conversation,
+        augmentation_types: List[str],
+        proceed: Optional[Callable[[], bool]] = None,
+    ) -> List[AugmentedConversation]:
+        """Create exactly the requested variant types (used when topping up a dataset).
+
+        proceed works as in create_conversation_variants.
+        """
+        proceed = proceed or _always
+        creators = {
+            "paraphrase": self.selective_paraphrase,
+            "noise": self.inject_noise,
+            "irrelevant": self.create_irrelevant_conversation,
+        }
+        variants = []
+        for augmentation_type in augmentation_types:
+            if augmentation_type == "original":
+                variants.append(
+                    AugmentedConversation(
+                        conversation=conversation,
+                        augmentation_type="original",
+                        label_score=self._get_label_score("original"),
+                    )
+                )
+                continue
+            if not proceed():
+                break
+            try:
+                variants.append(creators[augmentation_type](conversation))
+            except Exception as e:
+                print(f"{augmentation_type} augmentation failed: {e}")
+        return variants
+
     def augment_conversations(
-        self, conversations: List[Conversation]
+        self,
+        conversations: List[Conversation],
+        on_variants: Optional[Callable[[List[AugmentedConversation]], None]] = None,
+        collect: bool = True,
     ) -> List[AugmentedConversation]:
+        # With collect=False variants only go to on_variants and [] is returned
         all_augmented = []
 
-        for conversation in conversations:
-            variants = self.create_conversation_variants(conversation)
-            all_augmented.extend(variants)
+        # Callbacks run in the calling thread, in conversation order
+        for variants in self.llm_client.map_concurrent(
+            self.create_conversation_variants, conversations
+        ):
+            if collect:
+                all_augmented.extend(variants)
+            if on_variants is not None:
+                on_variants(variants)
 
         return all_augmented
 
     def augment_conversations_with_mixing(
-        self, conversations: List[Conversation]
+        self,
+        conversations: List[Conversation],
+        on_variants: Optional[Callable[[List[AugmentedConversation]], None]] = None,
+        collect: bool = True,
     ) -> List[AugmentedConversation]:
+        # With collect=False variants only go to on_variants and [] is returned
         all_augmented = []
 
         domain_groups: dict[str, list[Conversation]] = {}
@@ -302,23 +430,97 @@ class AugmentationModule:
                 domain_groups[conv.domain] = []
             domain_groups[conv.domain].append(conv)
 
-        for conversation in conversations:
+        # The mixing draw comes first from each conversation's generator, so
+        # similar partners can be looked up in one batch for the chosen ones
+        rngs = [self._rng_for(conversation, "domain_mix") for conversation in conversations]
+        chosen = [
+            index
+            for index, rng in enumerate(rngs)
+            if rng.random() < self.domain_mix_probability
+        ]
+        partners = None
+        if self.domain_mix_partners == "similar" and chosen and len(domain_groups) > 1:
+            partners = self._similar_partners(conversations, chosen)
+        chosen = set(chosen)
+
+        def variants_with_mixing(index: int) -> List[AugmentedConversation]:
+            conversation = conversations[index]
             variants = self.create_conversation_variants(conversation)
-            all_augmented.extend(variants)
+            rng = rngs[index]
 
-            if random.random() < 0.05 and len(domain_groups) > 1:
+            if (
+                index in chosen
+                and len(domain_groups) > 1
+                and self.llm_client.can_spend("domain_mix")
+            ):
                 other_domains = [
                     d for d in domain_groups.keys() if d != conversation.domain
                 ]
                 if other_domains:
-                    other_domain = random.choice(other_domains)
-                    other_conversation = random.choice(domain_groups[other_domain])
+                    if partners is not None and partners[index]:
+                        other_conversation = rng.choice(partners[index])
+                    else:
+                        other_domain = rng.choice(other_domains)
+                        other_conversation = rng.choice(domain_groups[other_domain])
                     try:
                         mixed = self.create_domain_mixed_conversation(
                             conversation, other_conversation
                         )
-                        all_augmented.append(mixed)
+                        variants.append(mixed)
                     except Exception as e:
                         print(f"Domain mixing failed: {e}")
+            return variants
+
+        for variants in self.llm_client.map_concurrent(
+            variants_with_mixing, range(len(conversations))
+        ):
+            if collect:
+                all_augmented.extend(variants)
+            if on_variants is not None:
+                on_variants(variants)
 
         return all_augmented
+
+    def index_conversations(self, conversations: List[Conversation]):
+        """Add accepted conversations to the similarity index.
+
+        The index is kept on the module and only conversations it doesn't
+        hold yet are added, so it grows as conversations are accepted
+        instead of being rebuilt for every batch. Partners are kept in a
+        compact ConversationStore and recognised by a 64-bit digest rather
+        than as pydantic models.
+        """
+        if self.similarity_index is None:
+            self.similarity_index = SimilarityIndex()
+            self._partners = ConversationStore()
+            self._partner_digests = DigestSet()
+        new = self._partner_digests.add([_index_digest(c) for c in conversations])
+        added = [conversation for conversation, is_new in zip(conversations, new) if is_new]
+        for conversation in added:
+            self._partners.append(
+                ((turn.role, turn.content) for turn in conversation.turns),
+                conversation.domain,
+                conversation.action,
+                conversation.description,
+                "original",
+                self._get_label_score("original"),
+            )
+        if added:
+            self.similarity_index.add(
+                [_index_text(c) for c in added], [c.domain for c in added]
+            )
+
+    def _similar_partners(
+        self, conversations: List[Conversation], chosen: List[int]
+    ) -> Dict[int, List[Conversation]]:
+        """The most similar accepted conversations from other domains for each chosen one."""
+        self.index_conversations(conversations)
+        neighbours, _ = self.similarity_index.query(
+            [_index_text(conversations[i]) for i in chosen],
+            [conversations[i].domain for i in chosen],
+            self.domain_mix_candidates,
+        )
+        return {
+            i: [self._partners.to_augmented(j).conversation for j in row if j >= 0]
+            for i, row in zip(chosen, neighbours.tolist())
+        }
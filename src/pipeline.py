@@ -1,21 +1,277 @@
-import json
-from typing import List, Dict
+import importlib
+import inspect
+import os
+from functools import partial
+from typing import Any, Callable, List, Dict, Optional, Union
 
 from src.config import Config
+from src.models.augmentation import AugmentedConversation
+from src.models.compact import ConversationStore
+from src.models.conversation import Conversation
+from src.models.policy import Policy
 from src.phase1.data_processor import DataProcessor
 from src.phase1.llm1_policy_generator import LLM1PolicyGenerator
 from src.phase1.llm2_conversation_synthesizer import LLM2ConversationSynthesizer
 from src.phase1.llm3_alignment_evaluator import LLM3AlignmentEvaluator
 from src.phase2.augmentation_module import AugmentationModule
+from src.utils.artifact_store import ArtifactStore, compute_stage_key, hash_file
+from src.utils.columnar import ColumnarDatasetWriter, columnar_path
+from src.utils.conversation_formatter import format_sample
+from src.utils.dataset_stats import DatasetStats, format_stats
+from src.utils.dataset_writer import (
+    ShardedDatasetWriter,
+    iter_dataset_records,
+    read_manifest,
+)
+from src.utils.llm_client import LLMClient
+from src.utils.provenance_store import ProvenanceStore
+from src.utils.llm_backends import LLMBackend, make_backend
+from src.utils.metrics import MetricsRecorder
+from src.utils.request_scheduler import RequestScheduler
+from src.utils.speculation import SpeculativeAugmenter, format_speculation
+from src.utils.spend_budget import SpendBudget
+from src.utils.tracing import Tracer
+from src.utils.token_budget import TokenBudget
+from src.utils.topup import (
+    POLICY_TYPES,
+    compute_deficits,
+    count_existing,
+    requested_distribution,
+)
+
+DEFAULT_DATA_FILE = "data/clinc150_uci/data_small.json"
+
+# Pipeline stages in execution order and the stages each one consumes
+STAGES = ["intents", "policies", "conversations", "scores", "augmentations", "final"]
+STAGE_INPUTS = {
+    "intents": [],
+    "policies": ["intents"],
+    "conversations": ["policies"],
+    "scores": ["conversations"],
+    "augmentations": ["conversations", "scores"],
+    "final": ["augmentations"],
+}
+STAGE_TITLES = {
+    "intents": "Processing CLINC150 data",
+    "policies": "Generating policies with LLM-1",
+    "conversations": "Generating conversations with LLM-2",
+    "scores": "Evaluating alignment with LLM-3",
+    "augmentations": "Applying augmentations (branching approach)",
+    "final": "Formatting final dataset",
+}
+
+# Config fields that change a stage's output (and so its artifact key)
+_CONVERSATION_BUDGET_FIELDS = [
+    "adaptive_max_tokens",
+    "tokens_per_turn_estimate",
+    "max_tokens_safety_margin",
+]
+STAGE_CONFIG_FIELDS = {
+    "intents": ["max_samples_per_intent", "example_selection", "target_dataset_size"],
+    "policies": [
+        "model_name",
+        "stage_models",
+        "policy_generation_temperature",
+        "policy_generation_max_tokens",
+    ],
+    "conversations": [
+        "seed",
+        "model_name",
+        "stage_models",
+        "conversation_temperature",
+        "min_conversation_turns",
+        "max_conversation_turns",
+        "conversation_generation_max_tokens",
+        "conversations_per_policy",
+        "conversations_per_request",
+        "use_n_sampling",
+    ]
+    + _CONVERSATION_BUDGET_FIELDS,
+    "scores": [
+        "model_name",
+        "stage_models",
+        "evaluation_temperature",
+        "alignment_evaluation_max_tokens",
+        "evaluation_max_turns",
+        "evaluation_max_turn_chars",
+    ],
+    "augmentations": [
+        "seed",
+        "model_name",
+        "stage_models",
+        "alignment_threshold",
+        "conversation_temperature",
+        "augmentation_max_tokens",
+        "use_domain_mixing",
+        "paraphrase_probability",
+        "noise_probability",
+        "irrelevant_probability",
+        "domain_mix_probability",
+        "domain_mix_partners",
+        "domain_mix_candidates",
+    ]
+    + _CONVERSATION_BUDGET_FIELDS,
+    "final": ["target_dataset_size"],
+}
+STAGE_PROMPT_MODULES = {
+    "policies": ["src.prompts.llm1_policy_generator"],
+    "conversations": ["src.prompts.llm2_conversation_synthesizer"],
+    "scores": ["src.prompts.llm3_alignment_evaluator"],
+    "augmentations": ["src.prompts.phase2_paraphrase"],
+}
+
+
+def stage_to_artifact(stage: str, output: Any) -> Any:
+    """Artifact data of a stage output.
+
+    The augmentations and final stages hold their samples in a
+    ConversationStore; their artifacts keep the JSON formats of
+    AugmentedConversation dumps and final dataset records.
+    """
+    if stage == "augmentations":
+        return [output.to_augmented_dict(index) for index in range(len(output))]
+    if stage == "final":
+        return list(output.iter_records())
+    return output
+
+
+def stage_from_artifact(stage: str, data: Any) -> Any:
+    """Stage output from its artifact data (the inverse of stage_to_artifact)."""
+    if stage == "augmentations":
+        store = ConversationStore()
+        store.extend_augmented_dicts(data)
+        return store
+    if stage == "final":
+        store = ConversationStore()
+        store.extend_records(data)
+        return store
+    return data
+
+
+def select_intents_data(intents: List, config: Config) -> List[Dict]:
+    """Convert processed intents to LLM-1 input and limit them to the target size."""
+    intents_data = []
+    for intent in intents:
+        intents_data.append(
+            {"intent_name": intent.intent_name, "examples": intent.examples}
+        )
+
+    # Limit intents based on target dataset size
+    max_intents_needed = min(
+        len(intents_data), config.target_dataset_size // 2
+    )  # Rough estimate
+    return intents_data[:max_intents_needed]
+
+
+def policies_by_intent(intents_data: List[Dict], policies: List[Dict]) -> Dict[str, Dict]:
+    """Map intent names to the policies generated for them."""
+    return {
+        intent_data["intent_name"]: policy
+        for intent_data, policy in zip(intents_data, policies)
+    }
+
+
+def open_dataset_writer(
+    config: Config, output_file: str = "", append: bool = False
+) -> Union[ShardedDatasetWriter, ColumnarDatasetWriter]:
+    """Open a streaming dataset writer configured from Config output settings."""
+    output_file = output_file or config.output_file
+    if config.output_format != "jsonl":
+        if append:
+            raise ValueError("Appending is only supported for JSONL output")
+        return ColumnarDatasetWriter(
+            columnar_path(output_file, config.output_format),
+            output_format=config.output_format,
+            row_group_size=config.output_row_group_size,
+        )
+
+    return ShardedDatasetWriter(
+        output_file,
+        compression=config.output_compression,
+        max_records_per_shard=config.output_shard_max_records,
+        max_bytes_per_shard=config.output_shard_max_bytes,
+        fsync_every=config.output_fsync_every,
+        append=append,
+    )
+
+
+def make_scheduler(config: Config) -> RequestScheduler:
+    """Request scheduler for the scheduling policy and rate limits configured in Config."""
+    enforce = config.enforce_rate_limits
+    return RequestScheduler(
+        policy=config.request_scheduling,
+        requests_per_minute=config.requests_per_minute if enforce else 0,
+        tokens_per_minute=config.tokens_per_minute if enforce else 0,
+    )
 
 
 class ArchRouterPipeline:
-    def __init__(self, config: Config, api_key: str):
+    def __init__(
+        self,
+        config: Config,
+        api_key: str,
+        backend: Optional[LLMBackend] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         self.config = config
         self.api_key = api_key
 
-        self.data_processor = DataProcessor(
-            data_file="data/clinc150_uci/data_small.json", config=config
+        self.data_processor = DataProcessor(data_file=DEFAULT_DATA_FILE, config=config)
+        self.artifacts = ArtifactStore(config.artifact_dir) if config.artifact_dir else None
+        self.provenance = (
+            ProvenanceStore(config.provenance_db) if config.provenance_db else None
+        )
+        self._stream_writer = None
+        self._on_samples = None
+        self._streamed = False
+        self.partial = False
+
+        self.token_budget = TokenBudget(
+            enabled=config.adaptive_max_tokens,
+            tokens_per_turn=config.tokens_per_turn_estimate,
+            safety_margin=config.max_tokens_safety_margin,
+        )
+        self.spend_budget = SpendBudget(
+            max_requests=config.max_run_requests,
+            max_tokens=config.max_run_tokens,
+            max_cost=config.max_run_cost,
+            stage_limits=config.stage_budgets,
+            wind_down_at=config.budget_wind_down_at,
+            input_price_per_million_tokens=config.input_price_per_million_tokens,
+            output_price_per_million_tokens=config.output_price_per_million_tokens,
+        )
+        self.metrics = MetricsRecorder()
+        self.dataset_stats = DatasetStats()
+        self.tracer = Tracer(enabled=bool(config.trace_file))
+        # A scheduler passed in (e.g. by the daemon) paces several pipelines to one quota
+        self.scheduler = scheduler or make_scheduler(config)
+        self.llm_client = LLMClient(
+            api_key=api_key,
+            token_budget=self.token_budget,
+            coalesce=config.coalesce_requests,
+            max_concurrency=config.max_concurrency,
+            spend_budget=self.spend_budget,
+            metrics=self.metrics,
+            tracer=self.tracer,
+            # A backend passed in (e.g. shared by the daemon's jobs) keeps its connections warm
+            backend=backend
+            or make_backend(
+                config.llm_backend,
+                api_key,
+                config.api_base_url,
+                config.cassette_file,
+                endpoints=config.endpoints,
+            ),
+            stage_models=config.stage_models,
+            scheduler=self.scheduler,
+        )
+
+        self.speculation = SpeculativeAugmenter(
+            enabled=config.speculative_augmentation,
+            break_even=config.speculation_break_even,
+            min_observations=config.speculation_min_observations,
+            max_workers=max(2, config.max_concurrency),
+            metrics=self.metrics,
         )
 
         self.llm1 = LLM1PolicyGenerator(
@@ -23,6 +279,7 @@ class ArchRouterPipeline:
             model_name=config.model_name,
             temperature=config.policy_generation_temperature,
             max_tokens=config.policy_generation_max_tokens,
+            llm_client=self.llm_client,
         )
 
         self.llm2 = LLM2ConversationSynthesizer(
@@ -32,6 +289,10 @@ class ArchRouterPipeline:
             min_turns=config.min_conversation_turns,
             max_turns=config.max_conversation_turns,
             max_tokens=config.conversation_generation_max_tokens,
+            conversations_per_request=config.conversations_per_request,
+            use_n_sampling=config.use_n_sampling,
+            llm_client=self.llm_client,
+            seed=config.seed,
         )
 
         self.llm3 = LLM3AlignmentEvaluator(
@@ -40,6 +301,9 @@ class ArchRouterPipeline:
             temperature=config.evaluation_temperature,
             threshold=config.alignment_threshold,
             max_tokens=config.alignment_evaluation_max_tokens,
+            max_turns=config.evaluation_max_turns,
+            max_turn_chars=config.evaluation_max_turn_chars,
+            llm_client=self.llm_client,
         )
 
         self.augmentation = AugmentationModule(
@@ -47,48 +311,431 @@ class ArchRouterPipeline:
             model_name=config.model_name,
             temperature=config.conversation_temperature,
             max_tokens=config.augmentation_max_tokens,
+            paraphrase_probability=config.paraphrase_probability,
+            noise_probability=config.noise_probability,
+            irrelevant_probability=config.irrelevant_probability,
+            domain_mix_probability=config.domain_mix_probability,
+            domain_mix_partners=config.domain_mix_partners,
+            domain_mix_candidates=config.domain_mix_candidates,
+            llm_client=self.llm_client,
+            seed=config.seed,
         )
 
-    def run_pipeline(self) -> List[Dict]:
-        """Run the complete Arch-Router dataset generation pipeline."""
+    def stage_keys(self) -> Dict[str, str]:
+        """Compute every stage's artifact key.
+
+        A key hashes the upstream keys, the stage's Config fields and the
+        source of its prompt templates (plus the CLINC data file for the
+        first stage), so it is known before anything runs.
+        """
+        keys: Dict[str, str] = {}
+        for stage in STAGES:
+            extra = None
+            if stage == "intents":
+                extra = {"data_file": hash_file(self.data_processor.data_file)}
+            keys[stage] = compute_stage_key(
+                stage,
+                [keys[upstream] for upstream in STAGE_INPUTS[stage]],
+                {field: getattr(self.config, field) for field in STAGE_CONFIG_FIELDS[stage]},
+                [
+                    inspect.getsource(importlib.import_module(module))
+                    for module in STAGE_PROMPT_MODULES.get(stage, [])
+                ],
+                extra,
+            )
+        return keys
+
+    def _stage_functions(self) -> Dict[str, Callable]:
+        return {
+            "intents": self._run_intents_stage,
+            "policies": self._run_policies_stage,
+            "conversations": self._run_conversations_stage,
+            "scores": self._run_scores_stage,
+            "augmentations": self._run_augmentations_stage,
+            "final": self._run_final_stage,
+        }
+
+    def run_pipeline(
+        self,
+        writer: Optional[Union[ShardedDatasetWriter, ColumnarDatasetWriter]] = None,
+        on_samples: Optional[Callable[[List[Dict]], None]] = None,
+    ) -> List[Dict]:
+        """Run the complete Arch-Router dataset generation pipeline.
+
+        When a writer is given, final samples are written as soon as they are
+        augmented instead of only being returned at the end, and passed to
+        on_samples after each write. With
+        Config.artifact_dir set, every stage output is persisted under a
+        content hash and stages whose inputs did not change are reused.
+
+        Config.speculative_augmentation has no effect here: scores and
+        augmentations are separate stages with their own artifacts.
+
+        If the spend budget refuses work, the remaining stages run on what
+        was completed, nothing from the affected stages is saved as an
+        artifact, and the writer is closed with a partial-run manifest.
+        """
         print("Starting Arch-Router dataset generation pipeline...")
         print(f"Target dataset size: {self.config.target_dataset_size} samples")
+        if self.config.speculative_augmentation:
+            print(
+                "Note: speculative_augmentation only applies to queue workers and top-ups; "
+                "this run scores all conversations before augmenting them"
+            )
 
-        print("Step 1: Processing CLINC150 data...")
-        intents = self.data_processor.process_intents()
-        print(f"Processed {len(intents)} intents with examples")
+        keys = self.stage_keys() if self.artifacts is not None else {}
+        functions = self._stage_functions()
+        # Samples can only be streamed while augmenting; reused artifacts are written at the end
+        self._stream_writer = writer
+        self._on_samples = on_samples
+        self._streamed = False
+        self.dataset_stats = DatasetStats()
+        outputs: Dict[str, Any] = {}
+        self.partial = False
+
+        for step, stage in enumerate(STAGES, 1):
+            print(f"Step {step}: {STAGE_TITLES[stage]}...")
+            upstream = [outputs[name] for name in STAGE_INPUTS[stage]]
+            if self.artifacts is not None and self.artifacts.exists(stage, keys[stage]):
+                print(f"Reusing {stage} artifact {keys[stage][:12]}")
+                with self.metrics.stage_timer(stage, reused=True):
+                    with self.tracer.span(stage, "stage", reused=True):
+                        outputs[stage] = stage_from_artifact(
+                            stage, self.artifacts.load(stage, keys[stage])
+                        )
+                continue
+
+            refusals = self.spend_budget.refusals
+            with self.metrics.stage_timer(stage), self.tracer.span(stage, "stage"):
+                outputs[stage] = functions[stage](*upstream)
+            if self.spend_budget.refusals > refusals:
+                self.partial = True
+            if self.artifacts is not None and not self.partial:
+                self.artifacts.save(stage, keys[stage], stage_to_artifact(stage, outputs[stage]))
+
+        # Samples are only expanded into dicts at the return boundary
+        final_dataset = list(outputs.pop("final").iter_records())
+        outputs.pop("augmentations")
+        if not self._streamed:
+            self.dataset_stats.add_many(final_dataset)
+        if writer is not None and not self._streamed:
+            writer.write_many(final_dataset)
+            if on_samples is not None:
+                on_samples(final_dataset)
+        if isinstance(writer, ShardedDatasetWriter):
+            # Kept in the manifest so a later top-up reuses these policies
+            writer.metadata["policies"] = policies_by_intent(
+                outputs["intents"], outputs["policies"]
+            )
+        self._stream_writer = None
+        self._on_samples = None
 
-        # Convert to format for LLM-1
-        intents_data = []
-        for intent in intents:
-            intents_data.append(
-                {"intent_name": intent.intent_name, "examples": intent.examples}
+        print(
+            f"Generated {len(final_dataset)} final samples (target: {self.config.target_dataset_size})"
+        )
+        print(format_stats(self.dataset_stats.summary()))
+        stats = self.llm_client.get_stats()
+        print(f"LLM calls: {stats['calls']} ({stats['coalesced_calls']} saved by coalescing)")
+        for name, endpoint in self.llm_client.backend.stats().get("endpoints", {}).items():
+            print(
+                f"  {name}: {endpoint['requests']} requests, {endpoint['failures']} failures, "
+                f"{endpoint['rate_limits']} rate limited"
+            )
+        if self.scheduler.enabled:
+            scheduling = self.scheduler.get_stats()
+            utilization = scheduling.get("utilization")
+            print(
+                f"Scheduler ({scheduling['policy']}): mean wait {scheduling['mean_wait_seconds']:.2f}s"
+                + (f", token quota utilization {utilization:.0%}" if utilization is not None else "")
             )
+        spend = self.spend_budget.get_stats()
+        print(
+            f"Spent {spend['total']['tokens']:.0f} tokens (${spend['total']['cost']:.4f}) "
+            f"in {spend['total']['requests']:.0f} requests"
+        )
+        if self.partial:
+            print(f"Budget limits reached, refused requests: {spend['refused']}")
+            if writer is not None:
+                writer.close(complete=False, extra={"partial": True, "budget": spend})
+        self.write_metrics()
+        return final_dataset
+
+    def close(self):
+        """Close the LLM backend and the provenance store."""
+        self.speculation.close()
+        self.llm_client.close()
+        if self.provenance is not None:
+            self.provenance.close()
+
+    def write_metrics(self, stats: bool = True):
+        """Write the run report, Prometheus snapshot and trace to the configured paths.
+
+        stats=False skips the dataset statistics, for runs that produce no samples.
+        """
+        if self.config.metrics_report:
+            self.metrics.write_json(self.config.metrics_report)
+            print(f"Run report saved to {self.config.metrics_report}")
+        if self.config.metrics_prometheus:
+            self.metrics.write_prometheus(self.config.metrics_prometheus)
+            print(f"Prometheus metrics saved to {self.config.metrics_prometheus}")
+        if stats and self.config.stats_report:
+            self.dataset_stats.write_json(self.config.stats_report)
+            print(f"Dataset statistics saved to {self.config.stats_report}")
+        if self.config.trace_file:
+            self.tracer.write(self.config.trace_file)
+            print(f"Trace saved to {self.config.trace_file} (open in https://ui.perfetto.dev)")
+
+    def run_stage(self, stage: str) -> Any:
+        """Run a single stage against existing upstream artifacts and persist its output."""
+        if self.artifacts is None:
+            raise ValueError("Running a single stage requires Config.artifact_dir")
+        if stage not in STAGE_INPUTS:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {STAGES}")
+
+        keys = self.stage_keys()
+        upstream = []
+        for name in STAGE_INPUTS[stage]:
+            if not self.artifacts.exists(name, keys[name]):
+                raise FileNotFoundError(
+                    f"Missing upstream artifact '{name}' ({keys[name][:12]}), run that stage first"
+                )
+            upstream.append(stage_from_artifact(name, self.artifacts.load(name, keys[name])))
+
+        self._stream_writer = None
+        with self.metrics.stage_timer(stage), self.tracer.span(stage, "stage"):
+            output = self._stage_functions()[stage](*upstream)
+        self.artifacts.save(stage, keys[stage], stage_to_artifact(stage, output))
+        print(f"Saved {stage} artifact {keys[stage][:12]}")
+        # Only the final stage's output is samples; other stages keep an existing stats report
+        if stage == "final":
+            self.dataset_stats = DatasetStats()
+            self.dataset_stats.add_many(output.iter_records())
+        self.write_metrics(stats=stage == "final")
+        return output
+
+    def top_up(self, output_file: str = "") -> int:
+        """Grow an existing JSONL dataset to Config.target_dataset_size.
+
+        Existing samples are counted per intent and augmentation type against
+        the distribution a fresh run would aim for, and only the missing
+        samples are generated and appended as new shards. Intents that were
+        used before keep the policies stored in the dataset manifest.
+        Returns the number of samples appended.
+        """
+        output_file = output_file or self.config.output_file
+        if self.config.output_format != "jsonl":
+            raise ValueError("Top-up is only supported for JSONL output")
+        if not os.path.exists(output_file) and not read_manifest(output_file):
+            raise FileNotFoundError(f"No existing dataset at {output_file}")
+
+        intents_data = select_intents_data(
+            self.data_processor.process_intents(), self.config
+        )
+        intent_names = [intent_data["intent_name"] for intent_data in intents_data]
+        stored = read_manifest(output_file).get("metadata", {}).get("policies", {})
+        if not stored:
+            stored = self._recover_policies(output_file, intent_names)
+
+        policies: Dict[str, Policy] = {}
+        for intent_data in intents_data:
+            name = intent_data["intent_name"]
+            if name in stored:
+                policies[name] = Policy(**stored[name])
+            else:
+                policies[name] = self.llm1.generate_policy(name, intent_data["examples"])
+        print(f"Reusing {len(stored)} policies, generated {len(policies) - len(stored)} new")
+
+        policy_intents = {
+            (policy.domain, policy.action): name for name, policy in policies.items()
+        }
+        existing = count_existing(iter_dataset_records(output_file), policy_intents)
+        intent_deficits, global_deficits = compute_deficits(
+            requested_distribution(self.config, intent_names), existing
+        )
+        remaining = self.config.target_dataset_size - existing[2]
+        print(f"Existing samples: {existing[2]}, missing: {max(0, remaining)}")
+        if remaining <= 0:
+            return 0
+
+        sources: List[Conversation] = []
+        appended = 0
+        # The statistics report describes the samples appended by this top-up
+        self.dataset_stats = DatasetStats()
+        with self.open_writer(output_file, append=True) as writer:
+            writer.metadata["policies"] = {
+                **stored,
+                **{name: policy.model_dump() for name, policy in policies.items()},
+            }
+
+            def write(variants: List[AugmentedConversation], source: Conversation) -> int:
+                nonlocal appended
+                samples = self._format_final_dataset(variants[: remaining - appended])
+                writer.write_many(samples)
+                self.dataset_stats.add_many(samples)
+                if self.provenance is not None:
+                    self.provenance.record_variants(variants, source)
+                appended += len(samples)
+                return len(samples)
+
+            for name in intent_names:
+                deficits = intent_deficits[name]
+                attempts = 2 * max(deficits.values(), default=0)
+                # Start past the indices of the conversations already in the dataset
+                index = self.config.conversations_per_policy + existing[0].get(
+                    name, {}
+                ).get("original", 0)
+                while any(deficits.values()) and attempts > 0 and appended < remaining:
+                    attempts -= 1
+                    conversation = self.llm2.generate_conversation(policies[name], index)
+                    index += 1
+                    wanted = [t for t in POLICY_TYPES if deficits.get(t, 0) > 0]
+                    score, variants = self.speculation.run(
+                        partial(self.llm3.evaluate_alignment, conversation),
+                        partial(self.augmentation.create_typed_variants, conversation, wanted),
+                    )
+                    if self.provenance is not None:
+                        self.provenance.record_scored([conversation], [score])
+                    if not score.is_aligned:
+                        continue
+
+                    sources.append(conversation)
+                    for variant in variants:
+                        deficits[variant.augmentation_type] -= 1
+                    write(variants, conversation)
+
+            if not sources:
+                sources = [
+                    Conversation(
+                        turns=record["conversation"],
+                        domain=record["domain"],
+                        action=record["action"],
+                        description=record["description"],
+                    )
+                    for record in iter_dataset_records(output_file)
+                    if record.get("augmentation_type") == "original"
+                ]
+            self._top_up_negatives(sources, global_deficits, write)
+
+        print(f"Appended {appended} samples to {writer.output_file}")
+        if self.speculation.enabled:
+            print(format_speculation(self.speculation.summary()))
+        self.write_metrics()
+        return appended
+
+    def _recover_policies(self, output_file: str, intent_names: List[str]) -> Dict[str, Dict]:
+        """Recover policies from a dataset whose manifest doesn't store them.
+
+        The pipeline writes samples in policy order and policies follow the
+        sorted intent selection, so distinct policies of original samples are
+        matched to intents in order. A policy whose conversations were all
+        rejected shifts the matching, which only affects balance, not data.
+        """
+        recovered: List[Dict] = []
+        seen = set()
+        for record in iter_dataset_records(output_file):
+            if record.get("augmentation_type") != "original":
+                continue
+            key = (record["domain"], record["action"])
+            if key not in seen:
+                seen.add(key)
+                recovered.append(
+                    {
+                        "domain": record["domain"],
+                        "action": record["action"],
+                        "description": record["description"],
+                    }
+                )
+        print(f"No stored policies, matched {len(recovered[: len(intent_names)])} from samples")
+        return dict(zip(intent_names, recovered))
+
+    def _top_up_negatives(
+        self,
+        sources: List[Conversation],
+        deficits: Dict[str, int],
+        write: Callable[[List[AugmentedConversation], Conversation], int],
+    ):
+        """Generate missing irrelevant and domain-mixed samples from source conversations."""
+        if not sources:
+            return
+        by_domain: Dict[str, List[Conversation]] = {}
+        for conversation in sources:
+            by_domain.setdefault(conversation.domain, []).append(conversation)
+        domains = sorted(by_domain)
+        for augmentation_type, missing in deficits.items():
+            attempts = 2 * missing
+            index = 0
+            while missing > 0 and attempts > 0:
+                attempts -= 1
+                conversation = sources[index % len(sources)]
+                index += 1
+                if augmentation_type == "domain_mix":
+                    if len(domains) < 2:
+                        break
+                    # Cycle through the other domains, never the conversation's own
+                    offset = 1 + index % (len(domains) - 1)
+                    other_domain = domains[
+                        (domains.index(conversation.domain) + offset) % len(domains)
+                    ]
+                    candidates = by_domain[other_domain]
+                    other = candidates[index % len(candidates)]
+                    try:
+                        variants = [
+                            self.augmentation.create_domain_mixed_conversation(
+                                conversation, other
+                            )
+                        ]
+                    except Exception as e:
+                        print(f"Domain mixing failed: {e}")
+                        continue
+                else:
+                    variants = self.augmentation.create_typed_variants(
+                        conversation, [augmentation_type]
+                    )
+                if variants and not write(variants, conversation):
+                    return
+                missing -= len(variants)
+
+    def _run_intents_stage(self) -> List[Dict]:
+        intents = self.data_processor.process_intents()
+        print(f"Processed {len(intents)} intents with examples")
 
-        # Limit intents based on target dataset size
-        max_intents_needed = min(
-            len(intents_data), self.config.target_dataset_size // 2
-        )  # Rough estimate
-        intents_data = intents_data[:max_intents_needed]
+        intents_data = select_intents_data(intents, self.config)
         print(f"Using {len(intents_data)} intents for target size")
+        return intents_data
 
-        print("Step 2: Generating policies with LLM-1...")
+    def _run_policies_stage(self, intents_data: List[Dict]) -> List[Dict]:
         policies = self.llm1.generate_policies_batch(intents_data)
         print(f"Generated {len(policies)} policies")
+        return [policy.model_dump() for policy in policies]
 
-        print("Step 3: Generating conversations with LLM-2...")
-        conversations = self.llm2.generate_conversations_batch(policies)
+    def _run_conversations_stage(self, policies: List[Dict]) -> List[Dict]:
+        conversations = self.llm2.generate_conversations_batch(
+            [Policy(**policy) for policy in policies],
+            self.config.conversations_per_policy,
+        )
         print(f"Generated {len(conversations)} conversations")
-
-        print("Step 4: Evaluating alignment with LLM-3...")
-        alignment_scores = self.llm3.evaluate_batch(conversations)
-
+        return [conversation.model_dump() for conversation in conversations]
+
+    def _run_scores_stage(self, conversations: List[Dict]) -> List[Dict]:
+        conversation_models = [
+            Conversation(**conversation) for conversation in conversations
+        ]
+        alignment_scores = self.llm3.evaluate_batch(conversation_models)
+        if self.provenance is not None:
+            self.provenance.record_scored(conversation_models, alignment_scores)
+        return [score.model_dump() for score in alignment_scores]
+
+    def _run_augmentations_stage(
+        self, conversations: List[Dict], scores: List[Dict]
+    ) -> ConversationStore:
         aligned_conversations = []
         rejected_conversations = []
 
-        for conv, score in zip(conversations, alignment_scores):
-            if score.is_aligned:
-                aligned_conversations.append(conv)
+        # Alignment is re-derived from the stored score so that changing the
+        # threshold doesn't invalidate the scores artifact
+        for conv, score in zip(conversations, scores):
+            if score["score"] >= self.config.alignment_threshold:
+                aligned_conversations.append(Conversation(**conv))
             else:
                 rejected_conversations.append(conv)
 
@@ -96,56 +743,69 @@ class ArchRouterPipeline:
             f"Aligned: {len(aligned_conversations)}, Rejected: {len(rejected_conversations)}"
         )
 
-        print("Step 5: Applying augmentations (branching approach)...")
+        # Variants go straight into the compact store; no list of models is kept
+        store = ConversationStore()
+        callbacks = [store.extend_augmented]
+        if self._stream_writer is not None:
+            callbacks.append(self._stream_to(self._stream_writer, self._on_samples))
+            self._streamed = True
+        if self.provenance is not None:
+            callbacks.append(self.provenance.record_variants)
+
+        def on_variants(variants: List):
+            for callback in callbacks:
+                callback(variants)
+
         # Use the new branching augmentation approach
-        augmented_conversations = self.augmentation.augment_conversations(
-            aligned_conversations
+        self.augmentation.augment_conversations(
+            aligned_conversations, on_variants=on_variants, collect=False
         )
 
         # Optional: Use domain mixing for additional negative samples
         if hasattr(self.config, "use_domain_mixing") and self.config.use_domain_mixing:
             print("Step 5b: Adding domain mixing for negative samples...")
-            mixed_conversations = self.augmentation.augment_conversations_with_mixing(
-                aligned_conversations
+            self.augmentation.augment_conversations_with_mixing(
+                aligned_conversations, on_variants=on_variants, collect=False
             )
-            augmented_conversations.extend(mixed_conversations)
 
-        print("Step 6: Formatting final dataset...")
+        return store
 
+    def _run_final_stage(self, augmented: ConversationStore) -> ConversationStore:
         # Show augmentation statistics
-        self._show_augmentation_stats(augmented_conversations)
-
-        final_dataset = self._format_final_dataset(augmented_conversations)
-
-        # Limit to target dataset size
-        if len(final_dataset) > self.config.target_dataset_size:
-            final_dataset = final_dataset[: self.config.target_dataset_size]
-            print(f"Limited dataset to target size: {len(final_dataset)} samples")
-
-        print(
-            f"Generated {len(final_dataset)} final samples (target: {self.config.target_dataset_size})"
-        )
-        return final_dataset
+        self._show_augmentation_stats(augmented)
+
+        # Limit to target dataset size (in place; the store has no other consumer)
+        if len(augmented) > self.config.target_dataset_size:
+            augmented.truncate(self.config.target_dataset_size)
+            print(f"Limited dataset to target size: {len(augmented)} samples")
+
+        return augmented
+
+    def _stream_to(
+        self,
+        writer: Union[ShardedDatasetWriter, ColumnarDatasetWriter],
+        on_samples: Optional[Callable[[List[Dict]], None]] = None,
+    ) -> Callable:
+        """Return an augmentation callback that writes samples up to the target size."""
+        streamed = 0
+
+        def on_variants(variants: List):
+            nonlocal streamed
+            remaining = self.config.target_dataset_size - streamed
+            if remaining <= 0:
+                return
+            samples = self._format_final_dataset(variants[:remaining])
+            writer.write_many(samples)
+            self.dataset_stats.add_many(samples)
+            streamed += len(samples)
+            if on_samples is not None:
+                on_samples(samples)
+
+        return on_variants
 
     def _format_final_dataset(self, augmented_conversations: List) -> List[Dict]:
         """Format augmented conversations into final dataset format."""
-        dataset = []
-
-        for aug_conv in augmented_conversations:
-            conversation_data = {
-                "conversation": [
-                    {"role": turn.role, "content": turn.content}
-                    for turn in aug_conv.conversation.turns
-                ],
-                "domain": aug_conv.conversation.domain,
-                "action": aug_conv.conversation.action,
-                "description": aug_conv.conversation.description,
-                "label_score": aug_conv.label_score,
-                "augmentation_type": aug_conv.augmentation_type,
-            }
-            dataset.append(conversation_data)
-
-        return dataset
+        return [format_sample(aug_conv) for aug_conv in augmented_conversations]
 
     def _show_augmentation_stats(self, augmented_conversations: List):
         """Show statistics about the augmentation results."""
@@ -165,17 +825,20 @@ class ArchRouterPipeline:
 
         # Show label score distribution
         label_scores = [aug_conv.label_score for aug_conv in augmented_conversations]
-        avg_score = sum(label_scores) / len(label_scores)
-        print(f"Average label score: {avg_score:.3f}")
+        if label_scores:
+            avg_score = sum(label_scores) / len(label_scores)
+            print(f"Average label score: {avg_score:.3f}")
         print("=" * 35)
 
-    def save_dataset(self, dataset: List[Dict], output_file: str = ""):
-        """Save dataset to JSONL file."""
-        if not output_file:
-            output_file = self.config.output_file
+    def open_writer(
+        self, output_file: str = "", append: bool = False
+    ) -> Union[ShardedDatasetWriter, ColumnarDatasetWriter]:
+        """Open a streaming dataset writer configured from Config output settings."""
+        return open_dataset_writer(self.config, output_file, append)
 
-        with open(output_file, "w") as f:
-            for item in dataset:
-                f.write(json.dumps(item) + "\n")
+    def save_dataset(self, dataset: List[Dict], output_file: str = ""):
+        """Save dataset as (optionally sharded and compressed) JSONL, Parquet or Arrow."""
+        with self.open_writer(output_file) as writer:
+            writer.write_many(dataset)
 
-        print(f"Dataset saved to {output_file}")
+        print(f"Dataset saved to {writer.output_file}")
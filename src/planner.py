@@ -0,0 +1,238 @@
+import math
+from typing import List
+
+from src.config import Config
+from src.models.conversation import Conversation, ConversationTurn
+from src.models.plan import RunPlan, StageEstimate
+from src.phase1.data_processor import DataProcessor
+from src.phase2.augmentation_module import IRRELEVANT_CONVERSATION_TURNS, NOISE_EXTRA_TURNS
+from src.pipeline import DEFAULT_DATA_FILE, select_intents_data
+from src.prompts.llm1_policy_generator import get_policy_generation_prompt
+from src.prompts.llm2_conversation_synthesizer import (
+    get_conversation_generation_prompt,
+    get_multi_conversation_generation_prompt,
+)
+from src.prompts.llm3_alignment_evaluator import get_alignment_evaluation_prompt
+from src.prompts.phase2_paraphrase import (
+    get_domain_mixing_prompt,
+    get_irrelevant_conversation_prompt,
+    get_noise_injection_prompt,
+    get_selective_paraphrase_prompt,
+)
+from src.utils.conversation_formatter import format_conversation, format_conversation_compact
+from src.utils.spend_budget import CHARS_PER_TOKEN, estimate_tokens
+from src.utils.topup import type_weights
+
+# Typical completion lengths of the JSON answers of LLM-1 and LLM-3
+POLICY_OUTPUT_TOKENS = 80
+EVALUATION_OUTPUT_TOKENS = 60
+# Stand-in for a policy description, which only exists after LLM-1 has run
+PLACEHOLDER_DESCRIPTION = (
+    "Handles user requests for this action: understands what the user wants, "
+    "asks for any missing details, performs the action and confirms the result."
+)
+
+
+def _sample_conversation(
+    domain: str, action: str, num_turns: int, tokens_per_turn: int
+) -> Conversation:
+    """Conversation of typical length used to render per-conversation prompts."""
+    return Conversation(
+        turns=[
+            ConversationTurn(
+                role="user" if i % 2 == 0 else "assistant",
+                content="x" * (tokens_per_turn * CHARS_PER_TOKEN),
+            )
+            for i in range(num_turns)
+        ],
+        domain=domain,
+        action=action,
+        description=PLACEHOLDER_DESCRIPTION,
+    )
+
+
+def _stage_seconds(
+    config: Config, calls: float, input_tokens: float, output_tokens: float
+) -> float:
+    """Wall-clock time of a stage: the slowest of latency, request and token limits."""
+    if calls <= 0:
+        return 0.0
+    per_call = config.request_overhead_seconds
+    if config.output_tokens_per_second > 0:
+        per_call += output_tokens / calls / config.output_tokens_per_second
+    seconds = calls * per_call / max(1, config.max_concurrency)
+    if config.requests_per_minute > 0:
+        seconds = max(seconds, calls / config.requests_per_minute * 60)
+    if config.tokens_per_minute > 0:
+        seconds = max(seconds, (input_tokens + output_tokens) / config.tokens_per_minute * 60)
+    return seconds
+
+
+def _estimate(
+    config: Config, stage: str, calls: float, input_tokens: float, output_tokens: float
+) -> StageEstimate:
+    cost = (
+        input_tokens * config.input_price_per_million_tokens
+        + output_tokens * config.output_price_per_million_tokens
+    ) / 1_000_000
+    return StageEstimate(
+        stage=stage,
+        calls=round(calls),
+        input_tokens=round(input_tokens),
+        output_tokens=round(output_tokens),
+        seconds=round(_stage_seconds(config, calls, input_tokens, output_tokens), 1),
+        cost=round(cost, 4),
+    )
+
+
+def build_plan(
+    config: Config, data_file: str = DEFAULT_DATA_FILE, acceptance_rate: float = 0.9
+) -> RunPlan:
+    """Estimate calls, tokens, time and cost of a run without sending requests.
+
+    Prompts are rendered with the real prompt templates for the selected
+    intents. Turn counts are taken at the middle of the configured range,
+    augmentation calls follow the configured probabilities and
+    acceptance_rate is the assumed share of conversations passing LLM-3.
+    """
+    processor = DataProcessor(data_file=data_file, config=config)
+    intents_data = select_intents_data(processor.process_intents(), config)
+    tokens_per_turn = config.tokens_per_turn_estimate
+    mean_turns = (config.min_conversation_turns + config.max_conversation_turns) / 2
+    typical_turns = max(1, round(mean_turns))
+
+    per_policy = max(1, config.conversations_per_policy)
+    k = max(1, config.conversations_per_request)
+    requests_per_policy = 1 if per_policy <= 1 and k <= 1 else math.ceil(per_policy / k)
+    conversations = len(intents_data) * per_policy
+
+    stages: List[StageEstimate] = []
+    policy_inputs = 0
+    conversation_inputs = 0
+    evaluation_inputs = 0
+    irrelevant_inputs = 0
+    sample = _sample_conversation("general", "chat", typical_turns, tokens_per_turn)
+    for intent_data in intents_data:
+        name = intent_data["intent_name"]
+        domain, action = processor.extract_domain_action(name)
+        policy_inputs += estimate_tokens(
+            get_policy_generation_prompt(name, intent_data["examples"])
+        )
+        if k > 1 and not config.use_n_sampling:
+            prompt = get_multi_conversation_generation_prompt(
+                PLACEHOLDER_DESCRIPTION, domain, action, [typical_turns] * min(k, per_policy)
+            )
+        else:
+            prompt = get_conversation_generation_prompt(
+                PLACEHOLDER_DESCRIPTION, domain, action, typical_turns
+            )
+        conversation_inputs += requests_per_policy * estimate_tokens(prompt)
+
+        sample = _sample_conversation(domain, action, typical_turns, tokens_per_turn)
+        evaluation_inputs += per_policy * estimate_tokens(
+            get_alignment_evaluation_prompt(
+                format_conversation_compact(
+                    sample, config.evaluation_max_turns, config.evaluation_max_turn_chars
+                ),
+                sample.description,
+                domain,
+                action,
+            )
+        )
+        irrelevant_inputs += per_policy * estimate_tokens(
+            get_irrelevant_conversation_prompt(domain, action)
+        )
+
+    stages.append(
+        _estimate(
+            config,
+            "policies",
+            len(intents_data),
+            policy_inputs,
+            len(intents_data) * POLICY_OUTPUT_TOKENS,
+        )
+    )
+    stages.append(
+        _estimate(
+            config,
+            "conversations",
+            len(intents_data) * requests_per_policy,
+            conversation_inputs,
+            conversations * mean_turns * tokens_per_turn,
+        )
+    )
+    stages.append(
+        _estimate(
+            config,
+            "scores",
+            conversations,
+            evaluation_inputs,
+            conversations * EVALUATION_OUTPUT_TOKENS,
+        )
+    )
+
+    aligned = conversations * acceptance_rate
+    weights = type_weights(config)
+    # Per-conversation augmentation prompts differ only in the conversation
+    sample_text = format_conversation(sample)
+    augmentation_inputs = {
+        "paraphrase": estimate_tokens(get_selective_paraphrase_prompt(sample_text, [0])),
+        "noise": estimate_tokens(get_noise_injection_prompt(sample_text)),
+        "irrelevant": irrelevant_inputs / conversations if conversations else 0,
+        "domain_mix": estimate_tokens(
+            get_domain_mixing_prompt(sample, sample)
+        ),
+    }
+    augmentation_outputs = {
+        "paraphrase": mean_turns,
+        "noise": mean_turns + NOISE_EXTRA_TURNS,
+        "irrelevant": IRRELEVANT_CONVERSATION_TURNS,
+        "domain_mix": 2 * mean_turns,
+    }
+    for augmentation_type, per_call_input in augmentation_inputs.items():
+        if augmentation_type not in weights:
+            continue
+        calls = aligned * weights[augmentation_type]
+        stages.append(
+            _estimate(
+                config,
+                augmentation_type,
+                calls,
+                calls * per_call_input,
+                calls * augmentation_outputs[augmentation_type] * tokens_per_turn,
+            )
+        )
+
+    expected_samples = min(config.target_dataset_size, round(aligned * sum(weights.values())))
+    return RunPlan(
+        model_name=config.model_name,
+        intents=len(intents_data),
+        conversations=conversations,
+        expected_samples=expected_samples,
+        stages=stages,
+        total_calls=sum(stage.calls for stage in stages),
+        total_input_tokens=sum(stage.input_tokens for stage in stages),
+        total_output_tokens=sum(stage.output_tokens for stage in stages),
+        total_seconds=round(sum(stage.seconds for stage in stages), 1),
+        total_cost=round(sum(stage.cost for stage in stages), 4),
+    )
+
+
+def format_plan(plan: RunPlan) -> str:
+    """Render a plan as a text table."""
+    lines = [
+        f"Model: {plan.model_name}  Intents: {plan.intents}  "
+        f"Conversations: {plan.conversations}  Expected samples: {plan.expected_samples}",
+        f"{'Stage':<14} {'Calls':>8} {'Input tok':>12} {'Output tok':>12} "
+        f"{'Time (s)':>10} {'Cost ($)':>10}",
+    ]
+    for stage in plan.stages:
+        lines.append(
+            f"{stage.stage:<14} {stage.calls:>8} {stage.input_tokens:>12} "
+            f"{stage.output_tokens:>12} {stage.seconds:>10.1f} {stage.cost:>10.4f}"
+        )
+    lines.append(
+        f"{'total':<14} {plan.total_calls:>8} {plan.total_input_tokens:>12} "
+        f"{plan.total_output_tokens:>12} {plan.total_seconds:>10.1f} {plan.total_cost:>10.4f}"
+    )
+    return "\n".join(lines)
@@ -2,18 +2,17 @@ from typing import List
 
 
 def get_policy_generation_prompt(intent_name: str, examples: List[str]) -> str:
-    """Generate prompt for LLM-1 policy generation."""
+    """Generate prompt for LLM-1 policy generation.
+
+    Static instructions come first and the intent-specific content last so
+    that requests share a cacheable prompt prefix.
+    """
     examples_text = "\n".join([f"- {example}" for example in examples])
 
     return f"""
-Analyze the following intent and examples to determine the domain, action, and policy description.
-
-Intent Name: {intent_name}
-
-Examples:
-{examples_text}
+Analyze the intent and examples given at the end to determine the domain, action, and policy description.
 
-Based on the examples above, determine:
+Based on the examples, determine:
 1. The domain (e.g., travel, banking, food, entertainment, etc.)
 2. The action (what the user wants to accomplish)
 3. A clear policy description
@@ -23,4 +22,9 @@ Return only a JSON object with this exact format:
 
 Example output:
 {{"domain": "travel", "action": "book_flight", "description": "Assist users in booking flights by searching available options, comparing prices, and completing reservations."}}
+
+Intent Name: {intent_name}
+
+Examples:
+{examples_text}
 """
@@ -1,15 +1,15 @@
 def get_conversation_generation_prompt(
     policy_description: str, domain: str, action: str, num_turns: int
 ) -> str:
-    """Generate prompt for LLM-2 conversation synthesis."""
+    """Generate prompt for LLM-2 conversation synthesis.
+
+    Static instructions come first and the policy-specific content last so
+    that requests share a cacheable prompt prefix.
+    """
     return f"""
 Generate a realistic conversation between a user and an AI assistant.
 
-Policy: {policy_description}
-Domain: {domain}
-Action: {action}
-
-Create a conversation with exactly {num_turns} turns where:
+Create a conversation with exactly the number of turns given at the end where:
 1. The user initiates with a request related to the policy
 2. The assistant responds appropriately
 3. The conversation flows naturally and follows the policy
@@ -28,4 +28,52 @@ Example output:
     {{"role": "user", "content": "Friday would work best for me"}},
     {{"role": "assistant", "content": "Great! I found several flights for Friday. Would you prefer morning or evening departure?"}}
 ]
+
+Policy: {policy_description}
+Domain: {domain}
+Action: {action}
+Number of turns: {num_turns}
+"""
+
+
+def get_multi_conversation_generation_prompt(
+    policy_description: str, domain: str, action: str, turn_counts: list
+) -> str:
+    """Generate prompt for LLM-2 to synthesize several conversations in one call."""
+    return f"""
+Generate several distinct, realistic conversations between a user and an AI assistant.
+
+Create one conversation for each entry in the turn counts given at the end where:
+1. Each conversation has exactly the number of turns listed for it, in the same order
+2. The user initiates with a request related to the policy
+3. The conversations differ from each other in the user's situation, details and phrasing
+4. Each conversation flows naturally and follows the policy
+
+Return the conversations as a JSON array where each element is a JSON array of turns:
+[
+    [
+        {{"role": "user", "content": "user message"}},
+        {{"role": "assistant", "content": "assistant response"}},
+        ...
+    ],
+    ...
+]
+
+Example output for turn counts [2, 3]:
+[
+    [
+        {{"role": "user", "content": "I need to book a flight to New York next week"}},
+        {{"role": "assistant", "content": "I can help you book a flight to New York. What date would you prefer to travel?"}}
+    ],
+    [
+        {{"role": "user", "content": "Can you find me a cheap flight to Denver?"}},
+        {{"role": "assistant", "content": "Sure! When are you planning to fly and from which city?"}},
+        {{"role": "user", "content": "From Chicago, sometime this weekend"}}
+    ]
+]
+
+Policy: {policy_description}
+Domain: {domain}
+Action: {action}
+Turn counts: {turn_counts}
 """
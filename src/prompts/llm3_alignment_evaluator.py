@@ -1,16 +1,13 @@
 def get_alignment_evaluation_prompt(
     conversation_text: str, policy_description: str, domain: str, action: str
 ) -> str:
-    """Generate prompt for LLM-3 alignment evaluation."""
-    return f"""
-Evaluate how well this conversation aligns with the given policy.
-
-Policy: {policy_description}
-Domain: {domain}
-Action: {action}
+    """Generate prompt for LLM-3 alignment evaluation.
 
-Conversation:
-{conversation_text}
+    Static instructions come first and the conversation-specific content last
+    so that requests share a cacheable prompt prefix.
+    """
+    return f"""
+Evaluate how well the conversation given at the end aligns with the given policy.
 
 Rate the alignment on a scale of 0.0 to 1.0 where:
 - 1.0 = Perfect alignment, conversation follows policy exactly
@@ -23,4 +20,11 @@ Return a JSON object:
 
 Example output:
 {{"score": 0.92, "reasoning": "Conversation follows the policy well, user asks for flight booking and assistant provides relevant help", "is_aligned": true}}
+
+Policy: {policy_description}
+Domain: {domain}
+Action: {action}
+
+Conversation:
+{conversation_text}
 """
@@ -1,6 +1,9 @@
 from src.utils.conversation_formatter import format_conversation
 from typing import List
 
+# Every prompt below keeps its static instructions first and the per-call
+# content last so that requests share a cacheable prompt prefix.
+
 
 def get_noise_injection_prompt(conversation_text: str) -> str:
     """Generate prompt for noise injection into conversation."""
@@ -12,9 +15,6 @@ IMPORTANT RULES:
 3. Make noise turns sound natural and believable
 4. Return ONLY a valid JSON array, no other text
 
-Original conversation:
-{conversation_text}
-
 Return the conversation with noise injected as a JSON array:
 [
     {{"role": "user", "content": "original or noisy message"}},
@@ -22,6 +22,9 @@ Return the conversation with noise injected as a JSON array:
     ...
 ]
 
+Original conversation:
+{conversation_text}
+
 JSON Response:"""
 
 
@@ -35,9 +38,6 @@ IMPORTANT RULES:
 3. Avoid any reference to the given domain or action
 4. Return ONLY a valid JSON array, no other text
 
-Domain to avoid: {domain}
-Action to avoid: {action}
-
 Return an irrelevant conversation as a JSON array:
 [
     {{"role": "user", "content": "irrelevant user message"}},
@@ -45,6 +45,9 @@ Return an irrelevant conversation as a JSON array:
     ...
 ]
 
+Domain to avoid: {domain}
+Action to avoid: {action}
+
 JSON Response:"""
 
 
@@ -52,7 +55,7 @@ def get_selective_paraphrase_prompt(
     conversation_text: str, selected_indices: List[int]
 ) -> str:
     """Generate prompt for selective paraphrasing of specific user turns."""
-    return f"""You are a conversation paraphrasing expert. Your task is to paraphrase ONLY the user turns at positions {selected_indices} in the given conversation.
+    return f"""You are a conversation paraphrasing expert. Your task is to paraphrase ONLY the user turns at the given positions in the given conversation.
 
 IMPORTANT RULES:
 1. Only paraphrase the user turns at the specified positions
@@ -60,9 +63,6 @@ IMPORTANT RULES:
 3. Maintain the same conversation flow and meaning
 4. Return ONLY a valid JSON array, no other text
 
-Original conversation:
-{conversation_text}
-
 Return the conversation as a JSON array with only the specified user turns paraphrased:
 [
     {{"role": "user", "content": "paraphrased or original user message"}},
@@ -70,6 +70,11 @@ Return the conversation as a JSON array with only the specified user turns parap
     ...
 ]
 
+Positions to paraphrase: {selected_indices}
+
+Original conversation:
+{conversation_text}
+
 JSON Response:"""
 
 
@@ -79,16 +84,10 @@ def get_domain_mixing_prompt(conversation1, conversation2) -> str:
     conv2_text = format_conversation(conversation2)
 
     return f"""
-Create a mixed conversation by splicing these two conversations from different domains.
+Create a mixed conversation by splicing the two conversations from different domains given at the end.
 The result should be confusing and not belong to either domain clearly.
 Mix turns from both conversations to create a negative training sample.
 
-Conversation 1 ({conversation1.domain}):
-{conv1_text}
-
-Conversation 2 ({conversation2.domain}):
-{conv2_text}
-
 Return a mixed conversation as a JSON array of turns:
 [
     {{"role": "user", "content": "mixed user message"}},
@@ -103,4 +102,10 @@ Example output:
     {{"role": "user", "content": "Actually, what's my account balance?"}},
     {{"role": "assistant", "content": "I'm sorry, I can't access your account information. I'm here to help with flight bookings."}}
 ]
+
+Conversation 1 ({conversation1.domain}):
+{conv1_text}
+
+Conversation 2 ({conversation2.domain}):
+{conv2_text}
 """
@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from src.config import Config
+from src.models.job import JobStatus
+from src.utils.dataset_writer import encode_record
+from src.utils.llm_backends import LLMBackend, make_backend
+
+# Config fields that configure the daemon's shared backend and request
+# scheduler, not a single job
+DAEMON_FIELDS = {
+    "llm_backend",
+    "cassette_file",
+    "api_base_url",
+    "endpoints",
+    "enforce_rate_limits",
+    "request_scheduling",
+    "requests_per_minute",
+    "tokens_per_minute",
+}
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class FairShare:
+    """Shares a fixed number of in-flight LLM requests between jobs.
+
+    When a slot frees up it goes to the waiting job with the fewest
+    requests in flight (the one served longest ago on a tie), so a large
+    job can't starve a small one and concurrent jobs split the rate-limit
+    budget evenly.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self._lock = threading.Condition()
+        self._in_flight: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._last_grant: Dict[str, float] = {}
+        self._total = 0
+
+    def _next(self) -> Optional[str]:
+        waiting = [job for job, count in self._waiting.items() if count]
+        if not waiting:
+            return None
+        return min(
+            waiting,
+            key=lambda job: (self._in_flight.get(job, 0), self._last_grant.get(job, 0.0)),
+        )
+
+    def acquire(self, job_id: str):
+        with self._lock:
+            self._waiting[job_id] = self._waiting.get(job_id, 0) + 1
+            while self._total >= self.slots or self._next() != job_id:
+                self._lock.wait()
+            self._waiting[job_id] -= 1
+            self._in_flight[job_id] = self._in_flight.get(job_id, 0) + 1
+            self._last_grant[job_id] = time.monotonic()
+            self._total += 1
+            # Another job may be next in line for a remaining slot
+            self._lock.notify_all()
+
+    def release(self, job_id: str):
+        with self._lock:
+            self._in_flight[job_id] -= 1
+            self._total -= 1
+            self._lock.notify_all()
+
+    def in_flight(self) -> Dict[str, int]:
+        with self._lock:
+            return {job: count for job, count in self._in_flight.items() if count}
+
+
+class _JobBackend(LLMBackend):
+    """A job's view of the daemon's shared backend, holding a fair-share slot per request."""
+
+    def __init__(self, backend: LLMBackend, share: FairShare, job_id: str):
+        self.backend = backend
+        self.share = share
+        self.job_id = job_id
+        self.retryable = backend.retryable
+        self.rate_limited = backend.rate_limited
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        self.share.acquire(self.job_id)
+        try:
+            return self.backend.complete(model, messages, temperature, max_tokens, **kwargs)
+        finally:
+            self.share.release(self.job_id)
+
+    def stats(self) -> Dict:
+        return self.backend.stats()
+
+    def close(self):
+        # The shared backend outlives the job
+        pass
+
+
+class _Job:
+    """A submitted job with the samples it has produced so far."""
+
+    def __init__(self, status: JobStatus, config: Config):
+        self.status = status
+        self.config = config
+        self.samples: List[Dict] = []
+        self.changed = threading.Condition()
+
+    def add_samples(self, samples: List[Dict]):
+        with self.changed:
+            self.samples.extend(samples)
+            self.status.samples = len(self.samples)
+            self.changed.notify_all()
+
+    def finish(self, status: str, error: Optional[str] = None):
+        with self.changed:
+            self.status.status = status
+            self.status.error = error
+            self.status.finished_at = time.time()
+            self.changed.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        return self.status.status in FINISHED
+
+
+class GenerationService:
+    """Runs generation jobs in one long-lived process.
+
+    Jobs share one LLM backend, so connection pools (and an endpoint pool's
+    rate-limit state) stay warm between jobs, as do the parsed intent index
+    and, with Config.artifact_dir set, the stage artifacts. Jobs also share
+    one RequestScheduler, so with enforce_rate_limits their requests
+    together stay within the per-minute limits of the key. Up to max_jobs
+    jobs run at once and split max_concurrency in-flight requests through
+    a FairShare. Finished samples are kept per job and can be followed
+    while the job runs.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        api_key: str = "",
+        max_jobs: int = 2,
+        max_concurrency: int = 0,
+        jobs_dir: str = "jobs",
+    ):
+        self.config = config
+        self.api_key = api_key
+        self.jobs_dir = jobs_dir
+        self.backend = make_backend(
+            config.llm_backend,
+            api_key,
+            config.api_base_url,
+            config.cassette_file,
+            endpoints=config.endpoints,
+        )
+        from src.pipeline import make_scheduler
+
+        self.scheduler = make_scheduler(config)
+        self.share = FairShare(max_concurrency or config.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self.jobs: Dict[str, _Job] = {}
+
+    def job_config(self, overrides: Dict[str, Any], job_id: str) -> Config:
+        """Daemon config with a job's overrides applied; ValueError if they aren't allowed."""
+        unknown = set(overrides) - set(Config.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown Config fields: {', '.join(sorted(unknown))}")
+        fixed = set(overrides) & DAEMON_FIELDS
+        if fixed:
+            raise ValueError(f"Set by the daemon, not per job: {', '.join(sorted(fixed))}")
+        values = self.config.model_dump()
+        values["output_file"] = os.path.join(self.jobs_dir, f"{job_id}.jsonl")
+        values.update(overrides)
+        try:
+            return Config(**values)
+        except ValidationError as e:
+            raise ValueError(str(e)) from e
+
+    def submit(self, overrides: Dict[str, Any]) -> JobStatus:
+        job_id = uuid.uuid4().hex[:12]
+        config = self.job_config(overrides, job_id)
+        job = _Job(
+            JobStatus(
+                id=job_id,
+                status="queued",
+                overrides=overrides,
+                output_file=config.output_file,
+                target_size=config.target_dataset_size,
+                submitted_at=time.time(),
+            ),
+            config,
+        )
+        with self._lock:
+            self.jobs[job_id] = job
+        self._executor.submit(self._run, job)
+        print(f"[job {job_id}] queued ({config.target_dataset_size} samples)")
+        return job.status
+
+    def _run(self, job: _Job):
+        from src.pipeline import ArchRouterPipeline
+
+        with job.changed:
+            if job.status.status != "queued":
+                return
+            job.status.status = "running"
+            job.status.started_at = time.time()
+        print(f"[job {job.status.id}] started")
+
+        pipeline = None
+        try:
+            directory = os.path.dirname(job.config.output_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            backend = _JobBackend(self.backend, self.share, job.status.id)
+            pipeline = ArchRouterPipeline(
+                job.config, self.api_key, backend=backend, scheduler=self.scheduler
+            )
+            with pipeline.open_writer() as writer:
+                pipeline.run_pipeline(writer=writer, on_samples=job.add_samples)
+            job.status.partial = pipeline.partial
+            outcome, error = "succeeded", None
+        except Exception as e:
+            outcome, error = "failed", str(e)
+        if pipeline is not None:
+            job.status.llm_calls = pipeline.llm_client.get_stats()["calls"]
+            job.status.tokens = pipeline.spend_budget.get_stats()["total"]["tokens"]
+            pipeline.close()
+        job.finish(outcome, error)
+        print(f"[job {job.status.id}] {job.status.status} with {job.status.samples} samples")
+
+    def get(self, job_id: str) -> Optional[_Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[JobStatus]:
+        with self._lock:
+            return [job.status for job in self.jobs.values()]
+
+    def remove(self, job_id: str) -> bool:
+        """Cancel a queued job or forget a finished one. False while it runs."""
+        job = self.get(job_id)
+        with job.changed:
+            if job.status.status == "running":
+                return False
+            if job.status.status == "queued":
+                job.status.status = "cancelled"
+                job.status.finished_at = time.time()
+                job.changed.notify_all()
+                return True
+        with self._lock:
+            del self.jobs[job_id]
+        return True
+
+    def follow(self, job_id: str, offset: int = 0, wait: bool = True) -> Iterator[Dict]:
+        """Yield a job's samples from offset on, waiting for new ones until it finishes."""
+        job = self.get(job_id)
+        while True:
+            with job.changed:
+                while wait and len(job.samples) <= offset and not job.finished:
+                    job.changed.wait()
+                batch = job.samples[offset:]
+                done = job.finished or not wait
+            yield from batch
+            offset += len(batch)
+            if done and offset >= len(job.samples):
+                return
+
+    def close(self):
+        """Cancel queued jobs, wait for running ones and close the backend."""
+        for job in self.list():
+            if job.status == "queued":
+                self.remove(job.id)
+        self._executor.shutdown(wait=True)
+        self.backend.close()
+
+
+def make_handler(service: GenerationService):
+    """HTTP/JSON job API of a GenerationService."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send_json(self, status: int, payload: Any):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, status: int, message: str):
+            self._send_json(status, {"error": message})
+
+        def _route(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            job = None
+            if len(parts) >= 2 and parts[0] == "jobs":
+                job = service.get(parts[1])
+                if job is None:
+                    self._error(404, f"No job {parts[1]}")
+                    return None
+            return parts, parse_qs(url.query), job
+
+        def do_GET(self):
+            route = self._route()
+            if route is None:
+                return
+            parts, query, job = route
+            if parts == ["health"]:
+                self._send_json(200, {"status": "ok", "in_flight": service.share.in_flight()})
+            elif parts == ["jobs"]:
+                self._send_json(200, [status.model_dump() for status in service.list()])
+            elif len(parts) == 2 and parts[0] == "jobs":
+                self._send_json(200, job.status.model_dump())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "samples":
+                offset = int(query.get("offset", ["0"])[0])
+                wait = query.get("wait", ["1"])[0] not in ("0", "false")
+                self._stream_samples(service.follow(job.status.id, offset, wait))
+            else:
+                self._error(404, f"Unknown path {self.path}")
+
+        def _stream_samples(self, samples: Iterator[Dict]):
+            # Chunked NDJSON, one chunk per sample as it is produced
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for sample in samples:
+                line = encode_record(sample)
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") != "/jobs":
+                self._error(404, f"Unknown path {self.path}")
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status = service.submit(body.get("config", {}))
+            except (ValueError, AttributeError) as e:
+                self._error(400, str(e))
+                return
+            self._send_json(201, status.model_dump())
+
+        def do_DELETE(self):
+            route = self._route()
+            if route is None:
+                return
+            parts, _, job = route
+            if len(parts) != 2 or parts[0] != "jobs":
+                self._error(404, f"Unknown path {self.path}")
+            elif not service.remove(job.status.id):
+                self._error(409, f"Job {job.status.id} is running")
+            else:
+                self._send_json(200, job.status.model_dump())
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    """Command line entry point for the generation daemon."""
+    parser = argparse.ArgumentParser(description="Arch-Router generation daemon")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-jobs", type=int, default=2, help="Jobs running at once")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=0,
+        help="LLM requests in flight across all jobs (default: Config.max_concurrency)",
+    )
+    parser.add_argument("--jobs-dir", default="jobs", help="Default output directory of jobs")
+    parser.add_argument("--artifact-dir", default="", help="Stage artifacts shared by all jobs")
+    parser.add_argument("--replay", metavar="CASSETTE", default="", help="Serve LLM responses from a cassette")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = Config()
+    if args.artifact_dir:
+        config.artifact_dir = args.artifact_dir
+    if args.replay:
+        config.llm_backend, config.cassette_file = "replay", args.replay
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key and not args.replay and not config.endpoints:
+        print("Error: Please set GROQ_API_KEY in your .env file")
+        sys.exit(1)
+
+    service = GenerationService(
+        config,
+        api_key or "",
+        max_jobs=args.max_jobs,
+        max_concurrency=args.max_concurrency,
+        jobs_dir=args.jobs_dir,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Generation daemon listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down, waiting for running jobs...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_stage_key(
+    stage: str,
+    upstream_keys: List[str],
+    config_values: Dict[str, Any],
+    sources: List[str],
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hash a stage's upstream artifact keys, config fields and template sources."""
+    payload = {
+        "stage": stage,
+        "upstream": upstream_keys,
+        "config": config_values,
+        "sources": [hashlib.sha256(source.encode("utf-8")).hexdigest() for source in sources],
+        "extra": extra or {},
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ArtifactStore:
+    """Content-addressed store of pipeline stage outputs.
+
+    Each artifact lives at <root>/<stage>/<key>.json.gz, where the key is
+    computed by compute_stage_key from everything the stage depends on.
+    Writes are atomic, so an interrupted run never leaves a partial artifact
+    behind under a valid key.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, f"{key}.json.gz")
+
+    def exists(self, stage: str, key: str) -> bool:
+        return os.path.exists(self._path(stage, key))
+
+    def load(self, stage: str, key: str) -> Any:
+        with gzip.open(self._path(stage, key), "rt", encoding="utf-8") as f:
+            return json.load(f)["data"]
+
+    def save(self, stage: str, key: str, data: Any, meta: Optional[Dict] = None):
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {"stage": stage, "key": key, "created": time.time(), "meta": meta or {}, "data": data},
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def list_keys(self, stage: str) -> List[str]:
+        directory = os.path.join(self.root, stage)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[: -len(".json.gz")]
+            for name in os.listdir(directory)
+            if name.endswith(".json.gz")
+        )
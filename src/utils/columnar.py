@@ -0,0 +1,243 @@
+import argparse
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# pyarrow is optional and slow to import, so it is loaded on first use
+pa = pc = pq = None
+
+from src.utils.dataset_writer import iter_dataset_records
+
+COLUMNAR_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrows"}
+
+
+def _require_pyarrow():
+    global pa, pc, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover - optional dependency
+        raise ImportError(
+            "Columnar output requires the 'pyarrow' package (pip install pyarrow)"
+        )
+    pa, pc, pq = pyarrow, pyarrow.compute, pyarrow.parquet
+
+
+def dataset_schema() -> "pa.Schema":
+    """Arrow schema of a final dataset sample.
+
+    Conversation turns are a list of structs, low-cardinality string columns
+    are dictionary-encoded and label_score is a float column.
+    """
+    _require_pyarrow()
+    turn = pa.struct(
+        [
+            ("role", pa.dictionary(pa.int8(), pa.string())),
+            ("content", pa.string()),
+        ]
+    )
+    return pa.schema(
+        [
+            ("conversation", pa.list_(turn)),
+            ("domain", pa.dictionary(pa.int32(), pa.string())),
+            ("action", pa.dictionary(pa.int32(), pa.string())),
+            ("description", pa.string()),
+            ("label_score", pa.float32()),
+            ("augmentation_type", pa.dictionary(pa.int8(), pa.string())),
+        ]
+    )
+
+
+def columnar_path(output_file: str, output_format: str) -> str:
+    """Swap a .jsonl output path for the extension of a columnar format."""
+    stem = output_file[: -len(".jsonl")] if output_file.endswith(".jsonl") else output_file
+    return stem + COLUMNAR_EXTENSIONS[output_format]
+
+
+class ColumnarDatasetWriter:
+    """Streaming Parquet or Arrow IPC writer with the ShardedDatasetWriter interface.
+
+    Records are buffered and flushed as one row group (Parquet) or record
+    batch (Arrow) every row_group_size records. Arrow output uses the IPC
+    stream format because record batches may carry different dictionaries.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        output_format: str = "parquet",
+        row_group_size: int = 10000,
+        compression: str = "zstd",
+    ):
+        _require_pyarrow()
+        if output_format not in COLUMNAR_EXTENSIONS:
+            raise ValueError(
+                f"Unknown columnar format '{output_format}', expected one of {list(COLUMNAR_EXTENSIONS)}"
+            )
+
+        self.output_file = output_file
+        self.output_format = output_format
+        self.row_group_size = max(1, row_group_size)
+        self.schema = dataset_schema()
+
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if output_format == "parquet":
+            self._writer = pq.ParquetWriter(
+                output_file, self.schema, compression=compression
+            )
+        else:
+            self._sink = pa.OSFile(output_file, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._records = 0
+        self._closed = False
+
+    @property
+    def total_records(self) -> int:
+        with self._lock:
+            return self._records + len(self._buffer)
+
+    def _flush_buffer(self):
+        if not self._buffer:
+            return
+        table = pa.Table.from_pylist(self._buffer, schema=self.schema)
+        if self.output_format == "parquet":
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self._records += len(self._buffer)
+        self._buffer = []
+
+    def write(self, record: Dict):
+        """Append a single record."""
+        self.write_many([record])
+
+    def write_many(self, records: Iterable[Dict]):
+        """Append records, flushing a row group whenever the buffer fills."""
+        with self._lock:
+            if self._closed:
+                raise ValueError("Cannot write to a closed dataset writer")
+            for record in records:
+                self._buffer.append(record)
+                if len(self._buffer) >= self.row_group_size:
+                    self._flush_buffer()
+
+    def close(self, complete: bool = True, extra: Optional[Dict] = None) -> Dict:
+        """Flush buffered records and close the file."""
+        with self._lock:
+            if not self._closed:
+                self._flush_buffer()
+                self._writer.close()
+                if self.output_format == "arrow":
+                    self._sink.close()
+                self._closed = True
+            summary = {
+                "format": self.output_format,
+                "file": os.path.basename(self.output_file),
+                "total_records": self._records,
+                "complete": complete,
+            }
+        if extra:
+            summary.update(extra)
+        return summary
+
+    def __enter__(self) -> "ColumnarDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+
+
+def _filter_expression(
+    augmentation_types: Optional[List[str]], domains: Optional[List[str]]
+):
+    filters = []
+    if augmentation_types:
+        filters.append(("augmentation_type", "in", list(augmentation_types)))
+    if domains:
+        filters.append(("domain", "in", list(domains)))
+    return filters or None
+
+
+def load_dataset_table(
+    path: str,
+    augmentation_types: Optional[List[str]] = None,
+    domains: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+) -> "pa.Table":
+    """Memory-map a columnar dataset and filter it without building Python objects.
+
+    Parquet files are read with row-group predicate pushdown. Arrow IPC
+    files are mapped zero-copy and filtered with vectorized compute kernels.
+    """
+    _require_pyarrow()
+    if path.endswith(COLUMNAR_EXTENSIONS["parquet"]):
+        return pq.read_table(
+            path,
+            columns=columns,
+            memory_map=True,
+            filters=_filter_expression(augmentation_types, domains),
+        )
+
+    table = pa.ipc.open_stream(pa.memory_map(path, "r")).read_all()
+    mask = None
+    for column, values in (
+        ("augmentation_type", augmentation_types),
+        ("domain", domains),
+    ):
+        if values:
+            column_mask = pc.is_in(
+                pc.cast(table[column], pa.string()), value_set=pa.array(values)
+            )
+            mask = column_mask if mask is None else pc.and_(mask, column_mask)
+    if mask is not None:
+        table = table.filter(mask)
+    if columns:
+        table = table.select(columns)
+    return table
+
+
+def convert_jsonl_to_columnar(
+    jsonl_file: str,
+    output_file: str = "",
+    output_format: str = "parquet",
+    row_group_size: int = 10000,
+) -> str:
+    """Convert a JSONL dataset (single file or sharded via manifest) to Parquet or Arrow."""
+    output_file = output_file or columnar_path(jsonl_file, output_format)
+    with ColumnarDatasetWriter(
+        output_file, output_format=output_format, row_group_size=row_group_size
+    ) as writer:
+        for record in iter_dataset_records(jsonl_file):
+            writer.write(record)
+    return output_file
+
+
+def main():
+    """Command line entry point for converting JSONL datasets."""
+    parser = argparse.ArgumentParser(
+        description="Convert an Arch-Router JSONL dataset to Parquet or Arrow"
+    )
+    parser.add_argument("jsonl_file", help="JSONL dataset (or sharded dataset base name)")
+    parser.add_argument("output_file", nargs="?", default="", help="Output path")
+    parser.add_argument(
+        "--format", choices=list(COLUMNAR_EXTENSIONS), default="parquet"
+    )
+    parser.add_argument("--row-group-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    output_file = convert_jsonl_to_columnar(
+        args.jsonl_file, args.output_file, args.format, args.row_group_size
+    )
+    print(f"Converted {args.jsonl_file} to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from typing import Dict
+from src.models.augmentation import AugmentedConversation
 from src.models.conversation import Conversation
 
 
@@ -7,3 +9,48 @@ def format_conversation(conversation: Conversation) -> str:
     for turn in conversation.turns:
         formatted.append(f"{turn.role}: {turn.content}")
     return "\n".join(formatted)
+
+
+def format_conversation_compact(
+    conversation: Conversation, max_turns: int = 0, max_turn_chars: int = 0
+) -> str:
+    """Format conversation with long transcripts windowed and long turns clipped.
+
+    Keeps the opening and closing turns when there are more than max_turns,
+    since those carry the request and its resolution. A value of 0 disables
+    the corresponding limit.
+    """
+    turns = list(conversation.turns)
+    omitted = 0
+    if max_turns and len(turns) > max_turns:
+        head = (max_turns + 1) // 2
+        tail = max_turns - head
+        omitted = len(turns) - max_turns
+        turns = turns[:head] + turns[len(turns) - tail :]
+    else:
+        head = len(turns)
+
+    formatted = []
+    for i, turn in enumerate(turns):
+        if omitted and i == head:
+            formatted.append(f"... [{omitted} turns omitted] ...")
+        content = turn.content
+        if max_turn_chars and len(content) > max_turn_chars:
+            content = content[:max_turn_chars].rstrip() + " ..."
+        formatted.append(f"{turn.role}: {content}")
+    return "\n".join(formatted)
+
+
+def format_sample(aug_conv: AugmentedConversation) -> Dict:
+    """Format an augmented conversation as a final dataset record."""
+    return {
+        "conversation": [
+            {"role": turn.role, "content": turn.content}
+            for turn in aug_conv.conversation.turns
+        ],
+        "domain": aug_conv.conversation.domain,
+        "action": aug_conv.conversation.action,
+        "description": aug_conv.conversation.description,
+        "label_score": aug_conv.label_score,
+        "augmentation_type": aug_conv.augmentation_type,
+    }
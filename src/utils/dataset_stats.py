@@ -0,0 +1,405 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from src.utils.dataset_writer import iter_dataset_records
+from src.utils.metrics import _atomic_write
+from src.utils.spend_budget import estimate_tokens
+
+QUANTILES = (0.5, 0.9, 0.99)
+# Upper bounds of the token length histogram; longer samples go to the last bucket
+TOKEN_BUCKETS = [2**i for i in range(4, 13)]
+SCORE_BINS = 10
+
+
+class TDigest:
+    """Mergeable quantile sketch (merging t-digest with the arcsine scale function).
+
+    Values are buffered and periodically merged into at most about
+    compression centroids, which are small near the tails so extreme
+    quantiles stay accurate. Digests built on different shards merge into
+    the digest of the combined data.
+    """
+
+    def __init__(self, compression: float = 200.0):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _q_limit(self, q: float) -> float:
+        """Largest cumulative share a centroid starting at q may reach."""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (1 + math.sin(2 * math.pi * k / self.compression)) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        merged = 0.0
+        limit = self._q_limit(0.0)
+        mean, weight = points[0]
+        for value, value_weight in points[1:]:
+            if (merged + weight + value_weight) / total <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                merged += weight
+                limit = self._q_limit(merged / total)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        """Estimated value at cumulative share q (0.0 when empty)."""
+        self._compress()
+        if not self.means:
+            return 0.0
+        if len(self.means) == 1:
+            return self.means[0]
+        target = q * self.count
+        cumulative = 0.0
+        for i, (mean, weight) in enumerate(zip(self.means, self.weights)):
+            center = cumulative + weight / 2
+            if target < center:
+                if i == 0:
+                    value = self.min + (mean - self.min) * target / center
+                else:
+                    previous_center = cumulative - self.weights[i - 1] / 2
+                    previous = self.means[i - 1]
+                    value = previous + (mean - previous) * (target - previous_center) / (
+                        center - previous_center
+                    )
+                return min(self.max, max(self.min, value))
+            cumulative += weight
+        last_center = self.count - self.weights[-1] / 2
+        value = self.means[-1] + (self.max - self.means[-1]) * (target - last_center) / (
+            self.count - last_center
+        )
+        return min(self.max, max(self.min, value))
+
+    def to_dict(self) -> Dict:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "centroids": [[mean, weight] for mean, weight in zip(self.means, self.weights)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TDigest":
+        digest = cls(data["compression"])
+        digest.count = data["count"]
+        if data["count"]:
+            digest.min, digest.max = data["min"], data["max"]
+        digest.means = [mean for mean, _ in data["centroids"]]
+        digest.weights = [weight for _, weight in data["centroids"]]
+        return digest
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with 2**precision one-byte registers.
+
+    Items are hashed with BLAKE2b, so sketches built in different processes
+    agree. The standard error is about 1.04 / sqrt(2**precision) (0.8% at
+    the default precision); small counts use linear counting.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        bits = 64 - self.precision
+        index = value >> bits
+        rank = bits - (value & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> float:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0**-register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return estimate
+
+    def to_dict(self) -> Dict:
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+def _add_counts(target: Dict, source: Dict):
+    for key, count in source.items():
+        target[key] = target.get(key, 0) + count
+
+
+class DatasetStats:
+    """Incremental statistics of final dataset samples, fed as they are written.
+
+    Counts samples per domain, domain/action and augmentation type, keeps
+    histograms of turn counts, token lengths and label scores, t-digests for
+    length and score quantiles and a HyperLogLog of conversation texts for
+    the duplicate rate. Nothing is kept per sample, and stats collected by
+    different processes or over different shards merge exactly (counts) or
+    within sketch error (quantiles, duplicates).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.domains: Dict[str, int] = {}
+        self.actions: Dict[str, int] = {}
+        self.augmentation_types: Dict[str, int] = {}
+        self.turns: Dict[int, int] = {}
+        self.token_histogram: Dict[int, int] = {}
+        self.score_histogram: Dict[int, int] = {}
+        self.score_sum = 0.0
+        self.token_lengths = TDigest()
+        self.label_scores = TDigest()
+        self.conversations = HyperLogLog()
+
+    def add(self, sample: Dict):
+        self.add_many([sample])
+
+    def add_many(self, samples: Iterable[Dict]):
+        with self._lock:
+            for sample in samples:
+                self._add(sample)
+
+    def _add(self, sample: Dict):
+        self.samples += 1
+        domain = sample["domain"]
+        self.domains[domain] = self.domains.get(domain, 0) + 1
+        action = f"{domain}/{sample['action']}"
+        self.actions[action] = self.actions.get(action, 0) + 1
+        kind = sample["augmentation_type"]
+        self.augmentation_types[kind] = self.augmentation_types.get(kind, 0) + 1
+
+        turns = sample["conversation"]
+        self.turns[len(turns)] = self.turns.get(len(turns), 0) + 1
+        text = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        tokens = estimate_tokens(text)
+        self.token_lengths.add(tokens)
+        bucket = next((bound for bound in TOKEN_BUCKETS if tokens <= bound), 0)
+        self.token_histogram[bucket] = self.token_histogram.get(bucket, 0) + 1
+
+        score = sample["label_score"]
+        self.score_sum += score
+        self.label_scores.add(score)
+        score_bin = min(SCORE_BINS - 1, max(0, int(score * SCORE_BINS)))
+        self.score_histogram[score_bin] = self.score_histogram.get(score_bin, 0) + 1
+        self.conversations.add(text)
+
+    def merge(self, other: "DatasetStats"):
+        """Add another collector's statistics to this one."""
+        with self._lock:
+            self.samples += other.samples
+            for mine, theirs in (
+                (self.domains, other.domains),
+                (self.actions, other.actions),
+                (self.augmentation_types, other.augmentation_types),
+                (self.turns, other.turns),
+                (self.token_histogram, other.token_histogram),
+                (self.score_histogram, other.score_histogram),
+            ):
+                _add_counts(mine, theirs)
+            self.score_sum += other.score_sum
+            self.token_lengths.merge(other.token_lengths)
+            self.label_scores.merge(other.label_scores)
+            self.conversations.merge(other.conversations)
+
+    def state(self) -> Dict:
+        """Everything needed to merge these statistics later, as JSON-compatible data."""
+        with self._lock:
+            return {
+                "samples": self.samples,
+                "domains": dict(self.domains),
+                "actions": dict(self.actions),
+                "augmentation_types": dict(self.augmentation_types),
+                "turns": {str(k): v for k, v in self.turns.items()},
+                "token_histogram": {str(k): v for k, v in self.token_histogram.items()},
+                "score_histogram": {str(k): v for k, v in self.score_histogram.items()},
+                "score_sum": self.score_sum,
+                "token_lengths": self.token_lengths.to_dict(),
+                "label_scores": self.label_scores.to_dict(),
+                "conversations": self.conversations.to_dict(),
+            }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "DatasetStats":
+        stats = cls()
+        stats.samples = state["samples"]
+        stats.domains = dict(state["domains"])
+        stats.actions = dict(state["actions"])
+        stats.augmentation_types = dict(state["augmentation_types"])
+        stats.turns = {int(k): v for k, v in state["turns"].items()}
+        stats.token_histogram = {int(k): v for k, v in state["token_histogram"].items()}
+        stats.score_histogram = {int(k): v for k, v in state["score_histogram"].items()}
+        stats.score_sum = state["score_sum"]
+        stats.token_lengths = TDigest.from_dict(state["token_lengths"])
+        stats.label_scores = TDigest.from_dict(state["label_scores"])
+        stats.conversations = HyperLogLog.from_dict(state["conversations"])
+        return stats
+
+    def summary(self) -> Dict:
+        """Readable statistics: counts, histograms, quantiles and the duplicate rate."""
+        with self._lock:
+            distinct = min(self.samples, round(self.conversations.count()))
+
+            def shares(counts: Dict) -> Dict:
+                ordered = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+                return {
+                    str(key): {"count": count, "share": round(count / self.samples, 4)}
+                    for key, count in ordered
+                }
+
+            def quantiles(digest: TDigest) -> Dict:
+                return {f"p{round(q * 100)}": round(digest.quantile(q), 4) for q in QUANTILES}
+
+            token_labels = {bound: f"<={bound}" for bound in TOKEN_BUCKETS}
+            token_labels[0] = f">{TOKEN_BUCKETS[-1]}"
+            return {
+                "samples": self.samples,
+                "domains": shares(self.domains),
+                "actions": shares(self.actions),
+                "augmentation_types": shares(self.augmentation_types),
+                "turns": {str(k): self.turns[k] for k in sorted(self.turns)},
+                "token_length": {
+                    **quantiles(self.token_lengths),
+                    "histogram": {
+                        token_labels[bound]: self.token_histogram[bound]
+                        for bound in TOKEN_BUCKETS + [0]
+                        if bound in self.token_histogram
+                    },
+                },
+                "label_score": {
+                    "mean": round(self.score_sum / self.samples, 4) if self.samples else 0.0,
+                    **quantiles(self.label_scores),
+                    "histogram": {
+                        f"{i / SCORE_BINS:.1f}-{(i + 1) / SCORE_BINS:.1f}": self.score_histogram[i]
+                        for i in sorted(self.score_histogram)
+                    },
+                },
+                "distinct_conversations": distinct,
+                "duplicate_rate": round(1 - distinct / self.samples, 4) if self.samples else 0.0,
+            }
+
+    def write_json(self, path: str):
+        """Write the summary together with the mergeable state."""
+        _atomic_write(path, json.dumps({"summary": self.summary(), "state": self.state()}, indent=2))
+
+    @classmethod
+    def load_json(cls, path: str) -> "DatasetStats":
+        with open(path, "r") as f:
+            return cls.from_state(json.load(f)["state"])
+
+
+def format_stats(summary: Dict, top: int = 5) -> str:
+    """Human-readable digest of a statistics summary."""
+    if not summary["samples"]:
+        return "No samples"
+
+    def counts(section: str) -> str:
+        items = list(summary[section].items())
+        text = ", ".join(f"{key} {value['count']} ({value['share']:.1%})" for key, value in items[:top])
+        return text + (f", ... {len(items) - top} more" if len(items) > top else "")
+
+    tokens = summary["token_length"]
+    scores = summary["label_score"]
+    return "\n".join(
+        [
+            f"Samples: {summary['samples']} ({summary['duplicate_rate']:.1%} duplicate conversations)",
+            f"Augmentation types: {counts('augmentation_types')}",
+            f"Domains: {counts('domains')}",
+            "Turns: " + ", ".join(f"{turns}: {count}" for turns, count in summary["turns"].items()),
+            f"Token length: p50 {tokens['p50']:.0f}, p90 {tokens['p90']:.0f}, p99 {tokens['p99']:.0f}",
+            f"Label score: mean {scores['mean']:.3f}, p50 {scores['p50']:.2f}, p90 {scores['p90']:.2f}",
+        ]
+    )
+
+
+def collect_stats(dataset_files: Iterable[str] = (), stats_files: Iterable[str] = ()) -> DatasetStats:
+    """Statistics of datasets (one pass each) merged with saved statistics files."""
+    stats = DatasetStats()
+    for path in stats_files:
+        stats.merge(DatasetStats.load_json(path))
+    for path in dataset_files:
+        part = DatasetStats()
+        part.add_many(iter_dataset_records(path))
+        stats.merge(part)
+    return stats
+
+
+def main():
+    """Command line entry point for computing and merging dataset statistics."""
+    parser = argparse.ArgumentParser(
+        description="Compute or merge Arch-Router dataset statistics"
+    )
+    parser.add_argument("datasets", nargs="*", help="JSONL datasets (or sharded dataset base names)")
+    parser.add_argument(
+        "--merge", nargs="+", default=[], metavar="STATS", help="Statistics files to combine"
+    )
+    parser.add_argument("--output", "-o", default="", help="Write the combined statistics as JSON")
+    args = parser.parse_args()
+    if not args.datasets and not args.merge:
+        parser.error("give datasets and/or --merge statistics files")
+
+    stats = collect_stats(args.datasets, args.merge)
+    print(format_stats(stats.summary()))
+    if args.output:
+        stats.write_json(args.output)
+        print(f"Statistics saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
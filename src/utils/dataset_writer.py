@@ -0,0 +1,300 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression
+    zstandard = None
+
+COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def encode_record(record: Dict) -> bytes:
+    """Encode a record as a JSONL line, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+
+def _dataset_stem(output_file: str) -> str:
+    return output_file[: -len(".jsonl")] if output_file.endswith(".jsonl") else output_file
+
+
+def manifest_path_for(output_file: str) -> str:
+    """Return the manifest path that belongs to an output file."""
+    return f"{_dataset_stem(output_file)}.manifest.json"
+
+
+def read_manifest(output_file: str) -> Dict:
+    """Return a dataset's manifest, or an empty dict if it has none."""
+    manifest_file = manifest_path_for(output_file)
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, "r") as f:
+        return json.load(f)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ShardedDatasetWriter:
+    """Append-only JSONL dataset writer with shard rotation and compression.
+
+    Records are written as they are produced. Shards rotate once they reach
+    max_records_per_shard records or max_bytes_per_shard uncompressed bytes
+    (0 disables either limit), and fsync happens every fsync_every records
+    rather than per record. A manifest with per-shard counts and checksums
+    is rewritten on every rotation and on close, together with the
+    metadata dict (which is carried over when appending). All methods are
+    safe to call from several producer threads.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        compression: str = "none",
+        max_records_per_shard: int = 0,
+        max_bytes_per_shard: int = 0,
+        fsync_every: int = 1000,
+        append: bool = False,
+    ):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}', expected one of {list(COMPRESSION_EXTENSIONS)}"
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+
+        self.output_file = output_file
+        self.compression = compression
+        self.max_records_per_shard = max_records_per_shard
+        self.max_bytes_per_shard = max_bytes_per_shard
+        self.fsync_every = max(1, fsync_every)
+        self.manifest_file = manifest_path_for(output_file)
+
+        self.shards: List[Dict] = []
+        self.metadata: Dict = {}
+        if append and os.path.exists(self.manifest_file):
+            manifest = read_manifest(output_file)
+            self.shards = manifest.get("shards", [])
+            self.metadata = manifest.get("metadata", {})
+        elif append and os.path.exists(output_file):
+            # Adopt a plain JSONL file written before manifests existed
+            with open(output_file, "rb") as f:
+                records = sum(1 for line in f if line.strip())
+            self.shards = [
+                {
+                    "file": os.path.basename(output_file),
+                    "records": records,
+                    "uncompressed_bytes": os.path.getsize(output_file),
+                    "bytes": os.path.getsize(output_file),
+                    "sha256": _file_sha256(output_file),
+                }
+            ]
+        # Appending always opens new shards so existing ones are never rewritten
+        self._indexed_names = append or bool(max_records_per_shard or max_bytes_per_shard)
+
+        self._lock = threading.Lock()
+        self._raw = None
+        self._stream = None
+        self._shard_name = ""
+        self._shard_records = 0
+        self._shard_bytes = 0
+        self._unsynced = 0
+        self._closed = False
+
+    @property
+    def total_records(self) -> int:
+        with self._lock:
+            return sum(shard["records"] for shard in self.shards) + self._shard_records
+
+    def _shard_path(self, index: int) -> str:
+        ext = COMPRESSION_EXTENSIONS[self.compression]
+        if not self._indexed_names:
+            return self.output_file + ext
+        return f"{_dataset_stem(self.output_file)}-{index:05d}.jsonl{ext}"
+
+    def _open_shard(self):
+        path = self._shard_path(len(self.shards))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._raw = open(path, "wb")
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            self._stream = zstandard.ZstdCompressor().stream_writer(
+                self._raw, closefd=False
+            )
+        else:
+            self._stream = self._raw
+        self._shard_name = path
+        self._shard_records = 0
+        self._shard_bytes = 0
+
+    def _sync(self):
+        if self._stream is not self._raw:
+            if self.compression == "zstd":
+                self._stream.flush(zstandard.FLUSH_BLOCK)
+            else:
+                self._stream.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._unsynced = 0
+
+    def _close_shard(self):
+        if self._raw is None:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+        self.shards.append(
+            {
+                "file": os.path.basename(self._shard_name),
+                "records": self._shard_records,
+                "uncompressed_bytes": self._shard_bytes,
+                "bytes": os.path.getsize(self._shard_name),
+                "sha256": _file_sha256(self._shard_name),
+            }
+        )
+        self._raw = None
+        self._stream = None
+        self._unsynced = 0
+
+    def _write_manifest(self, complete: bool, extra: Optional[Dict] = None):
+        manifest = {
+            "format": "jsonl",
+            "compression": self.compression,
+            "total_records": sum(shard["records"] for shard in self.shards),
+            "complete": complete,
+            "shards": self.shards,
+        }
+        if self.metadata:
+            manifest["metadata"] = self.metadata
+        if extra:
+            manifest.update(extra)
+
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _should_rotate(self) -> bool:
+        if self.max_records_per_shard and self._shard_records >= self.max_records_per_shard:
+            return True
+        if self.max_bytes_per_shard and self._shard_bytes >= self.max_bytes_per_shard:
+            return True
+        return False
+
+    def write(self, record: Dict):
+        """Append a single record."""
+        self.write_many([record])
+
+    def write_many(self, records: Iterable[Dict]):
+        """Append records, encoding outside the lock."""
+        lines = [encode_record(record) for record in records]
+        if not lines:
+            return
+
+        with self._lock:
+            if self._closed:
+                raise ValueError("Cannot write to a closed dataset writer")
+            for line in lines:
+                if self._raw is None:
+                    self._open_shard()
+                self._stream.write(line)
+                self._shard_records += 1
+                self._shard_bytes += len(line)
+                self._unsynced += 1
+
+                if self._should_rotate():
+                    self._close_shard()
+                    self._write_manifest(complete=False)
+                elif self._unsynced >= self.fsync_every:
+                    self._sync()
+
+    def flush(self):
+        """Flush and fsync the current shard."""
+        with self._lock:
+            if self._raw is not None:
+                self._sync()
+
+    def close(self, complete: bool = True, extra: Optional[Dict] = None) -> Dict:
+        """Close the current shard and write the final manifest."""
+        with self._lock:
+            if not self._closed:
+                self._close_shard()
+                self._write_manifest(complete=complete, extra=extra)
+                self._closed = True
+            with open(self.manifest_file, "r") as f:
+                return json.load(f)
+
+    def __enter__(self) -> "ShardedDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+
+
+def _open_shard_for_read(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("Reading zstd shards requires the 'zstandard' package")
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        )
+    return open(path, "rb")
+
+
+def dataset_shard_paths(output_file: str) -> List[str]:
+    """Return the shard files of a dataset, using its manifest when present."""
+    manifest_file = manifest_path_for(output_file)
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r") as f:
+            shards = json.load(f).get("shards", [])
+        directory = os.path.dirname(output_file)
+        return [os.path.join(directory, shard["file"]) for shard in shards]
+    return [output_file]
+
+
+def iter_dataset_lines(output_file: str) -> Iterator[bytes]:
+    """Yield the encoded JSONL lines of a dataset without parsing them."""
+    for path in dataset_shard_paths(output_file):
+        with _open_shard_for_read(path) as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def decode_record(line: bytes) -> Dict:
+    """Parse one JSONL line, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def iter_dataset_records(output_file: str) -> Iterator[Dict]:
+    """Yield records from a dataset written by save_dataset or ShardedDatasetWriter."""
+    for line in iter_dataset_lines(output_file):
+        yield decode_record(line)
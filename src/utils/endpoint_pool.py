@@ -0,0 +1,263 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.models.endpoint import EndpointConfig
+from src.utils.llm_backends import LiveBackend, LLMBackend
+from src.utils.spend_budget import estimate_tokens
+
+# Wait before sending to an endpoint again after a 429 without Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class NoEndpointAvailable(LookupError):
+    """Raised when no endpoint of the pool serves the requested model."""
+
+
+def _retry_after(error: BaseException) -> float:
+    """Seconds from the Retry-After header of a rate-limit error."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", DEFAULT_RETRY_AFTER)))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class _Endpoint:
+    """Routing state of one endpoint; guarded by the pool's lock."""
+
+    def __init__(self, config: EndpointConfig, backend: LLMBackend):
+        self.config = config
+        self.name = config.name
+        self.backend = backend
+        self.weight = max(config.weight, 1e-6)
+        # [sent_at, tokens, in_window] of the requests sent within the rate-limit window
+        self.window = deque()
+        self.window_tokens = 0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.rate_limits = 0
+        self.consecutive_failures = 0
+        # Not routed to before these times (monotonic clock)
+        self.down_until = 0.0
+        self.cooldown_until = 0.0
+
+    def serves(self, model: str) -> bool:
+        return not self.config.models or model in self.config.models
+
+    def model_for(self, model: str) -> str:
+        return self.config.models.get(model, model)
+
+    def prune(self, now: float, window_seconds: float):
+        while self.window and self.window[0][0] <= now - window_seconds:
+            entry = self.window.popleft()
+            entry[2] = False
+            self.window_tokens -= entry[1]
+
+    def headroom(self, tokens: int) -> float:
+        """Unused share of the tightest rate limit; 0 if the request doesn't fit."""
+        config = self.config
+        shares = [1.0]
+        if config.requests_per_minute:
+            shares.append(1 - len(self.window) / config.requests_per_minute)
+        if config.tokens_per_minute:
+            # A request larger than the whole limit still goes to an idle endpoint
+            if self.window and self.window_tokens + tokens > config.tokens_per_minute:
+                return 0.0
+            shares.append(1 - self.window_tokens / config.tokens_per_minute)
+        return max(0.0, min(shares))
+
+    def free_at(self, now: float, window_seconds: float) -> float:
+        """Earliest time the endpoint may have room for another request."""
+        if now < self.cooldown_until:
+            return self.cooldown_until
+        if self.window:
+            return self.window[0][0] + window_seconds
+        return now
+
+
+class EndpointPool(LLMBackend):
+    """Routes requests over several Groq keys and OpenAI-compatible servers.
+
+    Every endpoint has a weight and optional requests/tokens per minute
+    limits. Each request goes to the healthy endpoint with the highest
+    score: weight times the unused share of its rate limits, divided by the
+    requests it has in flight or sent within the last window. When every
+    endpoint is at its limits, the request waits until one has room. A
+    rate-limited endpoint is skipped for its Retry-After time. After
+    failure_threshold consecutive errors an endpoint is marked down for
+    down_seconds, and then gets a single request to test whether it has
+    recovered. A request that fails on one endpoint is sent to the next
+    before the error reaches LLMClient's retry loop.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[EndpointConfig],
+        backends: Optional[List[LLMBackend]] = None,
+        failure_threshold: int = 3,
+        down_seconds: float = 30.0,
+        window_seconds: float = 60.0,
+    ):
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        if backends is None:
+            backends = [
+                LiveBackend(config.api_key or os.getenv(config.api_key_env, ""), config.base_url)
+                for config in endpoints
+            ]
+        self.endpoints = [_Endpoint(config, backend) for config, backend in zip(endpoints, backends)]
+        self.failure_threshold = max(1, failure_threshold)
+        self.down_seconds = down_seconds
+        self.window_seconds = window_seconds
+        self.retryable = tuple({e for endpoint in self.endpoints for e in endpoint.backend.retryable})
+        self.rate_limited = tuple(
+            {e for endpoint in self.endpoints for e in endpoint.backend.rate_limited}
+        )
+        self._lock = threading.Condition()
+
+    def _score(self, endpoint: _Endpoint, tokens: int) -> float:
+        load = 1 + endpoint.in_flight + len(endpoint.window)
+        return endpoint.weight * endpoint.headroom(tokens) / load
+
+    def _acquire(self, model: str, tokens: int, tried: Set[str]) -> Optional[Tuple[_Endpoint, list]]:
+        """Reserve the best endpoint for a request, waiting for rate-limit room."""
+        with self._lock:
+            while True:
+                candidates = [e for e in self.endpoints if e.name not in tried and e.serves(model)]
+                if not candidates:
+                    return None
+                now = time.monotonic()
+                for endpoint in candidates:
+                    endpoint.prune(now, self.window_seconds)
+                # If every endpoint is down, trying one beats failing outright
+                healthy = [e for e in candidates if e.down_until <= now] or candidates
+                ready = [
+                    e
+                    for e in healthy
+                    if e.cooldown_until <= now
+                    and e.headroom(tokens) > 0
+                    # A recovering endpoint gets one request at a time
+                    and not (e.consecutive_failures >= self.failure_threshold and e.in_flight)
+                ]
+                if ready:
+                    endpoint = max(ready, key=lambda e: self._score(e, tokens))
+                    entry = [now, tokens, True]
+                    endpoint.window.append(entry)
+                    endpoint.window_tokens += tokens
+                    endpoint.in_flight += 1
+                    return endpoint, entry
+                wake = min(e.free_at(now, self.window_seconds) for e in healthy)
+                self._lock.wait(max(0.001, wake - now))
+
+    def _release(
+        self,
+        endpoint: _Endpoint,
+        entry: list,
+        tokens: Optional[int] = None,
+        failed: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        with self._lock:
+            now = time.monotonic()
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            if tokens is not None and entry[2]:
+                # Settle the estimate to the response's usage
+                endpoint.window_tokens += tokens - entry[1]
+                entry[1] = tokens
+            if retry_after is not None:
+                endpoint.rate_limits += 1
+                endpoint.cooldown_until = max(endpoint.cooldown_until, now + retry_after)
+            elif failed:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.failure_threshold:
+                    if endpoint.down_until <= now:
+                        print(
+                            f"Endpoint {endpoint.name} failed {endpoint.consecutive_failures} "
+                            f"times in a row; skipping it for {self.down_seconds:.0f}s"
+                        )
+                    endpoint.down_until = now + self.down_seconds
+            else:
+                endpoint.consecutive_failures = 0
+                endpoint.down_until = 0.0
+            self._lock.notify_all()
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        tokens += max_tokens * kwargs.get("n", 1)
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            acquired = self._acquire(model, tokens, tried)
+            if acquired is None:
+                if last_error is not None:
+                    raise last_error
+                raise NoEndpointAvailable(f"No endpoint in the pool serves model {model}")
+            endpoint, entry = acquired
+            tried.add(endpoint.name)
+            try:
+                response = endpoint.backend.complete(
+                    model=endpoint.model_for(model),
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs,
+                )
+            except endpoint.backend.rate_limited as e:
+                self._release(endpoint, entry, retry_after=_retry_after(e))
+                last_error = e
+                continue
+            except endpoint.backend.retryable as e:
+                self._release(endpoint, entry, tokens=0, failed=True)
+                last_error = e
+                continue
+            except BaseException:
+                # Bad requests fail the same way everywhere; don't fail over
+                self._release(endpoint, entry, tokens=0)
+                raise
+            usage = getattr(response, "usage", None)
+            used = getattr(usage, "total_tokens", None) if usage is not None else None
+            self._release(endpoint, entry, tokens=used)
+            return response
+
+    def check_health(self) -> Dict[str, bool]:
+        """Probe every endpoint and mark the ones that don't answer as down."""
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as executor:
+            results = list(executor.map(lambda e: e.backend.health_check(), self.endpoints))
+        with self._lock:
+            now = time.monotonic()
+            for endpoint, healthy in zip(self.endpoints, results):
+                if healthy:
+                    endpoint.consecutive_failures = 0
+                    endpoint.down_until = 0.0
+                else:
+                    endpoint.consecutive_failures = self.failure_threshold
+                    endpoint.down_until = now + self.down_seconds
+                    print(f"Endpoint {endpoint.name} failed its health check")
+        return {endpoint.name: healthy for endpoint, healthy in zip(self.endpoints, results)}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "endpoints": {
+                    e.name: {
+                        "requests": e.requests,
+                        "failures": e.failures,
+                        "rate_limits": e.rate_limits,
+                        "in_flight": e.in_flight,
+                        "healthy": e.down_until <= now,
+                    }
+                    for e in self.endpoints
+                }
+            }
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.backend.close()
@@ -0,0 +1,109 @@
+from typing import List, Sequence
+
+# numpy is optional and only needed for diverse example selection
+np = None
+
+NGRAM_SIZE = 3
+HASH_BITS = 9  # 512 hashed n-gram features
+
+
+def _require_numpy():
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - optional dependency
+        raise ImportError(
+            "Diverse example selection requires the 'numpy' package (pip install numpy)"
+        )
+    np = numpy
+
+
+def _ngram_codes(texts: Sequence[str], n: int, bits: int):
+    """Hashed character n-grams of all texts at once, with the text index of each."""
+    encoded = [f" {text.lower()} ".encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+    count = max(0, len(data) - n + 1)
+    # FNV-1a over each window of n bytes, then a multiplicative hash to bits
+    codes = np.full(count, 2166136261, dtype=np.uint32)
+    for offset in range(n):
+        codes = (codes ^ data[offset : offset + count]) * np.uint32(16777619)
+    codes = (codes * np.uint32(2654435761)) >> np.uint32(32 - bits)
+
+    rows = np.repeat(np.arange(len(texts)), lengths)[:count]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # Drop windows that run past the end of their text into the next one
+    valid = np.arange(count) - starts[rows] <= lengths[rows] - n
+    return codes[valid].astype(np.int64), rows[valid]
+
+
+def _vectors(codes, rows, size: int, dim: int):
+    """L2-normalized n-gram count vectors of size texts."""
+    counts = np.bincount(rows * dim + codes, minlength=size * dim).astype(np.float32)
+    vectors = counts.reshape(size, dim)
+    norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    vectors /= np.maximum(norms, 1e-12)[:, None]
+    return vectors
+
+
+def hashed_ngram_vectors(texts: Sequence[str], n: int = NGRAM_SIZE, bits: int = HASH_BITS):
+    """L2-normalized hashed character n-gram vectors, one row per text."""
+    _require_numpy()
+    codes, rows = _ngram_codes(texts, n, bits)
+    return _vectors(codes, rows, len(texts), 1 << bits)
+
+
+def farthest_point(vectors, k: int) -> List[int]:
+    """Indices of k rows chosen by farthest-point traversal on cosine similarity.
+
+    Starts from the row closest to the centroid (the most typical example)
+    and then repeatedly adds the row least similar to everything chosen so
+    far, so near-duplicates are only picked once the distinct rows run out.
+    """
+    size = len(vectors)
+    if size <= k:
+        return list(range(size))
+    first = int(np.argmax(vectors @ vectors.sum(axis=0)))
+    selected = [first]
+    closest = vectors @ vectors[first]
+    for _ in range(k - 1):
+        closest[selected] = np.inf
+        chosen = int(np.argmin(closest))
+        selected.append(chosen)
+        closest = np.maximum(closest, vectors @ vectors[chosen])
+    return selected
+
+
+def select_diverse(
+    groups: Sequence[Sequence[str]], k: int, n: int = NGRAM_SIZE, bits: int = HASH_BITS
+) -> List[List[int]]:
+    """Indices of the k most diverse texts of every group, in selection order.
+
+    All groups are hashed in one vectorized pass; groups with k texts or
+    fewer keep all of them.
+    """
+    _require_numpy()
+    texts = [text for group in groups for text in group]
+    codes, rows = _ngram_codes(texts, n, bits)
+    sizes = [len(group) for group in groups]
+    text_starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+    bounds = np.searchsorted(rows, np.append(text_starts, len(texts)))
+
+    selections = []
+    for index, size in enumerate(sizes):
+        if size <= k:
+            selections.append(list(range(size)))
+            continue
+        low, high = bounds[index], bounds[index + 1]
+        vectors = _vectors(codes[low:high], rows[low:high] - text_starts[index], size, 1 << bits)
+        selections.append(farthest_point(vectors, k))
+    return selections
+
+
+def coverage(vectors, selected: Sequence[int]) -> float:
+    """Mean similarity of every row to its closest selected row (1.0 = fully covered)."""
+    if not len(selected):
+        return 0.0
+    return float((vectors @ vectors[list(selected)].T).max(axis=1).mean())
@@ -0,0 +1,249 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ReplayMiss(LookupError):
+    """Raised when a replayed run sends a request that isn't in the cassette."""
+
+
+def request_key(model: str, messages: List[Dict], **kwargs) -> str:
+    """Cassette key of a chat completion request.
+
+    max_tokens is left out because adaptive token budgets size it from the
+    completions observed so far, which depends on the order requests finish.
+    """
+    kwargs.pop("max_tokens", None)
+    canonical = json.dumps(
+        {"model": model, "messages": messages, **kwargs}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _to_dict(value: Any) -> Any:
+    """Plain JSON data of an SDK response object."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, SimpleNamespace):
+        return {key: _to_dict(item) for key, item in vars(value).items()}
+    if isinstance(value, dict):
+        return {key: _to_dict(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_dict(item) for item in value]
+    return value
+
+
+def _to_namespace(value: Any) -> Any:
+    """Response object with attribute access, like the SDK's, from plain JSON data."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+class LLMBackend:
+    """Sends chat completion requests for LLMClient.
+
+    complete() takes the arguments of the OpenAI/Groq chat completions
+    endpoint and returns a response with choices, usage and model
+    attributes. retryable lists the exceptions LLMClient retries, and
+    rate_limited the subset that means the endpoint is rate limiting.
+    """
+
+    retryable: Tuple[type, ...] = ()
+    rate_limited: Tuple[type, ...] = ()
+
+    def complete(
+        self, model: str, messages: List[Dict], temperature: float, max_tokens: int, **kwargs
+    ):
+        raise NotImplementedError
+
+    def health_check(self) -> bool:
+        """True if the endpoint answers (without sending a completion)."""
+        return True
+
+    def stats(self) -> Dict:
+        """Backend-specific counters for the end-of-run summary."""
+        return {}
+
+    def close(self):
+        pass
+
+
+class LiveBackend(LLMBackend):
+    """Sends requests to Groq or another OpenAI-compatible endpoint."""
+
+    def __init__(self, api_key: str, base_url: str = ""):
+        # Imported here so that offline backends load without the network client
+        import groq
+
+        # Retries are done by LLMClient so that they can be counted.
+        # An empty base_url keeps the Groq default (or GROQ_BASE_URL)
+        self.client = groq.Groq(api_key=api_key, base_url=base_url or None, max_retries=0)
+        self.retryable = (
+            groq.APIConnectionError,
+            groq.RateLimitError,
+            groq.InternalServerError,
+        )
+        self.rate_limited = (groq.RateLimitError,)
+        self._api_error = groq.APIError
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        return self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+
+    def health_check(self) -> bool:
+        try:
+            self.client.models.list()
+            return True
+        except self._api_error:
+            return False
+
+
+class RecordingBackend(LLMBackend):
+    """Forwards requests to another backend and records them in a cassette.
+
+    The cassette is gzip-compressed JSONL with one request/response pair
+    per line, appended and flushed as responses arrive, so a cassette
+    stays readable up to the last response if the run is interrupted.
+    """
+
+    def __init__(self, backend: LLMBackend, path: str):
+        self.backend = backend
+        self.retryable = backend.retryable
+        self.rate_limited = backend.rate_limited
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self.recorded = 0
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        response = self.backend.complete(model, messages, temperature, max_tokens, **kwargs)
+        record = {
+            "key": request_key(model, messages, **kwargs),
+            "request": {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                **kwargs,
+            },
+            "response": _to_dict(response),
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+        return response
+
+    def health_check(self) -> bool:
+        return self.backend.health_check()
+
+    def stats(self) -> Dict:
+        return self.backend.stats()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.backend.close()
+
+
+def load_cassette(path: str) -> Dict[str, List[Dict]]:
+    """Recorded responses per request key, in recording order."""
+    index: Dict[str, List[Dict]] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    index.setdefault(record["key"], []).append(record["response"])
+        except EOFError:
+            # Cassette of an interrupted recording; keep what was flushed
+            pass
+    return index
+
+
+class ReplayBackend(LLMBackend):
+    """Serves recorded responses from an in-memory index of a cassette.
+
+    Requests that were recorded several times (e.g. LLM-2 sampling the same
+    prompt twice) get the recorded responses in order, starting over once
+    all have been served. A request that was never recorded raises
+    ReplayMiss, or is forwarded to fallback when one is given.
+    """
+
+    def __init__(self, path: str, fallback: Optional[LLMBackend] = None):
+        self.path = path
+        self.fallback = fallback
+        self.retryable = fallback.retryable if fallback is not None else ()
+        self.rate_limited = fallback.rate_limited if fallback is not None else ()
+        self._index = load_cassette(path)
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.responses = sum(len(responses) for responses in self._index.values())
+        self.misses = 0
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        key = request_key(model, messages, **kwargs)
+        responses = self._index.get(key)
+        if not responses:
+            with self._lock:
+                self.misses += 1
+            if self.fallback is not None:
+                return self.fallback.complete(model, messages, temperature, max_tokens, **kwargs)
+            raise ReplayMiss(f"No recorded response for request {key[:12]} in {self.path}")
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        return _to_namespace(responses[served % len(responses)])
+
+
+def make_backend(
+    mode: str,
+    api_key: str = "",
+    base_url: str = "",
+    cassette: str = "",
+    endpoints: Optional[List] = None,
+) -> LLMBackend:
+    """Backend for Config.llm_backend: "live", "record" or "replay".
+
+    Live requests go to an EndpointPool when endpoints (EndpointConfig
+    entries) are given, otherwise to the single api_key/base_url endpoint.
+    """
+
+    def live() -> LLMBackend:
+        if not endpoints:
+            return LiveBackend(api_key, base_url)
+        # Imported here because the pool module builds on this one
+        from src.utils.endpoint_pool import EndpointPool
+
+        pool = EndpointPool(endpoints)
+        pool.check_health()
+        return pool
+
+    if mode == "live":
+        return live()
+    if not cassette:
+        raise ValueError(f"The {mode} backend needs a cassette file")
+    if mode == "record":
+        return RecordingBackend(live(), cassette)
+    if mode == "replay":
+        if not os.path.exists(cassette):
+            raise FileNotFoundError(f"No cassette at {cassette}")
+        return ReplayBackend(cassette)
+    raise ValueError(f"Unknown LLM backend '{mode}', expected live, record or replay")
@@ -0,0 +1,293 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from src.utils.llm_backends import LiveBackend, LLMBackend
+from src.utils.metrics import MetricsRecorder
+from src.utils.request_scheduler import RequestScheduler
+from src.utils.spend_budget import BudgetExceeded, SpendBudget, estimate_tokens
+from src.utils.token_budget import TokenBudget
+from src.utils.tracing import Tracer
+
+# First retry delay in seconds, doubled on every further attempt
+RETRY_BASE_DELAY = 0.5
+
+
+class _Flight:
+    """A request in flight that identical concurrent requests wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMClient:
+    """Shared chat-completion call path used by every LLM component.
+
+    Sends requests through an LLMBackend (live Groq by default, an endpoint
+    pool, or a recording or replaying one) so that all stages send requests the same
+    way and report completion lengths back to a shared TokenBudget. Identical
+    requests (same model, prompt, sampling parameters and seed) that are in
+    flight at the same time share one network call; callers that need
+    independent samples pass coalesce=False. Every request is checked
+    against the SpendBudget first and raises BudgetExceeded if it isn't
+    allowed. Connection errors, rate limits and server errors are retried
+    here rather than inside the backend so that every call can be
+    recorded in the MetricsRecorder with its latency, queue wait, usage and
+    retry count. The Tracer shared with the components gets a span for each
+    request and for the time its batch item was queued. Each attempt waits
+    for a slot from the RequestScheduler, which orders pending requests and
+    paces them to the rate limits when enabled; that wait counts as queue
+    wait.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        token_budget: Optional[TokenBudget] = None,
+        coalesce: bool = True,
+        max_concurrency: int = 1,
+        spend_budget: Optional[SpendBudget] = None,
+        metrics: Optional[MetricsRecorder] = None,
+        max_retries: int = 2,
+        tracer: Optional[Tracer] = None,
+        base_url: str = "",
+        backend: Optional[LLMBackend] = None,
+        stage_models: Optional[Dict[str, str]] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        self.backend = backend or LiveBackend(api_key, base_url)
+        self.token_budget = token_budget or TokenBudget()
+        self.spend_budget = spend_budget or SpendBudget()
+        self.metrics = metrics or MetricsRecorder()
+        self.tracer = tracer or Tracer()
+        self.scheduler = scheduler or RequestScheduler()
+        self.coalesce = coalesce
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        # Overrides the model a component asks for, per stage
+        self.stage_models = stage_models or {}
+
+        self._lock = threading.Lock()
+        # When the current thread's batch item was queued, for measuring queue wait
+        self._local = threading.local()
+        self._in_flight: Dict[Tuple, _Flight] = {}
+        self.calls = 0
+        self.coalesced_calls = 0
+
+    def max_tokens_for(self, stage: str, num_turns: int, ceiling: int) -> int:
+        """Return the per-call max_tokens for a stage and expected turn count."""
+        return self.token_budget.max_tokens_for(stage, num_turns, ceiling)
+
+    def can_spend(self, stage: str) -> bool:
+        """True if the spend budget currently allows requests of this stage."""
+        return self.spend_budget.can_spend(stage)
+
+    @contextmanager
+    def parsing(self, stage: str):
+        """Record whether the response parsing in this block succeeded."""
+        try:
+            yield
+        except BaseException:
+            self.metrics.record_parse(stage, ok=False)
+            raise
+        self.metrics.record_parse(stage, ok=True)
+
+    def _queued(self, fn: Callable, queued_at: Optional[float] = None) -> Callable:
+        """Wrap a batch function so its first request can report its queue wait."""
+
+        def run(item):
+            self._local.queued_at = time.perf_counter() if queued_at is None else queued_at
+            try:
+                return fn(item)
+            finally:
+                self._local.queued_at = None
+
+        return run
+
+    def map_concurrent(self, fn: Callable, items: Iterable) -> Iterator:
+        """Apply fn to items with up to max_concurrency in parallel, yielding results in order.
+
+        Stops early, keeping the results so far, once an item hits the
+        spend budget.
+        """
+        try:
+            if self.max_concurrency <= 1:
+                yield from map(self._queued(fn), items)
+                return
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                # executor.map submits every item up front
+                yield from executor.map(self._queued(fn, time.perf_counter()), items)
+        except BudgetExceeded as e:
+            print(f"Stopping batch early: {e}")
+
+    def chat(
+        self,
+        stage: str,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        num_turns: int = 0,
+        coalesce: Optional[bool] = None,
+        **kwargs,
+    ):
+        """Send a single-message chat completion and record its usage."""
+        model = self.stage_models.get(stage, model)
+        if not (self.coalesce if coalesce is None else coalesce):
+            return self._send(stage, model, prompt, temperature, max_tokens, num_turns, kwargs)
+
+        key = (model, prompt, temperature, max_tokens, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.coalesced_calls += 1
+
+        if not leader:
+            self.metrics.record_call(stage, model, 0.0, outcome="coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        try:
+            flight.response = self._send(
+                stage, model, prompt, temperature, max_tokens, num_turns, kwargs
+            )
+            return flight.response
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def _send(
+        self,
+        stage: str,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        num_turns: int,
+        kwargs: Dict,
+    ):
+        try:
+            reservation = self.spend_budget.reserve(
+                stage, prompt, max_tokens * kwargs.get("n", 1)
+            )
+        except BudgetExceeded:
+            self.metrics.record_call(stage, model, 0.0, outcome="refused")
+            raise
+        with self._lock:
+            self.calls += 1
+
+        estimate = estimate_tokens(prompt) + max_tokens * kwargs.get("n", 1)
+        batch_queued_at = getattr(self._local, "queued_at", None)
+        # Only the first request of a batch item waited in the queue
+        self._local.queued_at = None
+        queued_at = time.perf_counter() if batch_queued_at is None else batch_queued_at
+        start = None
+        retries = 0
+        try:
+            while True:
+                try:
+                    with self.scheduler.slot(stage, estimate) as ticket:
+                        if start is None:
+                            start = time.perf_counter()
+                            # Time in the batch queue and waiting for the scheduler
+                            if batch_queued_at is not None or start - queued_at > 0.001:
+                                self.tracer.complete("queued", "queue", queued_at, start, stage=stage)
+                        response = self.backend.complete(
+                            model=model,
+                            messages=[{"role": "user", "content": prompt}],
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            **kwargs,
+                        )
+                        usage = getattr(response, "usage", None)
+                        self.scheduler.settle(ticket, getattr(usage, "total_tokens", None))
+                    break
+                except self.backend.retryable:
+                    if retries >= self.max_retries:
+                        raise
+                    time.sleep(RETRY_BASE_DELAY * 2**retries)
+                    retries += 1
+        except BaseException as e:
+            end = time.perf_counter()
+            start = end if start is None else start
+            queue_wait = start - queued_at
+            self.spend_budget.release(reservation)
+            self.metrics.record_call(
+                stage,
+                model,
+                end - start,
+                queue_wait=queue_wait,
+                retries=retries,
+                outcome="error",
+            )
+            self.tracer.complete(
+                "request",
+                "http",
+                start,
+                end,
+                stage=stage,
+                model=model,
+                retries=retries,
+                error=type(e).__name__,
+            )
+            raise
+
+        usage = getattr(response, "usage", None)
+        self.spend_budget.settle(
+            reservation,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+        end = time.perf_counter()
+        queue_wait = start - queued_at
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.metrics.record_call(
+            stage,
+            model,
+            end - start,
+            queue_wait=queue_wait,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            retries=retries,
+        )
+        self.tracer.complete(
+            "request",
+            "http",
+            start,
+            end,
+            stage=stage,
+            model=model,
+            retries=retries,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+        if num_turns and usage is not None and usage.completion_tokens:
+            truncated = response.choices[0].finish_reason == "length"
+            self.token_budget.observe(
+                stage, usage.completion_tokens, num_turns, truncated=truncated
+            )
+
+        return response
+
+    def close(self):
+        """Close the backend (finishes a recording cassette)."""
+        self.backend.close()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Network calls made and calls saved by coalescing."""
+        with self._lock:
+            return {"calls": self.calls, "coalesced_calls": self.coalesced_calls}
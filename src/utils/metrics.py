@@ -0,0 +1,300 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+PERCENTILES = (0.5, 0.95, 0.99)
+# Outcomes of calls that reached the API; coalesced and refused calls are only counted
+SENT_OUTCOMES = ("ok", "error")
+METRIC_PREFIX = "arch_router"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(math.ceil(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    summary = {f"p{round(q * 100)}": round(percentile(ordered, q), 4) for q in PERCENTILES}
+    summary["sum"] = round(sum(ordered), 4)
+    summary["mean"] = round(sum(ordered) / len(ordered), 4) if ordered else 0.0
+    summary["max"] = round(ordered[-1], 4) if ordered else 0.0
+    return summary
+
+
+class _StageCalls:
+    """Accumulated LLM call records of one stage."""
+
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+        self.latencies: List[float] = []
+        self.queue_waits: List[float] = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.parse = {"ok": 0, "failed": 0}
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+
+class MetricsRecorder:
+    """Records every LLM call and local stage timing of a run.
+
+    LLM calls are recorded by LLMClient with their stage, model, latency,
+    queue wait, token usage, retries and outcome; callers report whether
+    the response parsed. Pipeline stages are timed with stage_timer. The
+    report gives p50/p95/p99 latencies and throughput per stage and can be
+    written as JSON or as a Prometheus text-file snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _StageCalls] = {}
+        self._stages: Dict[str, Dict] = {}
+        self._speculation = {"items": {}, "calls": 0, "wasted_calls": 0}
+        self.started = time.time()
+
+    def record_call(
+        self,
+        stage: str,
+        model: str,
+        latency: float,
+        queue_wait: float = 0.0,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        outcome: str = "ok",
+    ):
+        """Record one LLM call (outcome: ok, error, coalesced or refused)."""
+        end = time.time()
+        with self._lock:
+            calls = self._calls.setdefault(stage, _StageCalls())
+            calls.outcomes[outcome] = calls.outcomes.get(outcome, 0) + 1
+            if outcome not in SENT_OUTCOMES:
+                return
+            calls.models[model] = calls.models.get(model, 0) + 1
+            calls.latencies.append(latency)
+            calls.queue_waits.append(queue_wait)
+            calls.prompt_tokens += prompt_tokens
+            calls.completion_tokens += completion_tokens
+            calls.retries += retries
+            start = end - latency - queue_wait
+            if calls.first_start is None or start < calls.first_start:
+                calls.first_start = start
+            if calls.last_end is None or end > calls.last_end:
+                calls.last_end = end
+
+    def record_parse(self, stage: str, ok: bool):
+        """Record whether an LLM response of a stage could be parsed."""
+        with self._lock:
+            calls = self._calls.setdefault(stage, _StageCalls())
+            calls.parse["ok" if ok else "failed"] += 1
+
+    def record_speculation(self, outcome: str, calls: int = 0):
+        """Record one speculatively augmented item (outcome: accepted, rejected or serial).
+
+        calls is the number of augmentation calls started for it before
+        scoring finished; those of rejected items were wasted.
+        """
+        with self._lock:
+            items = self._speculation["items"]
+            items[outcome] = items.get(outcome, 0) + 1
+            self._speculation["calls"] += calls
+            if outcome == "rejected":
+                self._speculation["wasted_calls"] += calls
+
+    @contextmanager
+    def stage_timer(self, stage: str, **labels):
+        """Time a local pipeline stage; extra labels (e.g. reused=True) go into the report."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                entry = self._stages.setdefault(stage, {"seconds": 0.0, "runs": 0})
+                entry["seconds"] += seconds
+                entry["runs"] += 1
+                entry.update(labels)
+
+    def report(self) -> Dict:
+        """Machine-readable run report."""
+        with self._lock:
+            llm_stages = {}
+            for stage, calls in self._calls.items():
+                window = (
+                    calls.last_end - calls.first_start
+                    if calls.first_start is not None and calls.last_end is not None
+                    else 0.0
+                )
+                sent = len(calls.latencies)
+                llm_stages[stage] = {
+                    "calls": sent,
+                    "outcomes": dict(calls.outcomes),
+                    "models": dict(calls.models),
+                    "retries": calls.retries,
+                    "prompt_tokens": calls.prompt_tokens,
+                    "completion_tokens": calls.completion_tokens,
+                    "latency_seconds": _summary(calls.latencies),
+                    "queue_wait_seconds": _summary(calls.queue_waits),
+                    "parse": dict(calls.parse),
+                    "active_seconds": round(window, 3),
+                    "calls_per_second": round(sent / window, 3) if window > 0 else 0.0,
+                    "completion_tokens_per_second": (
+                        round(calls.completion_tokens / window, 1) if window > 0 else 0.0
+                    ),
+                }
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+            speculation = {**self._speculation, "items": dict(self._speculation["items"])}
+            all_latencies = [
+                latency for calls in self._calls.values() for latency in calls.latencies
+            ]
+
+        for entry in stages.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+        speculation["wasted_call_rate"] = (
+            round(speculation["wasted_calls"] / speculation["calls"], 4)
+            if speculation["calls"]
+            else 0.0
+        )
+        return {
+            "started": self.started,
+            "duration_seconds": round(time.time() - self.started, 3),
+            "llm_latency_seconds": _summary(all_latencies),
+            "llm_stages": llm_stages,
+            "pipeline_stages": stages,
+            "speculation": speculation,
+        }
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format snapshot of the report."""
+        report = self.report()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{full_name}{suffix}{{{label_text}}} {value}")
+
+        llm = report["llm_stages"]
+
+        def summary_samples(field: str) -> List:
+            samples = [
+                ("", {"stage": stage, "quantile": str(q)}, data[field][f"p{round(q * 100)}"])
+                for stage, data in llm.items()
+                for q in PERCENTILES
+            ]
+            for stage, data in llm.items():
+                samples.append(("_sum", {"stage": stage}, data[field]["sum"]))
+                samples.append(("_count", {"stage": stage}, data["calls"]))
+            return samples
+
+        metric(
+            "llm_calls_total",
+            "counter",
+            "LLM calls by stage and outcome.",
+            [
+                ("", {"stage": stage, "outcome": outcome}, count)
+                for stage, data in llm.items()
+                for outcome, count in data["outcomes"].items()
+            ],
+        )
+        metric(
+            "llm_latency_seconds",
+            "summary",
+            "LLM call latency by stage.",
+            summary_samples("latency_seconds"),
+        )
+        metric(
+            "llm_queue_wait_seconds",
+            "summary",
+            "Time LLM calls waited before being sent, by stage.",
+            summary_samples("queue_wait_seconds"),
+        )
+        metric(
+            "llm_tokens_total",
+            "counter",
+            "Tokens reported in response usage, by stage and kind.",
+            [
+                ("", {"stage": stage, "kind": kind}, data[f"{kind}_tokens"])
+                for stage, data in llm.items()
+                for kind in ("prompt", "completion")
+            ],
+        )
+        metric(
+            "llm_retries_total",
+            "counter",
+            "Retried LLM requests by stage.",
+            [("", {"stage": stage}, data["retries"]) for stage, data in llm.items()],
+        )
+        metric(
+            "llm_parse_total",
+            "counter",
+            "Parsed LLM responses by stage and result.",
+            [
+                ("", {"stage": stage, "result": result}, count)
+                for stage, data in llm.items()
+                for result, count in data["parse"].items()
+            ],
+        )
+        metric(
+            "llm_throughput_calls_per_second",
+            "gauge",
+            "LLM calls per second while the stage was active.",
+            [("", {"stage": stage}, data["calls_per_second"]) for stage, data in llm.items()],
+        )
+        metric(
+            "stage_duration_seconds",
+            "gauge",
+            "Wall-clock time of each pipeline stage.",
+            [
+                ("", {"stage": stage}, data["seconds"])
+                for stage, data in report["pipeline_stages"].items()
+            ],
+        )
+        speculation = report["speculation"]
+        metric(
+            "speculative_items_total",
+            "counter",
+            "Items augmented speculatively, by scoring outcome (serial = not speculated).",
+            [("", {"outcome": outcome}, count) for outcome, count in speculation["items"].items()],
+        )
+        metric(
+            "speculative_calls_total",
+            "counter",
+            "Augmentation calls started before scoring finished, by whether they were wasted.",
+            [
+                ("", {"wasted": "true"}, speculation["wasted_calls"]),
+                ("", {"wasted": "false"}, speculation["calls"] - speculation["wasted_calls"]),
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        """Write the run report as JSON."""
+        _atomic_write(path, json.dumps(self.report(), indent=2))
+
+    def write_prometheus(self, path: str):
+        """Write a Prometheus text-file collector snapshot."""
+        _atomic_write(path, self.prometheus_text())
+
+
+def _atomic_write(path: str, content: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
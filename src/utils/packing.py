@@ -0,0 +1,368 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+from array import array
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.utils.columnar import COLUMNAR_EXTENSIONS, load_dataset_table
+from src.utils.dataset_writer import decode_record, encode_record, iter_dataset_lines
+
+PACKED_INDEX_FILE = "packed_index.json"
+
+# Tokenizer of a worker process, built once by the pool initializer
+_worker_tokenizer = None
+
+
+class ByteTokenizer:
+    """UTF-8 bytes as token ids, with one end-of-sample and one padding id."""
+
+    eos_id = 256
+    pad_id = 257
+    vocab_size = 258
+
+    def encode(self, text: str) -> List[int]:
+        return list(text.encode("utf-8"))
+
+
+class HuggingFaceTokenizer:
+    """A tokenizer saved locally in Hugging Face format (no downloads)."""
+
+    def __init__(self, path: str):
+        try:
+            from transformers import AutoTokenizer
+        except ImportError:  # pragma: no cover - optional dependency
+            raise ImportError(
+                "Hugging Face tokenizers require the 'transformers' package (pip install transformers)"
+            )
+        self.tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        self.eos_id = self.tokenizer.eos_token_id
+        pad_id = self.tokenizer.pad_token_id
+        self.pad_id = self.eos_id if pad_id is None else pad_id
+        self.vocab_size = len(self.tokenizer)
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+
+class TiktokenTokenizer:
+    """A tiktoken encoding; end-of-text doubles as padding."""
+
+    def __init__(self, name: str):
+        try:
+            import tiktoken
+        except ImportError:  # pragma: no cover - optional dependency
+            raise ImportError(
+                "tiktoken tokenizers require the 'tiktoken' package (pip install tiktoken)"
+            )
+        self.encoding = tiktoken.get_encoding(name)
+        self.eos_id = self.pad_id = self.encoding.eot_token
+        self.vocab_size = self.encoding.n_vocab
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text, disallowed_special=())
+
+
+def load_tokenizer(spec: str):
+    """Build a tokenizer from its spec.
+
+    "bytes", "hf:<local path>", "tiktoken:<encoding>" or "<module>:<factory>"
+    for any object with encode(text), eos_id and pad_id. Worker processes
+    build their own tokenizer from the spec.
+    """
+    if spec == "bytes":
+        return ByteTokenizer()
+    kind, _, argument = spec.partition(":")
+    if not argument:
+        raise ValueError(f"Unknown tokenizer '{spec}'")
+    if kind == "hf":
+        return HuggingFaceTokenizer(argument)
+    if kind == "tiktoken":
+        return TiktokenTokenizer(argument)
+    return getattr(importlib.import_module(kind), argument)()
+
+
+def render_sample(record: Dict) -> str:
+    """Training text of a dataset record: the transcript, then its route and score."""
+    lines = [f"{turn['role']}: {turn['content']}" for turn in record["conversation"]]
+    lines.append(f"route: {record['domain']}/{record['action']}")
+    lines.append(f"score: {record['label_score']}")
+    return "\n".join(lines)
+
+
+def length_buckets(sequence_length: int, smallest: int = 64) -> List[int]:
+    """Power-of-two bucket bounds up to the sequence length."""
+    bounds = []
+    bound = smallest
+    while bound < sequence_length:
+        bounds.append(bound)
+        bound *= 2
+    return bounds + [sequence_length]
+
+
+class _SpaceTree:
+    """Open bins by remaining space, with the smallest space >= n in O(log n)."""
+
+    def __init__(self, capacity: int):
+        self.size = 1
+        while self.size < capacity + 1:
+            self.size *= 2
+        self.counts = [0] * (2 * self.size)
+        self.bins: List[List[int]] = [[] for _ in range(capacity + 1)]
+
+    def _update(self, space: int, delta: int):
+        node = space + self.size
+        while node:
+            self.counts[node] += delta
+            node //= 2
+
+    def add(self, space: int, bin_id: int):
+        self.bins[space].append(bin_id)
+        self._update(space, 1)
+
+    def pop_at_least(self, needed: int) -> Optional[int]:
+        """Remove and return the open bin with the least space that still fits."""
+        node = needed + self.size
+        if not self.counts[node]:
+            # Climb until a right sibling subtree has an open bin, then descend
+            while node > 1 and (node % 2 == 1 or not self.counts[node + 1]):
+                node //= 2
+            if node == 1:
+                return None
+            node += 1
+            while node < self.size:
+                node = 2 * node if self.counts[2 * node] else 2 * node + 1
+        space = node - self.size
+        self._update(space, -1)
+        return self.bins[space].pop()
+
+
+def pack_lengths(lengths: List[int], capacity: int) -> List[List[int]]:
+    """Best-fit decreasing bin packing; returns the item indices of each bin."""
+    order = sorted(range(len(lengths)), key=lambda i: (-lengths[i], i))
+    bins: List[List[int]] = []
+    remaining: List[int] = []
+    space = _SpaceTree(capacity)
+    for item in order:
+        bin_id = space.pop_at_least(lengths[item])
+        if bin_id is None:
+            bin_id = len(bins)
+            bins.append([])
+            remaining.append(capacity)
+        bins[bin_id].append(item)
+        remaining[bin_id] -= lengths[item]
+        if remaining[bin_id]:
+            space.add(remaining[bin_id], bin_id)
+    return bins
+
+
+def _pack_partition(task) -> Dict:
+    """Tokenize, bucket and pack one partition of records into one shard."""
+    number, first_ordinal, records, options = task
+    tokenizer = _worker_tokenizer or load_tokenizer(options["tokenizer"])
+    capacity = options["sequence_length"]
+    bounds = length_buckets(capacity)
+
+    samples, truncated = [], 0
+    for record in records:
+        if isinstance(record, bytes):
+            record = decode_record(record)
+        encoded = tokenizer.encode(render_sample(record))
+        truncated += len(encoded) > capacity - 1
+        tokens = encoded[: capacity - 1]
+        tokens.append(tokenizer.eos_id)
+        samples.append(tokens)
+    lengths = [len(tokens) for tokens in samples]
+
+    buckets = [0] * len(bounds)
+    bucket_tokens = 0
+    for length in lengths:
+        bucket = next(i for i, bound in enumerate(bounds) if length <= bound)
+        buckets[bucket] += 1
+        bucket_tokens += bounds[bucket]
+
+    bins = pack_lengths(lengths, capacity)
+    stem = os.path.join(options["output_dir"], f"packed-{number:05d}")
+    tokens_out = array("I")
+    padding = array("I", [tokenizer.pad_id]) * capacity
+    with open(f"{stem}.jsonl", "wb") as segments:
+        for items in bins:
+            for item in items:
+                tokens_out.extend(samples[item])
+            tokens_out.extend(padding[: capacity - sum(lengths[item] for item in items)])
+            segments.write(
+                encode_record(
+                    {
+                        "samples": [first_ordinal + item for item in items],
+                        "lengths": [lengths[item] for item in items],
+                    }
+                )
+            )
+    with open(f"{stem}.bin", "wb") as f:
+        tokens_out.tofile(f)
+
+    return {
+        "file": os.path.basename(f"{stem}.bin"),
+        "segments": os.path.basename(f"{stem}.jsonl"),
+        "sequences": len(bins),
+        "samples": len(records),
+        "tokens": sum(lengths),
+        "truncated": truncated,
+        "buckets": buckets,
+        "bucket_padded_tokens": bucket_tokens,
+    }
+
+
+def _init_worker(spec: str):
+    global _worker_tokenizer
+    _worker_tokenizer = load_tokenizer(spec)
+
+
+def _iter_records(dataset_file: str) -> Iterator:
+    """Records of a columnar dataset, or the raw lines of a JSONL one.
+
+    JSONL lines are parsed by the workers rather than the parent process.
+    """
+    if dataset_file.endswith(tuple(COLUMNAR_EXTENSIONS.values())):
+        for batch in load_dataset_table(dataset_file).to_batches():
+            yield from batch.to_pylist()
+    else:
+        yield from iter_dataset_lines(dataset_file)
+
+
+def _partitions(records: Iterable[Dict], size: int, options: Dict) -> Iterator:
+    batch, first = [], 0
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield (first // size, first, batch, options)
+            first += len(batch)
+            batch = []
+    if batch:
+        yield (first // size, first, batch, options)
+
+
+def pack_dataset(
+    dataset_file: str,
+    output_dir: str,
+    sequence_length: int = 2048,
+    tokenizer: str = "bytes",
+    workers: int = 0,
+    partition_size: int = 50000,
+) -> Dict:
+    """Pack a dataset into fixed-length training sequences.
+
+    Each partition of partition_size records is tokenized, counted into
+    power-of-two length buckets and bin-packed (best-fit decreasing) into
+    sequences of sequence_length tokens, each sample ending in the
+    tokenizer's end-of-sample id and each sequence padded with its pad id.
+    Partitions are packed in parallel by workers processes (0 uses every
+    core) and each becomes one shard: packed-NNNNN.bin holds the sequences
+    as uint32 token ids and packed-NNNNN.jsonl has one line per sequence
+    with the dataset ordinals and token lengths of its samples.
+    packed_index.json lists the shards and the packing statistics.
+    """
+    if sequence_length < 2:
+        raise ValueError("sequence_length must leave room for a token and end-of-sample")
+    os.makedirs(output_dir, exist_ok=True)
+    # Fails early on a bad spec and provides the special ids for the index
+    special = load_tokenizer(tokenizer)
+    options = {
+        "tokenizer": tokenizer,
+        "sequence_length": sequence_length,
+        "output_dir": output_dir,
+    }
+    tasks = _partitions(_iter_records(dataset_file), partition_size, options)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(tokenizer)
+        shards = list(map(_pack_partition, tasks))
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(tokenizer,)) as pool:
+            shards = list(pool.imap(_pack_partition, tasks))
+
+    sequences = sum(shard["sequences"] for shard in shards)
+    tokens = sum(shard["tokens"] for shard in shards)
+    samples = sum(shard["samples"] for shard in shards)
+    bucket_padded = sum(shard.pop("bucket_padded_tokens") for shard in shards)
+    bounds = length_buckets(sequence_length)
+    index = {
+        "dataset": os.path.abspath(dataset_file),
+        "tokenizer": tokenizer,
+        "sequence_length": sequence_length,
+        "dtype": "uint32",
+        "byteorder": sys.byteorder,
+        "eos_id": special.eos_id,
+        "pad_id": special.pad_id,
+        "samples": samples,
+        "sequences": sequences,
+        "tokens": tokens,
+        "truncated": sum(shard["truncated"] for shard in shards),
+        "buckets": {
+            str(bound): sum(shard["buckets"][i] for shard in shards)
+            for i, bound in enumerate(bounds)
+        },
+        # Share of real tokens when packed, padded to the bucket bound or
+        # padded to the full sequence length one sample per sequence
+        "packing_efficiency": tokens / (sequences * sequence_length) if sequences else 0.0,
+        "bucket_padding_efficiency": tokens / bucket_padded if bucket_padded else 0.0,
+        "unpacked_efficiency": tokens / (samples * sequence_length) if samples else 0.0,
+        "shards": shards,
+    }
+    with open(os.path.join(output_dir, PACKED_INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def format_packing_report(index: Dict) -> str:
+    """Human-readable summary of a packed export."""
+    lines = [
+        f"Packed {index['samples']} samples ({index['tokens']} tokens) into "
+        f"{index['sequences']} sequences of {index['sequence_length']} tokens "
+        f"in {len(index['shards'])} shards",
+        f"  Packing efficiency: {index['packing_efficiency']:.1%} "
+        f"(bucket padding {index['bucket_padding_efficiency']:.1%}, "
+        f"one sample per sequence {index['unpacked_efficiency']:.1%})",
+        "  Length buckets: "
+        + ", ".join(f"<={bound}: {count}" for bound, count in index["buckets"].items()),
+    ]
+    if index["truncated"]:
+        lines.append(f"  Truncated to the sequence length: {index['truncated']} samples")
+    return "\n".join(lines)
+
+
+def main():
+    """Command line entry point for packing a dataset."""
+    parser = argparse.ArgumentParser(
+        description="Pack an Arch-Router dataset into fixed-length training sequences"
+    )
+    parser.add_argument(
+        "dataset_file", help="JSONL dataset (or sharded dataset base name), Parquet or Arrow file"
+    )
+    parser.add_argument("output_dir", help="Directory for packed shards and the index")
+    parser.add_argument("--sequence-length", type=int, default=2048)
+    parser.add_argument(
+        "--tokenizer",
+        default="bytes",
+        help="bytes, hf:<local path>, tiktoken:<encoding> or <module>:<factory>",
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Processes (0 = all cores)")
+    parser.add_argument("--partition-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    index = pack_dataset(
+        args.dataset_file,
+        args.output_dir,
+        args.sequence_length,
+        args.tokenizer,
+        args.workers,
+        args.partition_size,
+    )
+    print(format_packing_report(index))
+    print(f"Index written to {os.path.join(args.output_dir, PACKED_INDEX_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import bisect
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from src.models.alignment import AlignmentScore
+from src.models.augmentation import AugmentedConversation
+from src.models.conversation import Conversation
+from src.phase2.augmentation_module import LABEL_SCORES
+from src.utils.conversation_formatter import format_sample
+from src.utils.rng import conversation_key
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_key TEXT UNIQUE NOT NULL,
+    run_id TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    action TEXT NOT NULL,
+    description TEXT NOT NULL,
+    turns TEXT NOT NULL,
+    score REAL NOT NULL,
+    reasoning TEXT NOT NULL,
+    model TEXT NOT NULL,
+    latency REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_score ON conversations (score);
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_key TEXT NOT NULL,
+    sample_key TEXT UNIQUE NOT NULL,
+    augmentation_type TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_conversation ON samples (conversation_key);
+"""
+
+
+class ProvenanceStore:
+    """SQLite store of every scored conversation and the samples derived from it.
+
+    Rejected conversations are kept alongside accepted ones with their
+    LLM-3 score, reasoning, model, latency and token usage, so the final
+    dataset can be rebuilt for any alignment threshold without API calls.
+    Conversations that were rejected when generated have no augmentations,
+    so lowering the threshold adds them as "original" samples only.
+    """
+
+    def __init__(self, path: str, run_id: str = ""):
+        self.path = path
+        self.run_id = run_id or time.strftime("%Y%m%dT%H%M%S")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record_scored(
+        self, conversations: List[Conversation], scores: List[AlignmentScore]
+    ):
+        """Store conversations with their alignment scores (duplicates are ignored)."""
+        now = time.time()
+        rows = [
+            (
+                conversation_key(conversation),
+                self.run_id,
+                conversation.domain,
+                conversation.action,
+                conversation.description,
+                json.dumps([turn.model_dump() for turn in conversation.turns]),
+                score.score,
+                score.reasoning,
+                score.model,
+                score.latency,
+                score.prompt_tokens,
+                score.completion_tokens,
+                now,
+            )
+            for conversation, score in zip(conversations, scores)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO conversations (conversation_key, run_id, domain, action, "
+                "description, turns, score, reasoning, model, latency, prompt_tokens, "
+                "completion_tokens, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def record_variants(
+        self,
+        variants: List[AugmentedConversation],
+        source: Optional[Conversation] = None,
+    ):
+        """Store the samples produced from one source conversation.
+
+        Without source, the first variant must be the original conversation.
+        """
+        if not variants:
+            return
+        source_key = conversation_key(source or variants[0].conversation)
+        rows = []
+        for variant in variants:
+            record = format_sample(variant)
+            serialized = json.dumps(record, sort_keys=True)
+            sample_key = hashlib.sha256(
+                f"{source_key}:{serialized}".encode("utf-8")
+            ).hexdigest()
+            rows.append((source_key, sample_key, variant.augmentation_type, json.dumps(record)))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO samples (conversation_key, sample_key, "
+                "augmentation_type, record) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def scores(self) -> List[float]:
+        """Return every stored score in ascending order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT score FROM conversations ORDER BY score"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def yield_curve(self, thresholds: List[float]) -> List[Dict]:
+        """Accepted conversations and samples for each threshold."""
+        scores = self.scores()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.score, COUNT(s.id) FROM conversations c "
+                "LEFT JOIN samples s ON s.conversation_key = c.conversation_key "
+                "GROUP BY c.id ORDER BY c.score"
+            ).fetchall()
+        # Conversations without stored samples contribute their original only
+        cumulative = [0]
+        for _, sample_count in reversed(rows):
+            cumulative.append(cumulative[-1] + max(1, sample_count))
+
+        total = len(scores)
+        curve = []
+        for threshold in sorted(thresholds):
+            accepted = total - bisect.bisect_left(scores, threshold)
+            curve.append(
+                {
+                    "threshold": threshold,
+                    "accepted": accepted,
+                    "rejected": total - accepted,
+                    "acceptance_rate": accepted / total if total else 0.0,
+                    "samples": cumulative[accepted],
+                }
+            )
+        return curve
+
+    def iter_dataset(self, threshold: float, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Rebuild final dataset records for a threshold, in generation order."""
+        with self._lock:
+            conversations = self._conn.execute(
+                "SELECT conversation_key, domain, action, description, turns FROM conversations "
+                "WHERE score >= ? ORDER BY id",
+                (threshold,),
+            ).fetchall()
+            samples: Dict[str, List[str]] = {}
+            for key, record in self._conn.execute(
+                "SELECT s.conversation_key, s.record FROM samples s "
+                "JOIN conversations c ON c.conversation_key = s.conversation_key "
+                "WHERE c.score >= ? ORDER BY s.id",
+                (threshold,),
+            ):
+                samples.setdefault(key, []).append(record)
+
+        produced = 0
+        for key, domain, action, description, turns in conversations:
+            stored = samples.get(key)
+            if stored:
+                records = [json.loads(record) for record in stored]
+            else:
+                records = [
+                    {
+                        "conversation": json.loads(turns),
+                        "domain": domain,
+                        "action": action,
+                        "description": description,
+                        "label_score": LABEL_SCORES["original"],
+                        "augmentation_type": "original",
+                    }
+                ]
+            for record in records:
+                if limit is not None and produced >= limit:
+                    return
+                yield record
+                produced += 1
+
+    def summary(self) -> Dict:
+        """Totals for reporting: conversations, samples, token usage and latency."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), "
+                "COALESCE(SUM(completion_tokens), 0), COALESCE(AVG(latency), 0) FROM conversations"
+            ).fetchone()
+            samples = self._conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+        return {
+            "conversations": row[0],
+            "samples": samples,
+            "evaluation_prompt_tokens": row[1],
+            "evaluation_completion_tokens": row[2],
+            "average_evaluation_latency": row[3],
+        }
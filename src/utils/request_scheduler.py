@@ -0,0 +1,195 @@
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Position of each LLM stage in an item's path; later stages are served first
+# so that items already in flight finish before new ones are started. This
+# only applies where requests of several stages are pending at once
+# (speculative augmentation, daemon jobs sharing a scheduler); run_pipeline
+# runs one stage at a time
+STAGE_RANKS = {
+    "policy": 0,
+    "conversation": 1,
+    "evaluation": 2,
+    "paraphrase": 3,
+    "noise": 3,
+    "irrelevant": 3,
+    "domain_mix": 3,
+}
+POLICIES = ("fifo", "token")
+
+
+class Ticket:
+    """A request waiting for, or holding, a dispatch slot."""
+
+    __slots__ = ("stage", "tokens", "seq", "enqueued_at", "granted", "entry")
+
+    def __init__(self, stage: str, tokens: int, seq: int, enqueued_at: float):
+        self.stage = stage
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued_at = enqueued_at
+        self.granted = False
+        # [sent_at, tokens, in_window] while counted in the rate-limit window
+        self.entry: Optional[list] = None
+
+
+class RequestScheduler:
+    """Orders pending LLM requests and paces them to the rate limits.
+
+    A request waits until fewer than max_in_flight requests are in flight
+    and, when requests_per_minute or tokens_per_minute are set, until the
+    sliding window has room for its estimated tokens. The "fifo" policy
+    dispatches in arrival order, so a request that doesn't fit blocks the
+    ones behind it. The "token" policy dispatches downstream stages first
+    (when requests of several stages are pending) and then the smallest
+    requests, and skips ahead to smaller requests that still fit the
+    window. A request that has waited max_wait_seconds
+    goes first and is no longer skipped, so large requests can't starve.
+    With no limits set, slot() doesn't wait at all.
+    """
+
+    def __init__(
+        self,
+        policy: str = "fifo",
+        max_in_flight: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        window_seconds: float = 60.0,
+        max_wait_seconds: float = 300.0,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy '{policy}', expected fifo or token")
+        self.policy = policy
+        self.max_in_flight = max_in_flight
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.enabled = bool(max_in_flight or requests_per_minute or tokens_per_minute)
+
+        self._lock = threading.Condition()
+        self._seq = itertools.count()
+        self._pending: List[Ticket] = []
+        self._window = deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+
+        self.requests = 0
+        self.tokens = 0
+        self.total_wait = 0.0
+        self._first_sent: Optional[float] = None
+        self._last_done: Optional[float] = None
+
+    def _prune(self, now: float):
+        while self._window and self._window[0][0] <= now - self.window_seconds:
+            entry = self._window.popleft()
+            entry[2] = False
+            self._window_tokens -= entry[1]
+
+    def _fits(self, tokens: int) -> bool:
+        if self.max_in_flight and self._in_flight >= self.max_in_flight:
+            return False
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            return False
+        if self.tokens_per_minute and self._window:
+            # A request larger than the whole limit still goes into an empty window
+            return self._window_tokens + tokens <= self.tokens_per_minute
+        return True
+
+    def _order(self, now: float) -> List[Ticket]:
+        if self.policy == "fifo":
+            return self._pending
+
+        def key(ticket: Ticket):
+            if now - ticket.enqueued_at >= self.max_wait_seconds:
+                return (0, 0, 0, ticket.seq)
+            return (1, -STAGE_RANKS.get(ticket.stage, 0), ticket.tokens, ticket.seq)
+
+        return sorted(self._pending, key=key)
+
+    def _dispatch(self, now: float):
+        """Grant slots to pending tickets in policy order while they fit."""
+        self._prune(now)
+        granted = False
+        for ticket in self._order(now):
+            if not self._fits(ticket.tokens):
+                aged = now - ticket.enqueued_at >= self.max_wait_seconds
+                if self.policy == "fifo" or aged:
+                    break
+                continue
+            ticket.granted = True
+            ticket.entry = [now, ticket.tokens, True]
+            self._window.append(ticket.entry)
+            self._window_tokens += ticket.tokens
+            self._in_flight += 1
+            self.requests += 1
+            self.total_wait += now - ticket.enqueued_at
+            granted = True
+        if granted:
+            self._pending = [ticket for ticket in self._pending if not ticket.granted]
+            if self._first_sent is None:
+                self._first_sent = now
+            self._lock.notify_all()
+
+    def _wake_at(self, now: float) -> Optional[float]:
+        """When the window next frees up, or None if only a release can help."""
+        if not self._window or (self.max_in_flight and self._in_flight >= self.max_in_flight):
+            return None
+        return self._window[0][0] + self.window_seconds
+
+    @contextmanager
+    def slot(self, stage: str, tokens: int) -> Iterator[Optional[Ticket]]:
+        """Wait for a dispatch slot for a request of about this many tokens."""
+        if not self.enabled:
+            yield None
+            return
+        with self._lock:
+            now = time.monotonic()
+            ticket = Ticket(stage, tokens, next(self._seq), now)
+            self._pending.append(ticket)
+            self._dispatch(now)
+            while not ticket.granted:
+                wake = self._wake_at(now)
+                self._lock.wait(None if wake is None else max(0.001, wake - now))
+                now = time.monotonic()
+                self._dispatch(now)
+        try:
+            yield ticket
+        finally:
+            with self._lock:
+                now = time.monotonic()
+                self._in_flight -= 1
+                self.tokens += ticket.entry[1]
+                self._last_done = now
+                self._dispatch(now)
+                # Waiters blocked on max_in_flight have no timeout to wake them
+                self._lock.notify_all()
+
+    def settle(self, ticket: Optional[Ticket], tokens: Optional[int]):
+        """Replace a request's estimate with its actual usage."""
+        if ticket is None or tokens is None:
+            return
+        with self._lock:
+            if ticket.entry[2]:
+                self._window_tokens += tokens - ticket.entry[1]
+            ticket.entry[1] = tokens
+            self._dispatch(time.monotonic())
+
+    def get_stats(self) -> Dict:
+        """Requests, tokens, mean wait and (with a token limit) quota utilization."""
+        with self._lock:
+            stats = {
+                "policy": self.policy,
+                "requests": self.requests,
+                "tokens": self.tokens,
+                "mean_wait_seconds": self.total_wait / self.requests if self.requests else 0.0,
+            }
+            if self.tokens_per_minute and self._first_sent is not None and self._last_done:
+                # A sliding window admits one full window of tokens up front
+                windows = (self._last_done - self._first_sent) / self.window_seconds + 1
+                stats["utilization"] = self.tokens / (self.tokens_per_minute * windows)
+            return stats
@@ -0,0 +1,23 @@
+import hashlib
+import json
+import random
+
+from src.models.conversation import Conversation
+
+
+def item_rng(seed: int, *identity) -> random.Random:
+    """Return a random generator derived from the run seed and an item's identity.
+
+    Each item's choices depend only on what the item is, not on how many
+    random draws happened before it, so parallel, resumed and sharded runs
+    make the same choices.
+    """
+    material = json.dumps([seed, *identity], sort_keys=True, default=str)
+    digest = hashlib.sha256(material.encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def conversation_key(conversation: Conversation) -> str:
+    """Stable identity of a generated conversation."""
+    canonical = json.dumps(conversation.model_dump(), sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,148 @@
+from typing import Dict, List, Sequence, Tuple
+
+from src.utils import example_selector
+
+# numpy is optional and only needed for similarity-based partner selection
+np = None
+
+INDEX_HASH_BITS = 8  # 256 hashed n-gram features per text
+
+
+def _require_numpy():
+    global np
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - optional dependency
+        raise ImportError(
+            "The similarity index requires the 'numpy' package (pip install numpy)"
+        )
+    np = numpy
+
+
+class SimilarityIndex:
+    """Cross-domain nearest neighbours of texts over hashed n-gram vectors.
+
+    Texts are added incrementally and stored as float16 vectors in fixed
+    blocks of block_size rows. A query scans the blocks with one matrix
+    product per (query chunk, block) and merges each block's top-k into a
+    running top-k, so memory beyond the stored vectors stays at
+    query_chunk_size x block_size scores however large the index grows.
+    Neighbours from the query's own domain are never returned.
+    """
+
+    def __init__(
+        self,
+        bits: int = INDEX_HASH_BITS,
+        block_size: int = 16384,
+        query_chunk_size: int = 512,
+    ):
+        _require_numpy()
+        self.bits = bits
+        self.dim = 1 << bits
+        self.block_size = block_size
+        self.query_chunk_size = query_chunk_size
+        self._vectors: List = []
+        self._domains: List = []
+        self._domain_ids: Dict[str, int] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _domain_codes(self, domains: Sequence[str], add: bool):
+        if add:
+            for domain in domains:
+                self._domain_ids.setdefault(domain, len(self._domain_ids))
+        # A domain the index hasn't seen matches no stored text
+        return np.array([self._domain_ids.get(domain, -1) for domain in domains], dtype=np.int32)
+
+    def add(self, texts: Sequence[str], domains: Sequence[str]) -> range:
+        """Add texts with their domains; returns their ids (positions in insertion order)."""
+        if len(texts) != len(domains):
+            raise ValueError("Each text needs a domain")
+        start = self.size
+        codes = self._domain_codes(domains, add=True)
+        offset = 0
+        while offset < len(texts):
+            if self.size == len(self._vectors) * self.block_size:
+                self._vectors.append(np.zeros((self.block_size, self.dim), dtype=np.float16))
+                self._domains.append(np.full(self.block_size, -1, dtype=np.int32))
+            row = self.size % self.block_size
+            count = min(self.block_size - row, len(texts) - offset)
+            self._vectors[-1][row : row + count] = example_selector.hashed_ngram_vectors(
+                texts[offset : offset + count], bits=self.bits
+            )
+            self._domains[-1][row : row + count] = codes[offset : offset + count]
+            self.size += count
+            offset += count
+        return range(start, self.size)
+
+    def query(self, texts: Sequence[str], domains: Sequence[str], k: int) -> Tuple:
+        """The k most similar stored texts from other domains for each text.
+
+        Returns (ids, scores) arrays of shape (len(texts), k), best first;
+        missing neighbours have id -1.
+        """
+        codes = self._domain_codes(domains, add=False)
+        ids = np.full((len(texts), k), -1, dtype=np.int64)
+        scores = np.full((len(texts), k), -np.inf, dtype=np.float32)
+        for low in range(0, len(texts), self.query_chunk_size):
+            high = min(low + self.query_chunk_size, len(texts))
+            queries = example_selector.hashed_ngram_vectors(texts[low:high], bits=self.bits)
+            ids[low:high], scores[low:high] = self._search(queries, codes[low:high], k)
+        ids[np.isneginf(scores)] = -1
+        return ids, scores
+
+    def _search(self, queries, codes, k: int) -> Tuple:
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for number, (block, block_domains) in enumerate(zip(self._vectors, self._domains)):
+            filled = min(self.block_size, self.size - number * self.block_size)
+            scores = queries @ block[:filled].T.astype(np.float32)
+            scores[codes[:, None] == block_domains[None, :filled]] = -np.inf
+            # Only rows with a score above their current k-th best can change
+            active = np.flatnonzero((scores > best_scores[:, -1:]).any(axis=1))
+            if not len(active):
+                continue
+            scores = scores[active]
+            if filled > k:
+                top = np.argpartition(scores, filled - k, axis=1)[:, filled - k :]
+            else:
+                top = np.broadcast_to(np.arange(filled), (len(active), filled))
+            rows = np.arange(len(active))[:, None]
+            merged_ids = np.concatenate([best_ids[active], top + number * self.block_size], axis=1)
+            merged_scores = np.concatenate([best_scores[active], scores[rows, top]], axis=1)
+            keep = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+            best_ids[active] = merged_ids[rows, keep]
+            best_scores[active] = merged_scores[rows, keep]
+        return best_ids, best_scores
+
+
+class DigestSet:
+    """Set of 64-bit digests held in one sorted uint64 array (8 bytes each)."""
+
+    def __init__(self):
+        _require_numpy()
+        self._digests = np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    @property
+    def nbytes(self) -> int:
+        return self._digests.nbytes
+
+    def add(self, digests: Sequence[int]) -> List[bool]:
+        """Add digests; returns for each whether it is new (its first occurrence)."""
+        values = np.asarray(digests, dtype=np.uint64)
+        positions = np.searchsorted(self._digests, values)
+        known = positions < len(self._digests)
+        known[known] = self._digests[positions[known]] == values[known]
+        new = np.zeros(len(values), dtype=bool)
+        new[np.unique(values, return_index=True)[1]] = True
+        new &= ~known
+        if new.any():
+            self._digests = np.union1d(self._digests, values[new])
+        return new.tolist()
@@ -0,0 +1,187 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.models.alignment import AlignmentScore
+from src.utils.metrics import MetricsRecorder
+
+# Signature of an augmentation run: it receives a proceed() check to ask
+# before each LLM call and returns the item's variants
+Augment = Callable[[Callable[[], bool]], List]
+
+
+class _Run:
+    """Augmentation calls started by one speculative run."""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def proceed(self) -> bool:
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self.calls += 1
+            return True
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+
+
+class SpeculativeAugmenter:
+    """Overlaps an item's augmentation with its alignment scoring.
+
+    run() starts the augmentation in a background thread, scores the item
+    in the calling thread and keeps the variants if the item is aligned.
+    If it is rejected the augmentation is cancelled: branches that haven't
+    started yet are skipped, and calls already in flight finish in the
+    background and are discarded (counted as wasted). Speculation only pays
+    off when most items are accepted, so while the acceptance rate of the
+    last `window` items is below break_even (after min_observations items),
+    run() scores first and augments only aligned items, as without
+    speculation. Scoring still happens either way, so speculation resumes
+    once the acceptance rate recovers.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        break_even: float = 0.5,
+        min_observations: int = 20,
+        window: int = 100,
+        max_workers: int = 2,
+        metrics: Optional[MetricsRecorder] = None,
+    ):
+        if not 0.0 <= break_even <= 1.0:
+            raise ValueError(f"break_even must be between 0 and 1, got {break_even}")
+        self.enabled = enabled
+        self.break_even = break_even
+        self.min_observations = max(1, min_observations)
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=max(window, self.min_observations))
+        self._speculating = True
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.items = {"accepted": 0, "rejected": 0, "serial": 0}
+        self.calls = 0
+        self.wasted_calls = 0
+
+    def acceptance_rate(self) -> float:
+        """Share of accepted items among the last `window` scored items."""
+        with self._lock:
+            if not self._outcomes:
+                return 1.0
+            return sum(self._outcomes) / len(self._outcomes)
+
+    def speculating(self) -> bool:
+        """Whether the next item's augmentation will start before it is scored."""
+        with self._lock:
+            return self.enabled and self._speculating
+
+    def _observe(self, accepted: bool):
+        with self._lock:
+            self._outcomes.append(accepted)
+            if len(self._outcomes) < self.min_observations:
+                return
+            rate = sum(self._outcomes) / len(self._outcomes)
+            speculating = rate >= self.break_even
+            changed = speculating != self._speculating
+            self._speculating = speculating
+        if self.enabled and changed:
+            state = "resumed" if speculating else "paused"
+            print(
+                f"Speculative augmentation {state}: acceptance {rate:.0%}, "
+                f"break-even {self.break_even:.0%}"
+            )
+
+    def _record(self, outcome: str, calls: int):
+        with self._lock:
+            self.items[outcome] += 1
+            self.calls += calls
+            if outcome == "rejected":
+                self.wasted_calls += calls
+        if self.metrics is not None:
+            self.metrics.record_speculation(outcome, calls)
+
+    def run(
+        self, evaluate: Callable[[], AlignmentScore], augment: Augment
+    ) -> Tuple[AlignmentScore, List]:
+        """Score an item and return its score and variants ([] if rejected)."""
+        if not self.speculating():
+            score = evaluate()
+            self._observe(score.is_aligned)
+            if self.enabled:
+                self._record("serial", 0)
+            return score, augment(_always) if score.is_aligned else []
+
+        run = _Run()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="speculation"
+                )
+            executor = self._executor
+        future = executor.submit(augment, run.proceed)
+        try:
+            score = evaluate()
+        except BaseException:
+            self._discard(run, future)
+            raise
+
+        self._observe(score.is_aligned)
+        if not score.is_aligned:
+            self._discard(run, future)
+            return score, []
+        try:
+            return score, future.result()
+        finally:
+            self._record("accepted", run.calls)
+
+    def _discard(self, run: _Run, future: Future):
+        run.cancel()
+        if future.cancel():
+            self._record("rejected", 0)
+        else:
+            # Calls already in flight finish in the background; count them once done
+            future.add_done_callback(lambda _: self._record("rejected", run.calls))
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "speculating": self.enabled and self._speculating,
+                "items": dict(self.items),
+                "calls": self.calls,
+                "wasted_calls": self.wasted_calls,
+                "wasted_call_rate": (
+                    round(self.wasted_calls / self.calls, 4) if self.calls else 0.0
+                ),
+            }
+
+    def close(self):
+        """Wait for discarded augmentation calls still in flight and stop the threads."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _always() -> bool:
+    return True
+
+
+def format_speculation(summary: Dict) -> str:
+    """One-line report of a SpeculativeAugmenter summary."""
+    items = summary["items"]
+    speculated = items["accepted"] + items["rejected"]
+    return (
+        f"Speculative augmentation: {speculated} of {speculated + items['serial']} items "
+        f"speculated, {summary['wasted_calls']} of {summary['calls']} calls wasted "
+        f"({summary['wasted_call_rate']:.1%})"
+    )
@@ -0,0 +1,205 @@
+import math
+import threading
+from typing import Dict, Optional, Tuple
+
+# Rough characters per token of English text (no tokenizer is bundled)
+CHARS_PER_TOKEN = 4
+
+# Lower numbers are more important; higher ones are stopped first near the cap
+STAGE_PRIORITIES = {
+    "policy": 0,
+    "conversation": 0,
+    "evaluation": 0,
+    "paraphrase": 1,
+    "noise": 1,
+    "irrelevant": 1,
+    "domain_mix": 2,
+}
+MAX_PRIORITY = max(STAGE_PRIORITIES.values())
+
+LIMIT_KEYS = ("requests", "tokens", "cost")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of a prompt or completion."""
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised instead of sending a request that the spend budget doesn't allow."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"Budget exhausted for {stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+def _empty_usage() -> Dict[str, float]:
+    return {"requests": 0, "input_tokens": 0, "output_tokens": 0, "tokens": 0, "cost": 0.0}
+
+
+class SpendBudget:
+    """Per-run and per-stage limits on requests, tokens and dollars.
+
+    Every request reserves its worst case (estimated prompt tokens plus
+    max_tokens) before it is sent and settles to the response's usage
+    afterwards, so concurrent requests can't overshoot a hard cap. As the
+    run approaches its limits, low-priority stages are refused first:
+    domain mixing at wind_down_at of the budget, the other augmentations
+    halfway between that and the cap, and generation and evaluation only at
+    the cap itself. A limit of 0 is unlimited.
+    """
+
+    def __init__(
+        self,
+        max_requests: int = 0,
+        max_tokens: int = 0,
+        max_cost: float = 0.0,
+        stage_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        wind_down_at: float = 0.8,
+        input_price_per_million_tokens: float = 0.0,
+        output_price_per_million_tokens: float = 0.0,
+    ):
+        self.limits = {"requests": max_requests, "tokens": max_tokens, "cost": max_cost}
+        self.stage_limits = stage_limits or {}
+        self.wind_down_at = wind_down_at
+        self.input_price = input_price_per_million_tokens
+        self.output_price = output_price_per_million_tokens
+
+        self._lock = threading.Lock()
+        self._used: Dict[str, Dict[str, float]] = {}
+        self._pending: Dict[str, Dict[str, float]] = {}
+        self.refused: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return any(self.limits.values()) or bool(self.stage_limits)
+
+    def _cost(self, input_tokens: float, output_tokens: float) -> float:
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    def _totals(self, stage: Optional[str] = None) -> Dict[str, float]:
+        totals = _empty_usage()
+        for usage in (self._used, self._pending):
+            for name, values in usage.items():
+                if stage is None or name == stage:
+                    for key in totals:
+                        totals[key] += values[key]
+        return totals
+
+    @staticmethod
+    def _fraction(totals: Dict[str, float], limits: Dict[str, float]) -> float:
+        fractions = [totals[key] / limits[key] for key in LIMIT_KEYS if limits.get(key)]
+        return max(fractions, default=0.0)
+
+    def _threshold(self, stage: str) -> float:
+        priority = STAGE_PRIORITIES.get(stage, 0)
+        return 1.0 - (1.0 - self.wind_down_at) * priority / MAX_PRIORITY
+
+    def _refusal(
+        self, stage: str, request: Dict[str, float], at_limit: bool = False
+    ) -> Optional[str]:
+        """Reason to refuse request, if any. at_limit also refuses usage exactly at a limit."""
+        run = self._totals()
+        for key in run:
+            run[key] += request[key]
+        fraction = self._fraction(run, self.limits)
+        if fraction > self._threshold(stage) or (at_limit and fraction >= self._threshold(stage)):
+            if self._threshold(stage) < 1.0:
+                return "winding down low-priority work near the run budget"
+            return "run budget reached"
+
+        limits = self.stage_limits.get(stage)
+        if limits:
+            stage_totals = self._totals(stage)
+            for key in stage_totals:
+                stage_totals[key] += request[key]
+            fraction = self._fraction(stage_totals, limits)
+            if fraction > 1.0 or (at_limit and fraction >= 1.0):
+                return "stage budget reached"
+        return None
+
+    def _request(self, input_tokens: int, output_tokens: int) -> Dict[str, float]:
+        return {
+            "requests": 1,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "tokens": input_tokens + output_tokens,
+            "cost": self._cost(input_tokens, output_tokens),
+        }
+
+    def _add(
+        self,
+        usage: Dict[str, Dict[str, float]],
+        stage: str,
+        values: Dict[str, float],
+        sign: int = 1,
+    ):
+        entry = usage.setdefault(stage, _empty_usage())
+        for key in entry:
+            entry[key] += sign * values[key]
+
+    def reserve(
+        self, stage: str, prompt: str, max_output_tokens: int
+    ) -> Tuple[str, Dict[str, float]]:
+        """Reserve a request's worst case, or raise BudgetExceeded."""
+        request = self._request(estimate_tokens(prompt), max_output_tokens)
+        with self._lock:
+            reason = self._refusal(stage, request)
+            if reason is not None:
+                self.refused[stage] = self.refused.get(stage, 0) + 1
+                raise BudgetExceeded(stage, reason)
+            self._add(self._pending, stage, request)
+        return stage, request
+
+    def settle(
+        self,
+        reservation: Tuple[str, Dict[str, float]],
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+    ):
+        """Replace a reservation with the usage reported by the response.
+
+        Usage values that the response didn't report fall back to the
+        reserved estimate.
+        """
+        stage, request = reservation
+        actual = self._request(
+            request["input_tokens"] if prompt_tokens is None else prompt_tokens,
+            request["output_tokens"] if completion_tokens is None else completion_tokens,
+        )
+        with self._lock:
+            self._add(self._pending, stage, request, sign=-1)
+            self._add(self._used, stage, actual)
+
+    def release(self, reservation: Tuple[str, Dict[str, float]]):
+        """Settle a request that failed before returning usage."""
+        self.settle(reservation, prompt_tokens=0, completion_tokens=0)
+
+    def can_spend(self, stage: str) -> bool:
+        """True if the stage's limits haven't been reached yet.
+
+        A False answer counts as a refusal, since the caller skips the work.
+        """
+        with self._lock:
+            if self._refusal(stage, _empty_usage(), at_limit=True) is None:
+                return True
+            self.refused[stage] = self.refused.get(stage, 0) + 1
+            return False
+
+    @property
+    def refusals(self) -> int:
+        """Number of requests refused so far."""
+        with self._lock:
+            return sum(self.refused.values())
+
+    def get_stats(self) -> Dict:
+        """Spending so far per stage and in total, with refused requests."""
+        with self._lock:
+            used = {stage: dict(values) for stage, values in self._used.items()}
+            refused = dict(self.refused)
+        total = _empty_usage()
+        for values in used.values():
+            for key in total:
+                total[key] += values[key]
+        return {"total": total, "stages": used, "refused": refused, "limits": self.limits}
@@ -0,0 +1,92 @@
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+
+class TokenBudget:
+    """Per-call max_tokens derived from turn counts and observed completion lengths.
+
+    Each stage keeps a sliding window of completion tokens per turn. Until
+    enough observations exist the configured prior is used, afterwards the
+    window quantile is used. The result is scaled by a safety margin and
+    never exceeds the stage's configured max_tokens.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        tokens_per_turn: int = 90,
+        safety_margin: float = 1.5,
+        overhead_tokens: int = 32,
+        quantile: float = 0.95,
+        min_observations: int = 5,
+        window: int = 200,
+    ):
+        self.enabled = enabled
+        self.tokens_per_turn_prior = tokens_per_turn
+        self.safety_margin = safety_margin
+        self.overhead_tokens = overhead_tokens
+        self.quantile = quantile
+        self.min_observations = min_observations
+        self.window = window
+        self._observations: Dict[str, Deque[float]] = {}
+        self._truncations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self, stage: str, completion_tokens: int, num_turns: int, truncated: bool = False
+    ):
+        """Record the completion length of a response that produced num_turns turns."""
+        if num_turns <= 0 or completion_tokens <= 0:
+            return
+
+        per_turn = completion_tokens / num_turns
+        with self._lock:
+            if truncated:
+                # A truncated response only gives a lower bound, so push the
+                # quantile upwards instead of recording the censored length
+                self._truncations[stage] = self._truncations.get(stage, 0) + 1
+                per_turn *= 2
+            if stage not in self._observations:
+                self._observations[stage] = deque(maxlen=self.window)
+            self._observations[stage].append(per_turn)
+
+    def tokens_per_turn(self, stage: str) -> float:
+        """Return the current per-turn token estimate for a stage."""
+        with self._lock:
+            observed = list(self._observations.get(stage, ()))
+
+        if len(observed) < self.min_observations:
+            return float(self.tokens_per_turn_prior)
+
+        observed.sort()
+        index = min(len(observed) - 1, int(math.ceil(self.quantile * len(observed))) - 1)
+        return observed[max(index, 0)]
+
+    def max_tokens_for(self, stage: str, num_turns: int, ceiling: int) -> int:
+        """Return the max_tokens to request for a call expected to produce num_turns turns."""
+        if not self.enabled or num_turns <= 0:
+            return ceiling
+
+        estimate = (
+            self.tokens_per_turn(stage) * num_turns * self.safety_margin
+            + self.overhead_tokens
+        )
+        return max(1, min(ceiling, int(math.ceil(estimate))))
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-stage observation counts, truncations and estimates."""
+        with self._lock:
+            stages = list(self._observations.keys())
+            counts = {stage: len(self._observations[stage]) for stage in stages}
+            truncations = dict(self._truncations)
+
+        return {
+            stage: {
+                "observations": counts[stage],
+                "truncations": truncations.get(stage, 0),
+                "tokens_per_turn": round(self.tokens_per_turn(stage), 1),
+            }
+            for stage in stages
+        }
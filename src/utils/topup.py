@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, List, Tuple
+
+# Augmentation types whose samples keep the domain and action of their policy
+POLICY_TYPES = ["original", "paraphrase", "noise"]
+# Negative samples that can't be traced back to an intent
+GLOBAL_TYPES = ["irrelevant", "domain_mix"]
+
+
+def type_weights(config) -> Dict[str, float]:
+    """Expected samples of each augmentation type per aligned conversation."""
+    weights = {
+        "original": 1.0,
+        "paraphrase": config.paraphrase_probability,
+        "noise": config.noise_probability,
+        "irrelevant": config.irrelevant_probability,
+    }
+    if config.use_domain_mixing:
+        weights["domain_mix"] = config.domain_mix_probability
+    return weights
+
+
+def allocate(total: int, weights: Dict[str, float]) -> Dict[str, int]:
+    """Split total into integer counts proportional to weights (largest remainder)."""
+    weight_sum = sum(weights.values())
+    if total <= 0 or weight_sum <= 0:
+        return {key: 0 for key in weights}
+
+    exact = {key: total * weight / weight_sum for key, weight in weights.items()}
+    counts = {key: int(value) for key, value in exact.items()}
+    leftover = total - sum(counts.values())
+    for key in sorted(exact, key=lambda k: exact[k] - counts[k], reverse=True)[:leftover]:
+        counts[key] += 1
+    return counts
+
+
+def requested_distribution(
+    config, intent_names: List[str]
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int]]:
+    """Target sample counts per intent (policy types) and per type overall."""
+    type_totals = allocate(config.target_dataset_size, type_weights(config))
+    per_intent: Dict[str, Dict[str, int]] = {name: {} for name in intent_names}
+    for augmentation_type in POLICY_TYPES:
+        shares = allocate(
+            type_totals.get(augmentation_type, 0), {name: 1.0 for name in intent_names}
+        )
+        for name in intent_names:
+            per_intent[name][augmentation_type] = shares[name]
+    return per_intent, type_totals
+
+
+def count_existing(
+    records: Iterable[Dict], policy_intents: Dict[Tuple[str, str], str]
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int], int]:
+    """Count existing samples per intent and type, and per type overall.
+
+    policy_intents maps a policy's (domain, action) to its intent name.
+    Samples of policy types whose policy is unknown only count overall.
+    """
+    per_intent: Dict[str, Dict[str, int]] = {}
+    type_totals: Dict[str, int] = {}
+    total = 0
+    for record in records:
+        augmentation_type = record.get("augmentation_type", "original")
+        type_totals[augmentation_type] = type_totals.get(augmentation_type, 0) + 1
+        total += 1
+        intent_name = policy_intents.get((record.get("domain"), record.get("action")))
+        if augmentation_type in POLICY_TYPES and intent_name is not None:
+            counts = per_intent.setdefault(intent_name, {})
+            counts[augmentation_type] = counts.get(augmentation_type, 0) + 1
+    return per_intent, type_totals, total
+
+
+def compute_deficits(
+    requested: Tuple[Dict[str, Dict[str, int]], Dict[str, int]],
+    existing: Tuple[Dict[str, Dict[str, int]], Dict[str, int], int],
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int]]:
+    """Missing samples per intent for policy types, and per type for global types.
+
+    Per-intent deficits of a type are trimmed (latest intents first) so they
+    never exceed that type's overall deficit, which keeps unattributed
+    existing samples from being generated twice.
+    """
+    requested_intents, requested_types = requested
+    existing_intents, existing_types, _ = existing
+
+    intent_deficits = {
+        name: {
+            augmentation_type: max(
+                0, count - existing_intents.get(name, {}).get(augmentation_type, 0)
+            )
+            for augmentation_type, count in counts.items()
+        }
+        for name, counts in requested_intents.items()
+    }
+    type_deficits = {
+        augmentation_type: max(0, count - existing_types.get(augmentation_type, 0))
+        for augmentation_type, count in requested_types.items()
+    }
+
+    for augmentation_type in POLICY_TYPES:
+        excess = sum(
+            deficits.get(augmentation_type, 0) for deficits in intent_deficits.values()
+        ) - type_deficits.get(augmentation_type, 0)
+        for name in reversed(list(intent_deficits)):
+            if excess <= 0:
+                break
+            trimmed = min(excess, intent_deficits[name].get(augmentation_type, 0))
+            intent_deficits[name][augmentation_type] -= trimmed
+            excess -= trimmed
+
+    global_deficits = {
+        augmentation_type: type_deficits[augmentation_type]
+        for augmentation_type in GLOBAL_TYPES
+        if augmentation_type in type_deficits
+    }
+    return intent_deficits, global_deficits
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.models.conversation import Conversation
+from src.utils.rng import conversation_key
+
+# An item is a "kind:key" string or a (kind, key) pair, where key may be a
+# Conversation identified by its conversation_key
+Item = Union[str, Tuple[str, Union[str, Conversation]]]
+
+
+def _item_key(item: Item) -> str:
+    if isinstance(item, str):
+        return item
+    kind, key = item
+    if isinstance(key, Conversation):
+        key = conversation_key(key)
+    return f"{kind}:{key}"
+
+
+def policy_item(policy) -> Item:
+    """Trace item of a policy, linking LLM-1 to the conversations generated from it."""
+    return ("policy", f"{policy.domain}/{policy.action}")
+
+
+class _NullSpan:
+    """Span returned while tracing is off; every operation is a no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def link(self, *items: Item, parent: Optional[Item] = None):
+        pass
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed region of work, recorded as a complete event when it ends."""
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.items: List[str] = []
+        self.parent: Optional[str] = None
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._finish(self, time.perf_counter())
+        return False
+
+    def link(self, *items: Item, parent: Optional[Item] = None):
+        """Name the items this span produced and the item it worked on."""
+        self.items.extend(_item_key(item) for item in items)
+        if parent is not None:
+            self.parent = _item_key(parent)
+
+    def set(self, **args):
+        """Add arguments shown with the span."""
+        self.args.update(args)
+
+
+class Tracer:
+    """Span-based tracer exporting Chrome trace-event JSON.
+
+    Spans are recorded per thread as complete events, so stages, LLM calls
+    and the time batch items spent queued show up on a timeline in Perfetto
+    or chrome://tracing. Spans name the items they produce (a policy, a
+    conversation, its score, an augmented sample) and the item they worked
+    on, and are connected by flow arrows from intent to final sample, even
+    across worker threads. When disabled, span() returns a shared no-op
+    span and nothing is recorded.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events: List[Dict] = []
+        self._threads: Dict[int, int] = {}
+        # Item key -> (tid, end timestamp) of the span that produced it
+        self._items: Dict[str, Tuple[int, float]] = {}
+        self._next_flow = 0
+
+    def span(self, name: str, category: str = "llm", **args):
+        """Context manager timing a region; use as `with tracer.span(...) as span:`."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, start: float, end: float, **args):
+        """Record a region measured by the caller with time.perf_counter()."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._events.append(self._event(name, category, start, end, self._tid(), args))
+
+    def _ts(self, perf_time: float) -> float:
+        return round((perf_time - self._origin) * 1_000_000, 3)
+
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        tid = self._threads.get(ident)
+        if tid is None:
+            tid = self._threads[ident] = len(self._threads) + 1
+            self._events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                }
+            )
+        return tid
+
+    def _event(
+        self, name: str, category: str, start: float, end: float, tid: int, args: Dict
+    ) -> Dict:
+        return {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._ts(start),
+            "dur": round((end - start) * 1_000_000, 3),
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": args,
+        }
+
+    def _finish(self, span: Span, end: float):
+        with self._lock:
+            tid = self._tid()
+            if span.items:
+                span.args["items"] = span.items
+            if span.parent is not None:
+                span.args["parent"] = span.parent
+            self._events.append(
+                self._event(span.name, span.category, span.start, end, tid, span.args)
+            )
+            end_ts = self._ts(end)
+            for item in span.items:
+                self._items[item] = (tid, end_ts)
+
+            source = self._items.get(span.parent) if span.parent is not None else None
+            if source is not None:
+                # Flow arrow from the end of the producing span to the start of this one
+                self._next_flow += 1
+                source_tid, source_end = source
+                flow = {"name": "item", "cat": "flow", "id": self._next_flow, "pid": os.getpid()}
+                self._events.append({**flow, "ph": "s", "ts": source_end - 1, "tid": source_tid})
+                self._events.append(
+                    {**flow, "ph": "f", "bp": "e", "ts": self._ts(span.start), "tid": tid}
+                )
+
+    def events(self) -> List[Dict]:
+        with self._lock:
+            return list(self._events)
+
+    def write(self, path: str):
+        """Write the trace as Chrome trace-event JSON (opens in Perfetto)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,226 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.models.task import Task
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (status, priority DESC, id);
+"""
+
+
+class WorkQueue:
+    """Durable task queue in a SQLite file with lease-based ownership.
+
+    Workers lease pending tasks for lease_seconds and must heartbeat to keep
+    them. Leases that expire are put back to pending on the next lease call
+    (or marked failed after max_attempts), so a crashed worker never loses
+    work. Completion only succeeds for the current lease owner.
+
+    WAL mode gives concurrent readers and one writer across processes on the
+    same host. For a queue file on shared network storage, pass wal=False:
+    WAL needs shared memory that network filesystems don't provide.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        wal: bool = True,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        if wal:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, statements):
+        """Run statements(cursor) inside BEGIN IMMEDIATE and return its result."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cursor)
+                cursor.execute("COMMIT")
+                return result
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict,
+        dedupe_key: Optional[str] = None,
+        priority: int = 0,
+    ) -> bool:
+        """Add a task; returns False if a task with the same dedupe_key exists."""
+        return self.enqueue_many([(kind, payload, dedupe_key, priority)]) == 1
+
+    def enqueue_many(
+        self, tasks: Iterable[Tuple[str, Dict, Optional[str], int]]
+    ) -> int:
+        """Add (kind, payload, dedupe_key, priority) tasks in one transaction."""
+        now = time.time()
+        rows = [
+            (kind, json.dumps(payload), dedupe_key, priority, now)
+            for kind, payload, dedupe_key, priority in tasks
+        ]
+
+        def insert(cursor):
+            before = self._conn.total_changes
+            cursor.executemany(
+                "INSERT OR IGNORE INTO tasks (kind, payload, dedupe_key, priority, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def _expire_leases(self, cursor, now: float) -> int:
+        cursor.execute(
+            "UPDATE tasks SET status = 'failed', error = 'lease expired too many times', "
+            "lease_owner = NULL, updated = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        cursor.execute(
+            "UPDATE tasks SET status = 'pending', lease_owner = NULL, updated = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+        return cursor.rowcount
+
+    def requeue_expired(self) -> int:
+        """Return expired leases to pending and report how many were requeued."""
+        return self._transaction(lambda cursor: self._expire_leases(cursor, time.time()))
+
+    def lease(
+        self, worker_id: str, kinds: Optional[List[str]] = None, limit: int = 1
+    ) -> List[Task]:
+        """Lease up to limit pending tasks, highest priority first."""
+
+        def take(cursor):
+            now = time.time()
+            self._expire_leases(cursor, now)
+
+            query = "SELECT id, kind, payload, attempts FROM tasks WHERE status = 'pending'"
+            params: list = []
+            if kinds:
+                query += f" AND kind IN ({','.join('?' for _ in kinds)})"
+                params.extend(kinds)
+            query += " ORDER BY priority DESC, id LIMIT ?"
+            params.append(limit)
+            rows = cursor.execute(query, params).fetchall()
+
+            cursor.executemany(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                [(worker_id, now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+            return [
+                Task(id=row[0], kind=row[1], payload=json.loads(row[2]), attempts=row[3] + 1)
+                for row in rows
+            ]
+
+        return self._transaction(take)
+
+    def heartbeat(self, task_id: int, worker_id: str) -> bool:
+        """Extend a lease; returns False if the worker no longer owns the task."""
+
+        def extend(cursor):
+            now = time.time()
+            cursor.execute(
+                "UPDATE tasks SET lease_expires = ?, updated = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, task_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(extend)
+
+    def complete(self, task_id: int, worker_id: str, result: Optional[Dict] = None) -> bool:
+        """Mark a leased task done and store its result."""
+
+        def finish(cursor):
+            cursor.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_owner = NULL, updated = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result or {}), time.time(), task_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(finish)
+
+    def fail(self, task_id: int, worker_id: str, error: str) -> bool:
+        """Release a failed task for retry, or mark it failed after max_attempts."""
+
+        def release(cursor):
+            cursor.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, updated = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), task_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(release)
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Return task counts per kind and status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"
+            ).fetchall()
+        counts: Dict[str, Dict[str, int]] = {}
+        for kind, status, count in rows:
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def is_drained(self) -> bool:
+        """True when no task is pending or leased."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+            ).fetchone()
+        return row[0] == 0
+
+    def results(self, kind: Optional[str] = None) -> Iterator[Dict]:
+        """Yield results of completed tasks in task order."""
+        query = "SELECT result FROM tasks WHERE status = 'done'"
+        params: list = []
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for (result,) in rows:
+            yield json.loads(result)
@@ -0,0 +1,233 @@
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from src.config import Config
+from src.models.policy import Policy
+from src.models.task import Task
+from src.phase1.data_processor import DataProcessor
+from src.utils.dataset_stats import DatasetStats, format_stats
+from src.utils.speculation import format_speculation
+from src.utils.work_queue import WorkQueue
+
+INTENT_TASK = "intent"
+CONVERSATION_TASK = "conversation"
+
+# Downstream tasks are leased first so items finish before new ones start
+TASK_PRIORITIES = {INTENT_TASK: 0, CONVERSATION_TASK: 1}
+
+
+def open_queue(config: Config, queue_file: str = "") -> WorkQueue:
+    """Open the work queue configured in Config."""
+    return WorkQueue(
+        queue_file or config.queue_file,
+        lease_seconds=config.queue_lease_seconds,
+        max_attempts=config.queue_max_attempts,
+        wal=config.queue_wal,
+    )
+
+
+def enqueue_intents(config: Config, queue: WorkQueue, data_file: str) -> int:
+    """Enqueue one intent task per selected intent. Re-running is idempotent."""
+    from src.pipeline import select_intents_data
+
+    data_processor = DataProcessor(data_file=data_file, config=config)
+    intents_data = select_intents_data(data_processor.process_intents(), config)
+    return queue.enqueue_many(
+        (
+            INTENT_TASK,
+            intent_data,
+            f"{INTENT_TASK}:{intent_data['intent_name']}",
+            TASK_PRIORITIES[INTENT_TASK],
+        )
+        for intent_data in intents_data
+    )
+
+
+def collect_results(
+    queue: WorkQueue, writer, target_size: int, stats: Optional[DatasetStats] = None
+) -> int:
+    """Write samples from completed conversation tasks, up to target_size."""
+    written = 0
+    for result in queue.results(CONVERSATION_TASK):
+        samples = result.get("samples", [])[: target_size - written]
+        writer.write_many(samples)
+        if stats is not None:
+            stats.add_many(samples)
+        written += len(samples)
+        if written >= target_size:
+            break
+    return written
+
+
+class QueueWorker:
+    """Leases intent and conversation tasks from a WorkQueue and processes them.
+
+    An intent task generates the policy with LLM-1 and enqueues one
+    conversation task per requested conversation. A conversation task runs
+    LLM-2, LLM-3 and, if aligned, augmentation (overlapped with LLM-3 when
+    Config.speculative_augmentation is set), and stores the formatted
+    samples as its result. Leases are kept alive by a heartbeat thread while
+    a task runs.
+    """
+
+    def __init__(self, pipeline, queue: WorkQueue, worker_id: str = ""):
+        self.pipeline = pipeline
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat_interval = max(1.0, queue.lease_seconds / 3)
+
+    @contextmanager
+    def _heartbeat(self, task: Task):
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                if not self.queue.heartbeat(task.id, self.worker_id):
+                    print(f"Lost lease on task {task.id}")
+                    return
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def _process_intent(self, payload: Dict) -> Dict:
+        policy = self.pipeline.llm1.generate_policy(
+            payload["intent_name"], payload["examples"]
+        )
+        count = max(1, self.pipeline.config.conversations_per_policy)
+        self.queue.enqueue_many(
+            (
+                CONVERSATION_TASK,
+                {
+                    "intent_name": payload["intent_name"],
+                    "index": index,
+                    "policy": policy.model_dump(),
+                },
+                f"{CONVERSATION_TASK}:{payload['intent_name']}:{index}",
+                TASK_PRIORITIES[CONVERSATION_TASK],
+            )
+            for index in range(count)
+        )
+        return {"policy": policy.model_dump()}
+
+    def _process_conversation(self, payload: Dict) -> Dict:
+        policy = Policy(**payload["policy"])
+        conversation = self.pipeline.llm2.generate_conversation(
+            policy, payload["index"]
+        )
+        score, variants = self.pipeline.speculation.run(
+            partial(self.pipeline.llm3.evaluate_alignment, conversation),
+            partial(self.pipeline.augmentation.create_conversation_variants, conversation),
+        )
+        samples = self.pipeline._format_final_dataset(variants)
+
+        return {
+            "intent_name": payload["intent_name"],
+            "score": score.score,
+            "is_aligned": score.is_aligned,
+            "samples": samples,
+        }
+
+    def process_task(self, task: Task) -> Dict:
+        if task.kind == INTENT_TASK:
+            return self._process_intent(task.payload)
+        if task.kind == CONVERSATION_TASK:
+            return self._process_conversation(task.payload)
+        raise ValueError(f"Unknown task kind: {task.kind}")
+
+    def run(
+        self,
+        max_tasks: Optional[int] = None,
+        poll_interval: float = 1.0,
+        exit_when_drained: bool = True,
+    ) -> int:
+        """Process tasks until the queue is drained (or max_tasks is reached)."""
+        processed = 0
+        while max_tasks is None or processed < max_tasks:
+            tasks = self.queue.lease(self.worker_id)
+            if not tasks:
+                if exit_when_drained and self.queue.is_drained():
+                    break
+                # Other workers still hold leases that may expire or spawn tasks
+                time.sleep(poll_interval)
+                continue
+
+            task = tasks[0]
+            try:
+                with self._heartbeat(task):
+                    result = self.process_task(task)
+            except Exception as e:
+                print(f"Task {task.id} ({task.kind}) failed: {e}")
+                self.queue.fail(task.id, self.worker_id, str(e))
+            else:
+                if not self.queue.complete(task.id, self.worker_id, result):
+                    print(f"Task {task.id} lease was lost, result discarded")
+            processed += 1
+        return processed
+
+
+def main():
+    """Command line entry point for queue-based multi-worker runs."""
+    parser = argparse.ArgumentParser(description="Arch-Router work queue")
+    parser.add_argument("command", choices=["enqueue", "work", "collect", "status"])
+    parser.add_argument("--queue", default="", help="Queue file (default: Config.queue_file)")
+    parser.add_argument("--worker-id", default="")
+    parser.add_argument("--max-tasks", type=int, default=None)
+    parser.add_argument("--output", default="", help="Output file for collect")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = Config()
+    queue = open_queue(config, args.queue)
+
+    if args.command == "enqueue":
+        from src.pipeline import DEFAULT_DATA_FILE
+
+        added = enqueue_intents(config, queue, DEFAULT_DATA_FILE)
+        print(f"Enqueued {added} intent tasks")
+    elif args.command == "work":
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            print("Error: Please set GROQ_API_KEY in your .env file")
+            sys.exit(1)
+
+        from src.pipeline import ArchRouterPipeline
+
+        worker = QueueWorker(ArchRouterPipeline(config, api_key), queue, args.worker_id)
+        processed = worker.run(max_tasks=args.max_tasks)
+        worker.pipeline.close()
+        print(f"Worker {worker.worker_id} processed {processed} tasks")
+        if config.speculative_augmentation:
+            print(format_speculation(worker.pipeline.speculation.summary()))
+    elif args.command == "collect":
+        from src.pipeline import open_dataset_writer
+
+        stats = DatasetStats()
+        with open_dataset_writer(config, args.output) as writer:
+            written = collect_results(queue, writer, config.target_dataset_size, stats)
+        print(f"Collected {written} samples into {writer.output_file}")
+        print(format_stats(stats.summary()))
+        if config.stats_report:
+            stats.write_json(config.stats_report)
+            print(f"Dataset statistics saved to {config.stats_report}")
+    else:
+        for kind, statuses in queue.counts().items():
+            print(f"{kind}: {statuses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for content-hashed stage artifacts
+Tests artifact round-trips and which stage keys change with Config fields
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.pipeline import STAGES, ArchRouterPipeline
+from src.utils.artifact_store import ArtifactStore
+
+
+def test_artifact_store():
+    """Test stage artifact persistence and incremental keys."""
+    print("=" * 50)
+    print("Testing Stage Artifacts")
+    print("=" * 50)
+
+    artifact_dir = tempfile.mkdtemp()
+    try:
+        print("1. Testing artifact round-trip...")
+        store = ArtifactStore(artifact_dir)
+        store.save("policies", "abc", [{"domain": "travel"}])
+        assert store.exists("policies", "abc")
+        assert store.load("policies", "abc") == [{"domain": "travel"}]
+        assert store.list_keys("policies") == ["abc"]
+        print("[SUCCESS] Artifact saved and loaded")
+
+        print("\n2. Testing stage keys...")
+        base = ArchRouterPipeline(Config(artifact_dir=artifact_dir), "offline").stage_keys()
+        again = ArchRouterPipeline(Config(artifact_dir=artifact_dir), "offline").stage_keys()
+        assert base == again
+        print("[SUCCESS] Stage keys are deterministic")
+
+        threshold = ArchRouterPipeline(
+            Config(artifact_dir=artifact_dir, alignment_threshold=0.5), "offline"
+        ).stage_keys()
+        changed = [stage for stage in STAGES if threshold[stage] != base[stage]]
+        assert changed == ["augmentations", "final"], changed
+        print(f"[SUCCESS] alignment_threshold only invalidates {changed}")
+
+        turns = ArchRouterPipeline(
+            Config(artifact_dir=artifact_dir, max_conversation_turns=8), "offline"
+        ).stage_keys()
+        changed = [stage for stage in STAGES if turns[stage] != base[stage]]
+        assert changed == ["conversations", "scores", "augmentations", "final"], changed
+        print(f"[SUCCESS] max_conversation_turns invalidates {changed}")
+    finally:
+        shutil.rmtree(artifact_dir)
+
+
+if __name__ == "__main__":
+    test_artifact_store()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for columnar (Parquet/Arrow) dataset output
+Tests JSONL conversion, memory-mapped reads and filtering
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import columnar
+from src.utils.dataset_writer import ShardedDatasetWriter
+
+
+def _sample(i):
+    return {
+        "conversation": [
+            {"role": "user", "content": f"question {i}"},
+            {"role": "assistant", "content": f"answer {i}"},
+        ],
+        "domain": ["travel", "banking", "food"][i % 3],
+        "action": f"action_{i % 5}",
+        "description": "policy description",
+        "label_score": 0.95 if i % 2 == 0 else 0.1,
+        "augmentation_type": "original" if i % 2 == 0 else "irrelevant",
+    }
+
+
+def test_columnar_output():
+    """Test Parquet and Arrow output of a JSONL dataset."""
+    print("=" * 50)
+    print("Testing Columnar Dataset Output")
+    print("=" * 50)
+
+    if columnar.pa is None:
+        print("[ERROR] pyarrow is not installed, skipping columnar tests")
+        return
+
+    output_dir = tempfile.mkdtemp()
+    jsonl_file = os.path.join(output_dir, "dataset.jsonl")
+
+    try:
+        with ShardedDatasetWriter(jsonl_file, max_records_per_shard=40) as writer:
+            writer.write_many(_sample(i) for i in range(100))
+
+        for output_format in ["parquet", "arrow"]:
+            print(f"\nTesting {output_format} conversion...")
+            output_file = columnar.convert_jsonl_to_columnar(
+                jsonl_file, output_format=output_format, row_group_size=16
+            )
+
+            table = columnar.load_dataset_table(output_file)
+            assert table.num_rows == 100
+            assert table.schema.field("domain").type.value_type == "string"
+            assert table.column("conversation")[0].as_py()[0]["role"] == "user"
+            print(f"[SUCCESS] Converted {table.num_rows} rows to {output_file}")
+
+            filtered = columnar.load_dataset_table(
+                output_file, augmentation_types=["irrelevant"], domains=["travel"]
+            )
+            assert filtered.num_rows == 17, filtered.num_rows
+            print(f"[SUCCESS] Filtered to {filtered.num_rows} irrelevant travel rows")
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    test_columnar_output()
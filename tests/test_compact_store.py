@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact ConversationStore
+Tests round-tripping samples, views, batched validation, the pipeline's
+artifact formats and truncation
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError
+from src.models.compact import ConversationStore
+from src.models.augmentation import AugmentedConversation
+from src.models.conversation import Conversation, ConversationTurn
+
+
+def test_compact_store():
+    """Test the compact conversation store."""
+    print("=" * 50)
+    print("Testing Compact Conversation Store")
+    print("=" * 50)
+
+    record = {
+        "conversation": [
+            {"role": "user", "content": "I need to book a flight to Zürich"},
+            {"role": "assistant", "content": "When would you like to travel?"},
+        ],
+        "domain": "travel",
+        "action": "book_flight",
+        "description": "Assist users in booking flights.",
+        "label_score": 0.95,
+        "augmentation_type": "original",
+    }
+
+    store = ConversationStore()
+
+    print("1. Testing batched record validation...")
+    store.extend_records([record, dict(record, augmentation_type="noise")])
+    assert len(store) == 2 and store.num_turns == 4
+    assert store.to_record(0) == record
+    print(f"[SUCCESS] Stored {len(store)} samples in {store.nbytes()} bytes")
+
+    try:
+        store.extend_records([{"domain": "travel"}])
+        raise AssertionError("Invalid record was accepted")
+    except ValidationError:
+        print("[SUCCESS] Invalid record rejected")
+
+    print("\n2. Testing views...")
+    view = store[1]
+    assert view.augmentation_type == "noise" and len(view) == 2
+    assert view.turns[0].content == "I need to book a flight to Zürich"
+    print(f"[SUCCESS] View: {view.domain}/{view.action} ({view.augmentation_type})")
+
+    print("\n3. Testing pydantic boundary conversion...")
+    augmented = AugmentedConversation(
+        conversation=Conversation(
+            turns=[ConversationTurn(role="user", content="What's the weather?")],
+            domain="irrelevant",
+            action="irrelevant_chat",
+            description="Irrelevant conversation for negative training",
+        ),
+        augmentation_type="irrelevant",
+        label_score=0.1,
+    )
+    index = store.append_augmented(augmented)
+    assert store.to_augmented(index) == augmented
+    print("[SUCCESS] AugmentedConversation round-trips through the store")
+
+    print("\n4. Testing pipeline artifact formats and truncation...")
+    dumps = [store.to_augmented_dict(i) for i in range(len(store))]
+    assert dumps[2] == augmented.model_dump()
+    copy = ConversationStore()
+    copy.extend_augmented_dicts(dumps)
+    assert list(copy.iter_records()) == list(store.iter_records())
+    copy.truncate(1)
+    assert len(copy) == 1 and copy.num_turns == 2 and copy.to_record(0) == record
+    copy.extend_augmented([augmented])
+    assert copy.to_augmented(1) == augmented and copy.nbytes() < store.nbytes()
+    print("[SUCCESS] Augmentations artifacts round-trip and truncated stores stay consistent")
+
+
+if __name__ == "__main__":
+    test_compact_store()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test script for streaming dataset statistics
+Tests t-digest and HyperLogLog accuracy and merging, per-sample counts,
+state round trips, sharded merging and the empty-run summary
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_llm_server import MockLLMServer, MockSettings
+
+from src.config import Config
+from src.pipeline import ArchRouterPipeline
+from src.utils.dataset_stats import DatasetStats, HyperLogLog, TDigest, collect_stats, format_stats
+from src.utils.dataset_writer import ShardedDatasetWriter
+
+
+def _sample(rng: random.Random, index: int) -> dict:
+    kind = rng.choice(["original", "original", "paraphrase", "noise", "irrelevant"])
+    return {
+        "conversation": [
+            {"role": "user" if turn % 2 == 0 else "assistant", "content": f"sample {index} " + "x" * rng.randint(10, 800)}
+            for turn in range(rng.choice([2, 4, 6]))
+        ],
+        "domain": rng.choice(["travel", "banking", "music"]),
+        "action": rng.choice(["book", "cancel"]),
+        "description": "test",
+        "label_score": {"original": 0.95, "paraphrase": 0.9, "noise": 0.7, "irrelevant": 0.1}[kind],
+        "augmentation_type": kind,
+    }
+
+
+def test_dataset_stats():
+    """Test incremental, mergeable dataset statistics."""
+    print("=" * 50)
+    print("Testing Dataset Statistics")
+    print("=" * 50)
+
+    print("1. Testing t-digest quantiles and merging...")
+    rng = random.Random(0)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    ordered = sorted(values)
+    whole, left, right = TDigest(), TDigest(), TDigest()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 2 else right).add(value)
+    left.merge(right)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * len(ordered))]
+        assert abs(whole.quantile(q) / exact - 1) < 0.03, q
+        assert abs(left.quantile(q) / exact - 1) < 0.03, q
+    assert left.count == 20000 and len(left.means) < 200
+    assert TDigest().quantile(0.5) == 0.0
+    print(f"[SUCCESS] p99 {left.quantile(0.99):.1f} vs exact {ordered[int(0.99 * len(ordered))]:.1f}")
+
+    print("\n2. Testing HyperLogLog counts and merging...")
+    first, second = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        first.add(f"item {i}")
+    for i in range(20000, 50000):
+        second.add(f"item {i}")
+    first.merge(second)
+    assert abs(first.count() / 50000 - 1) < 0.03
+    small = HyperLogLog()
+    for i in range(500):
+        small.add(f"item {i % 400}")
+    assert abs(small.count() - 400) < 8
+    print(f"[SUCCESS] Estimated {first.count():.0f} of 50000 distinct items")
+
+    print("\n3. Testing sample statistics...")
+    samples = [_sample(rng, i) for i in range(2000)]
+    samples += samples[:100]  # 100 exact duplicates
+    stats = DatasetStats()
+    stats.add_many(samples)
+    summary = stats.summary()
+    assert summary["samples"] == 2100
+    assert sum(entry["count"] for entry in summary["augmentation_types"].values()) == 2100
+    assert summary["augmentation_types"]["original"]["count"] == sum(
+        s["augmentation_type"] == "original" for s in samples
+    )
+    assert sum(summary["turns"].values()) == 2100
+    assert sum(summary["token_length"]["histogram"].values()) == 2100
+    assert abs(summary["label_score"]["mean"] - sum(s["label_score"] for s in samples) / 2100) < 1e-3
+    assert 0.03 < summary["duplicate_rate"] < 0.07, summary["duplicate_rate"]
+    print(format_stats(summary))
+    print("[SUCCESS] Counts, histograms and the duplicate rate match the samples")
+
+    print("\n4. Testing sharded merging and state round trips...")
+    with tempfile.TemporaryDirectory() as tmp:
+        shards = []
+        for shard in range(3):
+            part = DatasetStats()
+            part.add_many(samples[shard::3])
+            path = os.path.join(tmp, f"stats-{shard}.json")
+            part.write_json(path)
+            shards.append(path)
+        merged = collect_stats(stats_files=shards).summary()
+        for section in ("samples", "domains", "actions", "augmentation_types", "turns"):
+            assert merged[section] == summary[section], section
+        assert merged["token_length"]["histogram"] == summary["token_length"]["histogram"]
+        assert merged["distinct_conversations"] == summary["distinct_conversations"]
+        with open(shards[0]) as f:
+            assert json.load(f)["summary"]["samples"] == 700
+
+        dataset = os.path.join(tmp, "dataset.jsonl")
+        with ShardedDatasetWriter(dataset, max_records_per_shard=500) as writer:
+            writer.write_many(samples)
+        from_file = collect_stats(dataset_files=[dataset]).summary()
+        assert from_file["augmentation_types"] == summary["augmentation_types"]
+    print("[SUCCESS] Shard statistics merge into the statistics of the whole dataset")
+
+    print("\n5. Testing empty statistics...")
+    assert DatasetStats().summary()["duplicate_rate"] == 0.0
+    assert format_stats(DatasetStats().summary()) == "No samples"
+    ArchRouterPipeline(Config(), "offline")._show_augmentation_stats([])
+    print("[SUCCESS] No division by zero without samples")
+
+    print("\n6. Testing the statistics report of single stages and top-ups...")
+    settings = MockSettings(latency_ms=1, latency_sigma=0.1)
+    with MockLLMServer(settings) as mock, tempfile.TemporaryDirectory() as tmp:
+        report = os.path.join(tmp, "stats.json")
+        config = Config(
+            api_base_url=mock.url,
+            target_dataset_size=8,
+            artifact_dir=os.path.join(tmp, "artifacts"),
+            output_file=os.path.join(tmp, "dataset.jsonl"),
+            stats_report=report,
+        )
+        pipeline = ArchRouterPipeline(config, "mock")
+        with pipeline.open_writer() as writer:
+            dataset = pipeline.run_pipeline(writer=writer)
+        pipeline.close()
+        assert 0 < len(dataset) <= 8
+
+        def reported() -> int:
+            with open(report) as f:
+                return json.load(f)["summary"]["samples"]
+
+        assert reported() == len(dataset)
+        pipeline = ArchRouterPipeline(config, "mock")
+        pipeline.run_stage("scores")
+        assert reported() == len(dataset)
+        pipeline.run_stage("final")
+        assert reported() == len(dataset)
+        pipeline.close()
+
+        pipeline = ArchRouterPipeline(config.model_copy(update={"target_dataset_size": 16}), "mock")
+        appended = pipeline.top_up()
+        pipeline.close()
+        assert appended > 0 and reported() == appended
+    print(f"[SUCCESS] Single stages keep the report; a top-up reports its {appended} appended samples")
+
+
+if __name__ == "__main__":
+    test_dataset_stats()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming dataset writer
+Tests shard rotation, compression, manifests and concurrent producers
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.dataset_writer import ShardedDatasetWriter, iter_dataset_records
+
+
+def test_dataset_writer():
+    """Test the sharded dataset writer."""
+    print("=" * 50)
+    print("Testing Sharded Dataset Writer")
+    print("=" * 50)
+
+    output_dir = tempfile.mkdtemp()
+    output_file = os.path.join(output_dir, "dataset.jsonl")
+
+    try:
+        print("1. Testing concurrent writes with gzip shards...")
+        writer = ShardedDatasetWriter(
+            output_file, compression="gzip", max_records_per_shard=50, fsync_every=10
+        )
+
+        def produce(producer_id):
+            for i in range(40):
+                writer.write({"producer": producer_id, "index": i})
+
+        threads = [threading.Thread(target=produce, args=(p,)) for p in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        manifest = writer.close()
+        assert manifest["total_records"] == 160
+        assert [shard["records"] for shard in manifest["shards"]] == [50, 50, 50, 10]
+        assert all(len(shard["sha256"]) == 64 for shard in manifest["shards"])
+        print(f"[SUCCESS] Wrote {manifest['total_records']} records in {len(manifest['shards'])} shards")
+
+        print("\n2. Testing reading back through the manifest...")
+        records = list(iter_dataset_records(output_file))
+        assert len(records) == 160
+        assert len({(r["producer"], r["index"]) for r in records}) == 160
+        print(f"[SUCCESS] Read back {len(records)} unique records")
+
+        print("\n3. Testing append without rewriting shards...")
+        writer = ShardedDatasetWriter(output_file, compression="gzip", append=True)
+        writer.write({"producer": "topup", "index": 0})
+        manifest = writer.close()
+        assert manifest["total_records"] == 161
+        assert manifest["shards"][-1]["file"] == "dataset-00004.jsonl.gz"
+        print(f"[SUCCESS] Appended shard {manifest['shards'][-1]['file']}")
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    test_dataset_writer()
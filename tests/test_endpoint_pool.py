@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script for the endpoint pool
+Tests weighted routing, rate-limit headroom, failover, health checks and
+per-endpoint and per-stage models
+"""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.endpoint import EndpointConfig
+from src.utils.endpoint_pool import EndpointPool, NoEndpointAvailable
+from src.utils.llm_backends import LiveBackend, LLMBackend
+from src.utils.llm_client import LLMClient
+
+
+class Unavailable(Exception):
+    pass
+
+
+class RateLimited(Unavailable):
+    def __init__(self, retry_after: str):
+        super().__init__("429")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class FakeEndpoint(LLMBackend):
+    """Backend that counts requests and can be made to fail."""
+
+    retryable = (Unavailable,)
+    rate_limited = (RateLimited,)
+
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.models = []
+        self.fail_with = None
+        self.healthy = True
+        self._lock = threading.Lock()
+
+    @property
+    def requests(self) -> int:
+        return len(self.models)
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        with self._lock:
+            self.models.append(model)
+        time.sleep(self.delay)
+        if self.fail_with is not None:
+            raise self.fail_with
+        message = SimpleNamespace(role="assistant", content=self.name)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20),
+            model=model,
+        )
+
+    def health_check(self) -> bool:
+        return self.healthy
+
+
+def _pool(*endpoints, **kwargs):
+    configs = [config for config, _ in endpoints]
+    backends = [backend for _, backend in endpoints]
+    return EndpointPool(configs, backends=backends, **kwargs)
+
+
+def _send(pool: EndpointPool, model: str = "llama") -> str:
+    messages = [{"role": "user", "content": "hello"}]
+    return pool.complete(model, messages, 0.3, 50).choices[0].message.content
+
+
+def test_endpoint_pool():
+    """Test routing, rate limits and failover of the endpoint pool."""
+    print("=" * 50)
+    print("Testing Endpoint Pool")
+    print("=" * 50)
+
+    print("1. Testing weighted routing...")
+    heavy, light = FakeEndpoint("heavy"), FakeEndpoint("light")
+    pool = _pool(
+        (EndpointConfig(name="heavy", weight=3), heavy),
+        (EndpointConfig(name="light", weight=1), light),
+    )
+    for _ in range(40):
+        _send(pool)
+    assert (heavy.requests, light.requests) == (30, 10), (heavy.requests, light.requests)
+    print(f"[SUCCESS] Weights 3:1 routed {heavy.requests}:{light.requests} requests")
+
+    print("\n2. Testing rate-limit headroom...")
+    window = 0.3
+    single = _pool(
+        (EndpointConfig(name="a", requests_per_minute=2), FakeEndpoint("a")),
+        window_seconds=window,
+    )
+    start = time.perf_counter()
+    for _ in range(4):
+        _send(single)
+    single_seconds = time.perf_counter() - start
+    assert single_seconds >= window
+
+    pair = _pool(
+        (EndpointConfig(name="a", requests_per_minute=2), FakeEndpoint("a")),
+        (EndpointConfig(name="b", requests_per_minute=2), FakeEndpoint("b")),
+        window_seconds=window,
+    )
+    start = time.perf_counter()
+    for _ in range(4):
+        _send(pair)
+    pair_seconds = time.perf_counter() - start
+    assert pair_seconds < window
+    print(
+        f"[SUCCESS] 4 requests at 2 per window: {single_seconds:.2f}s on one key, "
+        f"{pair_seconds:.2f}s on two"
+    )
+
+    print("\n3. Testing concurrent load balancing...")
+    slow = [FakeEndpoint(name, delay=0.05) for name in ("a", "b", "c")]
+    pool = _pool(*[(EndpointConfig(name=e.name), e) for e in slow])
+    threads = [threading.Thread(target=_send, args=(pool,)) for _ in range(9)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [e.requests for e in slow] == [3, 3, 3]
+    assert pool.stats()["endpoints"]["a"]["in_flight"] == 0
+    print(f"[SUCCESS] 9 concurrent requests spread 3/3/3 in {time.perf_counter() - start:.2f}s")
+
+    print("\n4. Testing failover...")
+    broken, backup = FakeEndpoint("broken"), FakeEndpoint("backup")
+    broken.fail_with = Unavailable("connection reset")
+    pool = _pool(
+        (EndpointConfig(name="broken", weight=10), broken),
+        (EndpointConfig(name="backup"), backup),
+        failure_threshold=2,
+        down_seconds=60,
+    )
+    assert all(_send(pool) == "backup" for _ in range(5))
+    stats = pool.stats()["endpoints"]["broken"]
+    assert broken.requests == 2 and stats["failures"] == 2 and not stats["healthy"]
+    backup.fail_with = Unavailable("down too")
+    try:
+        _send(pool)
+        assert False, "Expected the last endpoint error"
+    except Unavailable:
+        pass
+    print("[SUCCESS] Failing endpoint is skipped after 2 errors; errors surface when all fail")
+
+    print("\n5. Testing rate-limit responses...")
+    limited, other = FakeEndpoint("limited"), FakeEndpoint("other")
+    limited.fail_with = RateLimited("0.2")
+    pool = _pool(
+        (EndpointConfig(name="limited", weight=10), limited),
+        (EndpointConfig(name="other"), other),
+    )
+    assert _send(pool) == "other" and _send(pool) == "other"
+    assert limited.requests == 1
+    limited.fail_with = None
+    time.sleep(0.25)
+    assert _send(pool) == "limited"
+    stats = pool.stats()["endpoints"]["limited"]
+    assert stats["rate_limits"] == 1 and stats["failures"] == 0 and stats["healthy"]
+    print("[SUCCESS] A 429 pauses the endpoint for its Retry-After time")
+
+    print("\n6. Testing health checks...")
+    up, down = FakeEndpoint("up"), FakeEndpoint("down")
+    down.healthy = False
+    pool = _pool((EndpointConfig(name="down", weight=10), down), (EndpointConfig(name="up"), up))
+    assert pool.check_health() == {"down": False, "up": True}
+    assert _send(pool) == "up" and down.requests == 0
+    assert not LiveBackend("unused", "http://127.0.0.1:1").health_check()
+    print("[SUCCESS] Endpoints failing their health check are skipped")
+
+    print("\n7. Testing per-endpoint and per-stage models...")
+    cloud, local = FakeEndpoint("cloud"), FakeEndpoint("local")
+    pool = _pool(
+        (EndpointConfig(name="cloud"), cloud),
+        (EndpointConfig(name="local", weight=100, models={"llama-8b": "meta-llama/Llama-3.1-8B"}), local),
+    )
+    client = LLMClient(api_key="unused", backend=pool, stage_models={"evaluation": "llama-70b"})
+    client.chat("paraphrase", "llama-8b", "hi", 0.7, 50)
+    client.chat("evaluation", "llama-8b", "hi", 0.3, 50)
+    assert local.models == ["meta-llama/Llama-3.1-8B"] and cloud.models == ["llama-70b"]
+    assert "llama-70b" in client.metrics.report()["llm_stages"]["evaluation"]["models"]
+    only_local = _pool((EndpointConfig(name="local", models={"llama-8b": "x"}), local))
+    try:
+        _send(only_local, "llama-70b")
+        assert False, "Expected NoEndpointAvailable"
+    except NoEndpointAvailable:
+        pass
+    print("[SUCCESS] Stage models override the component's model; endpoints map model names")
+
+
+if __name__ == "__main__":
+    test_endpoint_pool()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for diverse example selection
+Tests hashed n-gram vectors, farthest-point selection, batch selection
+and the DataProcessor integration
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.phase1.data_processor import DataProcessor
+from src.utils.example_selector import coverage, hashed_ngram_vectors, select_diverse
+
+
+def test_example_selector():
+    """Test that diverse selection skips near-duplicates and covers more."""
+    print("=" * 50)
+    print("Testing Example Selector")
+    print("=" * 50)
+
+    print("1. Testing hashed n-gram vectors...")
+    vectors = hashed_ngram_vectors(["book a table", "book a table", "what's the weather", ""])
+    assert abs(float(vectors[0] @ vectors[1]) - 1.0) < 1e-5
+    assert float(vectors[0] @ vectors[2]) < 0.5
+    assert not vectors[3].any()
+    assert (hashed_ngram_vectors(["book a table"]) == vectors[:1]).all()
+    print("[SUCCESS] Vectors are normalized, stable and close for similar texts")
+
+    print("\n2. Testing diverse selection...")
+    examples = [
+        "can i book a table for two tonight",
+        "can i book a table for two tonight please",
+        "can i book a table for 2 tonight",
+        "do they take reservations at the olive garden",
+        "is it possible to reserve seats at spago on friday",
+    ]
+    (selected,) = select_diverse([examples], 3)
+    assert len(selected) == 3 and len(set(selected)) == 3
+    assert {3, 4} <= set(selected), selected
+    vectors = hashed_ngram_vectors(examples)
+    assert coverage(vectors, selected) > coverage(vectors, [0, 1, 2])
+    print(f"[SUCCESS] Picked {[examples[i] for i in selected]}")
+
+    print("\n3. Testing batch selection over groups...")
+    groups = [examples, ["only one"], [], examples[::-1]]
+    selections = select_diverse(groups, 3)
+    assert selections[0] == selected
+    assert selections[1] == [0] and selections[2] == []
+    assert sorted(examples[::-1][i] for i in selections[3]) == sorted(examples[i] for i in selected)
+    print("[SUCCESS] Each group is selected independently of the others")
+
+    print("\n4. Testing DataProcessor integration...")
+    config = Config(target_dataset_size=20, max_samples_per_intent=5)
+    first = DataProcessor("data/clinc150_uci/data_full.json", config).process_intents()
+    config.example_selection = "diverse"
+    diverse = DataProcessor("data/clinc150_uci/data_full.json", config).process_intents()
+    assert [i.intent_name for i in first] == [i.intent_name for i in diverse]
+    assert all(len(intent.examples) == 5 for intent in diverse)
+    assert any(a.examples != b.examples for a, b in zip(first, diverse))
+    print(f"[SUCCESS] {len(diverse)} intents with diverse examples")
+
+
+if __name__ == "__main__":
+    test_example_selector()
@@ -6,6 +6,7 @@ Tests conversation generation from policies
 
 import sys
 import os
+import json
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -62,5 +63,39 @@ def test_llm2_conversation_synthesizer():
     print("\n[SUCCESS] LLM-2 Conversation Synthesizer test completed!")
 
 
+def test_multi_conversation_parsing():
+    """Test salvaging conversations from a multi-conversation response (offline)."""
+    print("=" * 50)
+    print("Testing Multi-Conversation Parsing")
+    print("=" * 50)
+
+    synthesizer = LLM2ConversationSynthesizer(
+        api_key="offline", model_name="llama-3.1-8b-instant"
+    )
+
+    complete = """Here are the conversations:
+[
+    [{"role": "user", "content": "Book me a flight"}, {"role": "assistant", "content": "Where to?"}],
+    [{"role": "user", "content": "Find a flight to Rome"}]
+]"""
+    arrays = synthesizer._extract_conversation_arrays(complete)
+    assert len(arrays) == 2, arrays
+    print(f"[SUCCESS] Parsed {len(arrays)} conversations from a complete response")
+
+    truncated = """[
+    [{"role": "user", "content": "Book me a flight"}, {"role": "assistant", "content": "Where to?"}],
+    [{"role": "user", "content": "Find a flight"}, {"role": "assistant", "content": "Sure, when would you"""
+    arrays = synthesizer._extract_conversation_arrays(truncated)
+    assert len(arrays) == 1, arrays
+    print("[SUCCESS] Salvaged 1 conversation from a truncated response")
+
+    flat = """[{"role": "user", "content": "Book me a flight"}, {"role": "assistant", "content": "Where to?"}]"""
+    arrays = synthesizer._extract_conversation_arrays(flat)
+    assert arrays == [json.loads(flat)], arrays
+    assert synthesizer._extract_conversation_arrays("[]") == []
+    print("[SUCCESS] A single flat conversation counts as one conversation")
+
+
 if __name__ == "__main__":
     test_llm2_conversation_synthesizer()
+    test_multi_conversation_parsing()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test script for LLM backends
+Tests recording request/response cassettes and replaying them offline
+"""
+
+import sys
+import os
+import gzip
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.llm_backends import (
+    LLMBackend,
+    RecordingBackend,
+    ReplayBackend,
+    ReplayMiss,
+    make_backend,
+)
+from src.utils.llm_client import LLMClient
+
+
+class CountingBackend(LLMBackend):
+    """Backend answering every request with a numbered response."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(role="assistant", content=f"answer {self.calls}")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5),
+            model=model,
+        )
+
+
+def _ask(client: LLMClient, prompt: str, max_tokens: int = 100) -> str:
+    response = client.chat("evaluation", "test-model", prompt, 0.3, max_tokens, coalesce=False)
+    return response.choices[0].message.content
+
+
+def test_record_and_replay():
+    """Test that a recorded cassette replays the same responses offline."""
+    print("=" * 50)
+    print("Testing Record/Replay Backends")
+    print("=" * 50)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        cassette = os.path.join(temp_dir, "cassettes", "run.jsonl.gz")
+
+        print("1. Testing recording...")
+        live = CountingBackend()
+        recorder = RecordingBackend(live, cassette)
+        client = LLMClient(api_key="offline", backend=recorder)
+        recorded = [_ask(client, "first"), _ask(client, "second"), _ask(client, "first")]
+        client.close()
+        assert recorded == ["answer 1", "answer 2", "answer 3"]
+        assert recorder.recorded == 3
+        with gzip.open(cassette, "rt") as f:
+            assert len(f.readlines()) == 3
+        print(f"[SUCCESS] Recorded {recorder.recorded} responses to a gzip cassette")
+
+        print("\n2. Testing replay...")
+        replay = ReplayBackend(cassette)
+        client = LLMClient(api_key="offline", backend=replay)
+        # max_tokens isn't part of the key, repeated prompts are served in order
+        replayed = [_ask(client, "first", 50), _ask(client, "second"), _ask(client, "first")]
+        assert replayed == recorded, replayed
+        assert _ask(client, "first") == "answer 1"
+        stats = client.metrics.report()["llm_stages"]["evaluation"]
+        assert stats["prompt_tokens"] == 40 and stats["completion_tokens"] == 20
+        print("[SUCCESS] Replay serves the recorded responses, usage included")
+
+        print("\n3. Testing requests missing from the cassette...")
+        try:
+            _ask(client, "never recorded")
+            assert False, "Expected ReplayMiss"
+        except ReplayMiss:
+            pass
+        fallback = CountingBackend()
+        client = LLMClient(api_key="offline", backend=ReplayBackend(cassette, fallback=fallback))
+        assert _ask(client, "never recorded") == "answer 1"
+        assert client.backend.misses == 1 and fallback.calls == 1
+        print("[SUCCESS] Misses raise ReplayMiss or go to the fallback backend")
+
+        print("\n4. Testing an interrupted recording...")
+        truncated = os.path.join(temp_dir, "truncated.jsonl.gz")
+        recorder = RecordingBackend(CountingBackend(), truncated)
+        client = LLMClient(api_key="offline", backend=recorder)
+        _ask(client, "first")
+        _ask(client, "second")
+        # Copy the cassette before close() writes the gzip trailer
+        shutil.copy(truncated, truncated + ".copy")
+        client.close()
+        replay = ReplayBackend(truncated + ".copy")
+        assert replay.responses == 2
+        print("[SUCCESS] Flushed responses of an unfinished cassette are replayable")
+
+        print("\n5. Testing backend selection...")
+        assert isinstance(make_backend("replay", cassette=cassette), ReplayBackend)
+        for mode, path in [("replay", ""), ("replay", os.path.join(temp_dir, "missing.gz")), ("other", cassette)]:
+            try:
+                make_backend(mode, cassette=path)
+                assert False, f"Expected an error for {mode} {path!r}"
+            except (ValueError, FileNotFoundError):
+                pass
+        print("[SUCCESS] make_backend validates the mode and cassette")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    test_record_and_replay()
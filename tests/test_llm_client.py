@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared LLM client
+Tests in-flight request coalescing with a slow offline backend
+"""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+
+
+class SlowBackend(LLMBackend):
+    """Backend that counts calls and answers after a delay."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        message = SimpleNamespace(content=f"response {call}")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=None,
+        )
+
+
+def _install(client: LLMClient) -> SlowBackend:
+    client.backend = SlowBackend()
+    return client.backend
+
+
+def test_request_coalescing():
+    """Test that identical concurrent requests share one call."""
+    print("=" * 50)
+    print("Testing LLM Request Coalescing")
+    print("=" * 50)
+
+    client = LLMClient(api_key="offline", max_concurrency=4, backend=SlowBackend())
+
+    def ask(prompt, coalesce=None):
+        return client.chat(
+            stage="irrelevant",
+            model="test-model",
+            prompt=prompt,
+            temperature=0.8,
+            max_tokens=100,
+            coalesce=coalesce,
+        )
+
+    print("1. Testing identical concurrent requests...")
+    backend = _install(client)
+    responses = list(client.map_concurrent(ask, ["same prompt"] * 4))
+    assert backend.calls == 1, backend.calls
+    assert len({r.choices[0].message.content for r in responses}) == 1
+    assert client.get_stats() == {"calls": 1, "coalesced_calls": 3}
+    print(f"[SUCCESS] 4 requests, {backend.calls} call: {client.get_stats()}")
+
+    print("\n2. Testing distinct prompts...")
+    backend = _install(client)
+    list(client.map_concurrent(ask, ["a", "b", "c"]))
+    assert backend.calls == 3
+    print("[SUCCESS] Distinct prompts are not coalesced")
+
+    print("\n3. Testing opt-out...")
+    backend = _install(client)
+    list(client.map_concurrent(lambda prompt: ask(prompt, coalesce=False), ["same"] * 3))
+    assert backend.calls == 3
+    print("[SUCCESS] coalesce=False sends every request")
+
+    print("\n4. Testing sequential repeats...")
+    backend = _install(client)
+    ask("repeat")
+    ask("repeat")
+    assert backend.calls == 2
+    print("[SUCCESS] Only in-flight requests are shared, nothing is cached")
+
+
+if __name__ == "__main__":
+    test_request_coalescing()
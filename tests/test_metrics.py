@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for run metrics
+Tests percentiles, per-call recording through the LLM client with retries
+and parse outcomes, and the JSON and Prometheus exports
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import groq
+import httpx
+
+from src.utils import llm_client as llm_client_module
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+from src.utils.metrics import MetricsRecorder, percentile
+
+
+class FlakyBackend(LLMBackend):
+    """Backend that fails with connection errors before answering."""
+
+    retryable = (groq.APIConnectionError,)
+
+    def __init__(self, failures: int, content: str = '{"score": 0.9}'):
+        self.failures = failures
+        self.content = content
+        self.calls = 0
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise groq.APIConnectionError(
+                request=httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+            )
+        time.sleep(0.01)
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=50, completion_tokens=20),
+        )
+
+
+def _client(backend: FlakyBackend, metrics: MetricsRecorder) -> LLMClient:
+    return LLMClient(api_key="offline", metrics=metrics, max_retries=2, backend=backend)
+
+
+def test_metrics():
+    """Test call recording, stage timing and exports."""
+    print("=" * 50)
+    print("Testing Run Metrics")
+    print("=" * 50)
+
+    print("1. Testing nearest-rank percentiles...")
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+    print("[SUCCESS] p50/p95/p99 of 1..100 are 50/95/99")
+
+    print("\n2. Testing retries and parse outcomes...")
+    retry_delay = llm_client_module.RETRY_BASE_DELAY
+    llm_client_module.RETRY_BASE_DELAY = 0.0
+    metrics = MetricsRecorder()
+    client = _client(FlakyBackend(failures=2), metrics)
+    response = client.chat("evaluation", "test-model", "prompt", 0.1, 100)
+    with client.parsing("evaluation"):
+        json.loads(response.choices[0].message.content)
+    try:
+        with client.parsing("evaluation"):
+            json.loads("not json")
+    except ValueError:
+        pass
+
+    evaluation = metrics.report()["llm_stages"]["evaluation"]
+    assert evaluation["calls"] == 1
+    assert evaluation["retries"] == 2
+    assert evaluation["outcomes"] == {"ok": 1}
+    assert evaluation["prompt_tokens"] == 50 and evaluation["completion_tokens"] == 20
+    assert evaluation["parse"] == {"ok": 1, "failed": 1}
+    assert evaluation["latency_seconds"]["p50"] >= 0.01
+    print(f"[SUCCESS] Retried call recorded: {evaluation['outcomes']}, retries=2")
+
+    print("\n3. Testing exhausted retries...")
+    client = _client(FlakyBackend(failures=5), metrics)
+    try:
+        client.chat("policy", "test-model", "prompt", 0.1, 100)
+        assert False, "Expected the connection error to be raised"
+    except groq.APIConnectionError:
+        pass
+    policy = metrics.report()["llm_stages"]["policy"]
+    assert policy["outcomes"] == {"error": 1} and policy["retries"] == 2
+    llm_client_module.RETRY_BASE_DELAY = retry_delay
+    print("[SUCCESS] Failed call recorded as an error after 2 retries")
+
+    print("\n4. Testing queue wait in batches...")
+    metrics = MetricsRecorder()
+    client = _client(FlakyBackend(failures=0), metrics)
+    client.max_concurrency = 2
+    list(
+        client.map_concurrent(
+            lambda prompt: client.chat("noise", "test-model", prompt, 0.1, 100),
+            ["a", "b", "c", "d"],
+        )
+    )
+    noise = metrics.report()["llm_stages"]["noise"]
+    assert noise["calls"] == 4
+    # Two items had to wait for a worker to finish a 10ms call
+    assert noise["queue_wait_seconds"]["max"] >= 0.01
+    assert noise["calls_per_second"] > 0
+    print(f"[SUCCESS] Queue wait recorded: {noise['queue_wait_seconds']}")
+
+    print("\n5. Testing stage timers and exports...")
+    with metrics.stage_timer("intents"):
+        time.sleep(0.01)
+    with metrics.stage_timer("policies", reused=True):
+        pass
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report_file = os.path.join(temp_dir, "report.json")
+        prom_file = os.path.join(temp_dir, "metrics", "run.prom")
+        metrics.write_json(report_file)
+        metrics.write_prometheus(prom_file)
+
+        with open(report_file) as f:
+            report = json.load(f)
+        assert report["pipeline_stages"]["intents"]["seconds"] >= 0.01
+        assert report["pipeline_stages"]["policies"]["reused"] is True
+
+        with open(prom_file) as f:
+            text = f.read()
+        assert '# TYPE arch_router_llm_latency_seconds summary' in text
+        assert 'arch_router_llm_calls_total{stage="noise",outcome="ok"} 4' in text
+        assert 'arch_router_llm_latency_seconds{stage="noise",quantile="0.99"}' in text
+        assert 'arch_router_stage_duration_seconds{stage="intents"}' in text
+        assert os.listdir(os.path.dirname(prom_file)) == ["run.prom"]
+    print("[SUCCESS] JSON report and Prometheus snapshot written")
+
+
+if __name__ == "__main__":
+    test_metrics()
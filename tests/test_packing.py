@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for packed training export
+Tests best-fit decreasing packing, shard and index layout, round trips
+through the segments file and parallel packing
+"""
+
+import sys
+import os
+import json
+import random
+import tempfile
+from array import array
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.dataset_writer import ShardedDatasetWriter
+from src.utils.packing import ByteTokenizer, pack_dataset, pack_lengths, render_sample
+
+
+def _record(rng: random.Random, index: int) -> dict:
+    turns = [
+        {"role": role, "content": f"turn {index} " + "x" * rng.randint(5, 120)}
+        for role in ["user", "assistant"] * rng.randint(1, 3)
+    ]
+    return {
+        "conversation": turns,
+        "domain": "travel",
+        "action": f"action_{index % 4}",
+        "description": "test",
+        "label_score": 0.9,
+        "augmentation_type": "original",
+    }
+
+
+def _read_shards(output_dir: str, index: dict):
+    """Decode every sequence back into per-sample token lists by dataset ordinal."""
+    samples = {}
+    length = index["sequence_length"]
+    for shard in index["shards"]:
+        tokens = array("I")
+        with open(os.path.join(output_dir, shard["file"]), "rb") as f:
+            tokens.fromfile(f, shard["sequences"] * length)
+        with open(os.path.join(output_dir, shard["segments"])) as f:
+            for number, line in enumerate(f):
+                sequence = json.loads(line)
+                position = number * length
+                for ordinal, sample_length in zip(sequence["samples"], sequence["lengths"]):
+                    samples[ordinal] = tokens[position : position + sample_length].tolist()
+                    position += sample_length
+                assert set(tokens[position : (number + 1) * length]) <= {index["pad_id"]}
+    return samples
+
+
+def test_packing():
+    """Test packing a dataset into fixed-length sequences."""
+    print("=" * 50)
+    print("Testing Packed Export")
+    print("=" * 50)
+
+    print("1. Testing best-fit decreasing...")
+    bins = pack_lengths([6, 5, 4, 3, 2, 2, 1, 1], 8)
+    assert sorted(i for items in bins for i in items) == list(range(8))
+    assert len(bins) == 3 and all(sum([6, 5, 4, 3, 2, 2, 1, 1][i] for i in b) == 8 for b in bins)
+    assert pack_lengths([], 8) == []
+    print(f"[SUCCESS] 24 tokens fill 3 bins of 8 exactly: {bins}")
+
+    rng = random.Random(0)
+    records = [_record(rng, i) for i in range(300)]
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = os.path.join(tmp, "dataset.jsonl")
+        with ShardedDatasetWriter(dataset, max_records_per_shard=120) as writer:
+            writer.write_many(records)
+
+        print("\n2. Testing the packed shards and index...")
+        output_dir = os.path.join(tmp, "packed")
+        index = pack_dataset(dataset, output_dir, sequence_length=1024, workers=1, partition_size=128)
+        with open(os.path.join(output_dir, "packed_index.json")) as f:
+            assert json.load(f) == index
+        assert index["samples"] == 300 and len(index["shards"]) == 3
+        assert sum(index["buckets"].values()) == 300
+        for shard in index["shards"]:
+            size = os.path.getsize(os.path.join(output_dir, shard["file"]))
+            assert size == shard["sequences"] * 1024 * 4
+        assert index["packing_efficiency"] > 0.9
+        assert index["packing_efficiency"] > index["bucket_padding_efficiency"] > index["unpacked_efficiency"]
+        print(
+            f"[SUCCESS] {index['sequences']} sequences, "
+            f"{index['packing_efficiency']:.1%} efficient vs {index['unpacked_efficiency']:.1%} unpacked"
+        )
+
+        print("\n3. Testing round trip through the segments...")
+        tokenizer = ByteTokenizer()
+        samples = _read_shards(output_dir, index)
+        assert sorted(samples) == list(range(300))
+        for ordinal, record in enumerate(records):
+            assert samples[ordinal] == tokenizer.encode(render_sample(record)) + [tokenizer.eos_id]
+        print("[SUCCESS] Every sample is recovered from its sequence")
+
+        print("\n4. Testing parallel packing and truncation...")
+        parallel_dir = os.path.join(tmp, "parallel")
+        parallel = pack_dataset(dataset, parallel_dir, sequence_length=1024, workers=2, partition_size=128)
+        assert parallel["shards"] == index["shards"]
+        for shard in index["shards"]:
+            for name in (shard["file"], shard["segments"]):
+                with open(os.path.join(output_dir, name), "rb") as a, open(os.path.join(parallel_dir, name), "rb") as b:
+                    assert a.read() == b.read()
+        short = pack_dataset(dataset, os.path.join(tmp, "short"), sequence_length=128, workers=1)
+        assert short["truncated"] > 0 and short["sequences"] == 300
+
+        # A sample that exactly fills a sequence with its EOS token isn't truncated
+        exact = len(tokenizer.encode(render_sample(records[0]))) + 1
+        single = os.path.join(tmp, "single.jsonl")
+        with ShardedDatasetWriter(single) as writer:
+            writer.write_many(records[:1])
+        fitted = pack_dataset(single, os.path.join(tmp, "exact"), sequence_length=exact, workers=1)
+        assert fitted["truncated"] == 0 and fitted["packing_efficiency"] == 1.0
+        cut = pack_dataset(single, os.path.join(tmp, "cut"), sequence_length=exact - 1, workers=1)
+        assert cut["truncated"] == 1
+        print("[SUCCESS] Parallel output matches; long samples are truncated to the sequence length")
+
+
+if __name__ == "__main__":
+    test_packing()
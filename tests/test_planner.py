@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the dry-run planner
+Runs offline, renders prompts without sending requests
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.planner import build_plan, format_plan
+
+
+def test_planner():
+    """Test call, token, time and cost estimates."""
+    print("=" * 50)
+    print("Testing Run Planner")
+    print("=" * 50)
+
+    print("1. Testing stage estimates...")
+    config = Config(target_dataset_size=20)
+    plan = build_plan(config, acceptance_rate=1.0)
+    stages = {stage.stage: stage for stage in plan.stages}
+    assert stages["policies"].calls == plan.intents
+    assert stages["conversations"].calls == plan.intents
+    assert stages["scores"].calls == plan.conversations
+    assert "domain_mix" not in stages
+    assert plan.total_cost > 0 and plan.total_seconds > 0
+    print(format_plan(plan))
+    print("[SUCCESS] One policy, conversation and evaluation call per intent")
+
+    print("\n2. Testing batching and concurrency...")
+    batched = build_plan(
+        Config(target_dataset_size=20, conversations_per_policy=4, conversations_per_request=2),
+        acceptance_rate=1.0,
+    )
+    batched_stages = {stage.stage: stage for stage in batched.stages}
+    assert batched_stages["conversations"].calls == 2 * batched.intents
+    assert batched_stages["scores"].calls == 4 * batched.intents
+
+    unlimited = Config(
+        target_dataset_size=20, requests_per_minute=0, tokens_per_minute=0, max_concurrency=1
+    )
+    parallel = unlimited.model_copy(update={"max_concurrency": 8})
+    assert build_plan(parallel).total_seconds < build_plan(unlimited).total_seconds
+    print("[SUCCESS] Batching and concurrency reduce calls and time")
+
+
+if __name__ == "__main__":
+    test_planner()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the request scheduler
+Tests rate-limit pacing, FIFO and token-aware dispatch order, packing,
+aging and the LLMClient integration
+"""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+from src.utils.request_scheduler import RequestScheduler
+
+
+class InstantBackend(LLMBackend):
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        usage = SimpleNamespace(prompt_tokens=5, completion_tokens=5, total_tokens=10)
+        choice = SimpleNamespace(message=SimpleNamespace(content="ok"), finish_reason="stop")
+        return SimpleNamespace(choices=[choice], usage=usage, model=model)
+
+
+def _dispatch_order(scheduler: RequestScheduler, requests) -> list:
+    """Fill the window, queue requests in the given order and record dispatch order."""
+    order = []
+    lock = threading.Lock()
+
+    def send(stage: str, tokens: int):
+        with scheduler.slot(stage, tokens):
+            with lock:
+                order.append((stage, tokens))
+
+    with scheduler.slot("policy", scheduler.tokens_per_minute):
+        pass
+    threads = []
+    for stage, tokens in requests:
+        thread = threading.Thread(target=send, args=(stage, tokens))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_request_scheduler():
+    """Test scheduling policies under a token limit."""
+    print("=" * 50)
+    print("Testing Request Scheduler")
+    print("=" * 50)
+
+    print("1. Testing the disabled scheduler...")
+    scheduler = RequestScheduler()
+    with scheduler.slot("policy", 10**9) as ticket:
+        assert ticket is None
+    assert not scheduler.enabled
+    print("[SUCCESS] Without limits requests are not held")
+
+    print("\n2. Testing token-aware dispatch order...")
+    # Only one of these fits into each window
+    requests = [("policy", 800), ("paraphrase", 900), ("evaluation", 700), ("paraphrase", 600)]
+    scheduler = RequestScheduler("token", tokens_per_minute=1000, window_seconds=0.1)
+    order = _dispatch_order(scheduler, requests)
+    assert order == [("paraphrase", 600), ("paraphrase", 900), ("evaluation", 700), ("policy", 800)], order
+    scheduler = RequestScheduler("fifo", tokens_per_minute=1000, window_seconds=0.1)
+    assert _dispatch_order(scheduler, requests) == requests
+    print("[SUCCESS] Downstream stages and smaller requests go first; fifo keeps arrival order")
+
+    print("\n3. Testing window packing...")
+    scheduler = RequestScheduler("token", tokens_per_minute=1000, window_seconds=0.3)
+    with scheduler.slot("evaluation", 700):
+        pass
+    started = {}
+
+    def send(name: str, stage: str, tokens: int):
+        with scheduler.slot(stage, tokens):
+            started[name] = time.monotonic()
+
+    begin = time.monotonic()
+    big = threading.Thread(target=send, args=("big", "evaluation", 600))
+    small = threading.Thread(target=send, args=("small", "policy", 200))
+    big.start()
+    time.sleep(0.01)
+    small.start()
+    big.join()
+    small.join()
+    assert started["small"] - begin < 0.1 and started["big"] - begin >= 0.25
+    print("[SUCCESS] A small request fills the window while a large one waits")
+
+    print("\n4. Testing aging...")
+    scheduler = RequestScheduler("token", tokens_per_minute=1000, window_seconds=0.3, max_wait_seconds=0.05)
+    with scheduler.slot("policy", 700):
+        pass
+    big = threading.Thread(target=send, args=("aged", "policy", 600))
+    big.start()
+    time.sleep(0.1)
+    small = threading.Thread(target=send, args=("late", "paraphrase", 200))
+    small.start()
+    big.join()
+    small.join()
+    assert started["late"] >= started["aged"]
+    print("[SUCCESS] A request waiting past max_wait_seconds isn't skipped")
+
+    print("\n5. Testing settlement and statistics...")
+    scheduler = RequestScheduler("token", tokens_per_minute=1000, window_seconds=5.0)
+    client = LLMClient(api_key="unused", backend=InstantBackend(), scheduler=scheduler, coalesce=False)
+    start = time.monotonic()
+    for _ in range(20):
+        # Each request reserves its prompt estimate plus max_tokens (~250) but uses 10
+        client.chat("evaluation", "test-model", "hello", 0.3, 250)
+    assert time.monotonic() - start < 1.0
+    stats = scheduler.get_stats()
+    assert stats["requests"] == 20 and stats["tokens"] == 200
+    assert 0 < stats["utilization"] <= 1
+    assert client.metrics.report()["llm_stages"]["evaluation"]["calls"] == 20
+    print(f"[SUCCESS] Usage settles the window; utilization {stats['utilization']:.1%}")
+
+
+if __name__ == "__main__":
+    test_request_scheduler()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for per-item seeded random choices
+Tests that choices depend on the run seed and item identity, not on order
+"""
+
+import sys
+import os
+import random
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.conversation import Conversation, ConversationTurn
+from src.phase2.augmentation_module import AugmentationModule
+from src.utils.rng import conversation_key, item_rng
+
+
+def make_conversation(index: int) -> Conversation:
+    return Conversation(
+        turns=[
+            ConversationTurn(role="user", content=f"Question {index}"),
+            ConversationTurn(role="assistant", content="Answer"),
+            ConversationTurn(role="user", content="Follow-up"),
+        ],
+        domain="banking",
+        action=f"action_{index}",
+        description="Banking help",
+    )
+
+
+def test_item_rng():
+    """Test deterministic per-item generators."""
+    print("=" * 50)
+    print("Testing Per-item RNG")
+    print("=" * 50)
+
+    print("1. Testing determinism...")
+    first = [item_rng(7, "conversation", "banking", i).random() for i in range(5)]
+    random.random()  # global state must not matter
+    second = [item_rng(7, "conversation", "banking", i).random() for i in reversed(range(5))]
+    assert first == list(reversed(second))
+    assert item_rng(8, "conversation", "banking", 0).random() != first[0]
+    print("[SUCCESS] Same seed and identity give the same draws in any order")
+
+    print("\n2. Testing augmentation branches...")
+    module = AugmentationModule(api_key="offline", model_name="test", seed=3)
+    conversations = [make_conversation(i) for i in range(20)]
+    forward = {
+        conversation_key(c): module._rng_for(c, "variants").random() for c in conversations
+    }
+    backward = {
+        conversation_key(c): module._rng_for(c, "variants").random()
+        for c in reversed(conversations)
+    }
+    assert forward == backward
+    print("[SUCCESS] Branch decisions don't depend on processing order")
+
+
+if __name__ == "__main__":
+    test_item_rng()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the generation daemon
+Tests fair sharing of request slots between jobs and the HTTP job API
+against the local mock LLM server
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_llm_server import MockLLMServer, MockSettings
+from src.config import Config
+from src.service import FairShare, GenerationService, make_handler
+
+
+def _request(url: str, method: str = "GET", body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_fair_share():
+    """Test that a job submitted later gets slots ahead of a busy job."""
+    print("=" * 50)
+    print("Testing Fair Sharing of Request Slots")
+    print("=" * 50)
+
+    share = FairShare(slots=2)
+    order = []
+    lock = threading.Lock()
+
+    def request(job_id: str):
+        share.acquire(job_id)
+        with lock:
+            order.append(job_id)
+        time.sleep(0.02)
+        share.release(job_id)
+
+    big = [threading.Thread(target=request, args=("big",)) for _ in range(6)]
+    for thread in big:
+        thread.start()
+    time.sleep(0.005)
+    small = [threading.Thread(target=request, args=("small",)) for _ in range(2)]
+    for thread in small:
+        thread.start()
+    for thread in big + small:
+        thread.join()
+
+    # The small job's requests start before the big job's backlog drains
+    assert len(order) == 8
+    assert order.index("small") < 4 and max(i for i, job in enumerate(order) if job == "small") < 6
+    assert share.in_flight() == {}
+    print(f"[SUCCESS] Slot grant order: {' '.join(order)}")
+
+
+def test_service():
+    """Test submitting, following and removing jobs over HTTP."""
+    print("\n" + "=" * 50)
+    print("Testing Generation Daemon Job API")
+    print("=" * 50)
+
+    settings = MockSettings(latency_ms=5, latency_sigma=0.1)
+    with MockLLMServer(settings) as mock, tempfile.TemporaryDirectory() as temp_dir:
+        config = Config(api_base_url=mock.url, max_concurrency=4)
+        service = GenerationService(config, "mock", max_jobs=2, jobs_dir=temp_dir)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            print("1. Testing job submission...")
+            status, body = _request(f"{base}/jobs", "POST", {"config": {"target_dataset_size": 12}})
+            assert status == 201, body
+            first = json.loads(body)
+            status, body = _request(f"{base}/jobs", "POST", {"config": {"target_dataset_size": 8, "seed": 3}})
+            second = json.loads(body)
+            assert first["status"] in ("queued", "running")
+            assert first["output_file"].startswith(temp_dir)
+            print(f"[SUCCESS] Submitted jobs {first['id']} and {second['id']}")
+
+            print("\n2. Testing sample streaming...")
+            status, body = _request(f"{base}/jobs/{first['id']}/samples")
+            streamed = [json.loads(line) for line in body.splitlines()]
+            status, body = _request(f"{base}/jobs/{first['id']}")
+            job = json.loads(body)
+            assert job["status"] == "succeeded", job
+            assert 0 < len(streamed) == job["samples"] <= 12
+            assert all(sample["conversation"] for sample in streamed)
+            with open(job["output_file"]) as f:
+                assert len(f.readlines()) == len(streamed)
+            status, body = _request(f"{base}/jobs/{first['id']}/samples?offset=2&wait=0")
+            assert len(body.splitlines()) == len(streamed) - 2
+            print(f"[SUCCESS] Streamed {len(streamed)} samples while the job ran")
+
+            print("\n3. Testing concurrent jobs...")
+            _request(f"{base}/jobs/{second['id']}/samples")
+            status, body = _request(f"{base}/jobs")
+            jobs = {job["id"]: job for job in json.loads(body)}
+            assert jobs[second["id"]]["status"] == "succeeded"
+            assert all(job["llm_calls"] > 0 for job in jobs.values())
+            print("[SUCCESS] Both jobs finished on the shared backend")
+
+            print("\n4. Testing invalid submissions...")
+            for overrides in [{"not_a_field": 1}, {"api_base_url": "http://elsewhere"}, {"target_dataset_size": "many"}]:
+                status, body = _request(f"{base}/jobs", "POST", {"config": overrides})
+                assert status == 400, (overrides, status)
+            status, _ = _request(f"{base}/jobs/unknown")
+            assert status == 404
+            print("[SUCCESS] Unknown fields, daemon fields and bad values are rejected")
+
+            print("\n5. Testing job removal...")
+            status, _ = _request(f"{base}/jobs/{first['id']}", "DELETE")
+            assert status == 200
+            status, _ = _request(f"{base}/jobs/{first['id']}")
+            assert status == 404
+            print("[SUCCESS] Finished jobs can be removed")
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+
+def test_shared_rate_limit():
+    """Test that concurrent jobs together stay within one request rate limit."""
+    print("\n" + "=" * 50)
+    print("Testing the Shared Rate Limit of Concurrent Jobs")
+    print("=" * 50)
+
+    limit, window = 5, 1.0
+    settings = MockSettings(latency_ms=5, latency_sigma=0.1)
+    with MockLLMServer(settings) as mock, tempfile.TemporaryDirectory() as temp_dir:
+        config = Config(
+            api_base_url=mock.url,
+            max_concurrency=8,
+            enforce_rate_limits=True,
+            requests_per_minute=limit,
+            tokens_per_minute=0,
+        )
+        service = GenerationService(config, "mock", max_jobs=2, jobs_dir=temp_dir)
+        # A one-second window keeps the test short; the limit applies the same way
+        service.scheduler.window_seconds = window
+        sent = []
+        lock = threading.Lock()
+        complete = service.backend.complete
+
+        def record(*args, **kwargs):
+            with lock:
+                sent.append(time.monotonic())
+            return complete(*args, **kwargs)
+
+        service.backend.complete = record
+        try:
+            print("1. Running two jobs under one limit...")
+            jobs = [service.submit({"target_dataset_size": 4, "seed": seed}) for seed in (1, 2)]
+            for job in jobs:
+                list(service.follow(job.id))
+            assert all(service.get(job.id).status.status == "succeeded" for job in jobs)
+            assert all(service.get(job.id).status.llm_calls > 0 for job in jobs)
+        finally:
+            service.close()
+
+        # Requests are timed after the scheduler grants them, so allow a little slack
+        busiest = max(sum(start <= t < start + window - 0.1 for t in sent) for start in sent)
+        assert len(sent) > 2 * limit, len(sent)
+        assert busiest <= limit, (busiest, limit)
+        assert service.scheduler.get_stats()["requests"] == len(sent)
+        print(f"[SUCCESS] {len(sent)} requests from two jobs, at most {busiest} per {window:.0f}s window")
+
+
+if __name__ == "__main__":
+    test_fair_share()
+    test_service()
+    test_shared_rate_limit()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for the similarity index
+Tests blocked top-k search against brute force, cross-domain filtering,
+incremental adds and similar domain-mixing partners
+"""
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.augmentation import AugmentedConversation
+from src.models.conversation import Conversation, ConversationTurn
+from src.phase2.augmentation_module import AugmentationModule
+from src.utils.example_selector import hashed_ngram_vectors
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+from src.utils.similarity_index import SimilarityIndex
+
+WORDS = "book table flight weather pay bill transfer money reserve hotel car rent song play alarm timer".split()
+
+
+class UnusedBackend(LLMBackend):
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        raise AssertionError("No LLM call expected")
+
+
+def _conversation(text: str, domain: str) -> Conversation:
+    return Conversation(
+        turns=[ConversationTurn(role="user", content=text)],
+        domain=domain,
+        action="test",
+        description="test",
+    )
+
+
+def test_similarity_index():
+    """Test exact blocked search and hard-negative partner selection."""
+    print("=" * 50)
+    print("Testing Similarity Index")
+    print("=" * 50)
+
+    print("1. Testing blocked search against brute force...")
+    rng = np.random.default_rng(0)
+    texts = [" ".join(rng.choice(WORDS, 8)) for _ in range(1000)]
+    domains = [f"domain{i % 7}" for i in range(1000)]
+    index = SimilarityIndex(block_size=128, query_chunk_size=32)
+    # Uneven adds cross block boundaries
+    assert list(index.add(texts[:300], domains[:300])) == list(range(300))
+    assert list(index.add(texts[300:], domains[300:])) == list(range(300, 1000))
+    assert len(index) == 1000
+
+    ids, scores = index.query(texts[:50], domains[:50], 5)
+    stored = hashed_ngram_vectors(texts, bits=index.bits).astype(np.float16).astype(np.float32)
+    expected = hashed_ngram_vectors(texts[:50], bits=index.bits) @ stored.T
+    same_domain = np.array([d[-1] for d in domains[:50]])[:, None] == np.array([d[-1] for d in domains])
+    expected[same_domain] = -np.inf
+    assert np.allclose(np.sort(expected, axis=1)[:, ::-1][:, :5], scores)
+    assert all(domains[j] != domains[i] for i, row in enumerate(ids.tolist()) for j in row)
+    assert (np.diff(scores, axis=1) <= 0).all()
+    print("[SUCCESS] Top-k matches brute force and never returns the query's domain")
+
+    print("\n2. Testing missing neighbours...")
+    index = SimilarityIndex()
+    index.add(["book a table", "book a flight"], ["dining", "travel"])
+    ids, _ = index.query(["book a table for two"], ["dining"], 3)
+    assert ids.tolist() == [[1, -1, -1]]
+    ids, _ = index.query(["book a table for two"], ["music"], 1)
+    assert ids.tolist() == [[0]]
+    print("[SUCCESS] Missing neighbours are -1; unknown domains match every text")
+
+    print("\n3. Testing similar domain-mixing partners...")
+    conversations = [
+        _conversation("can you book a table for two at an italian restaurant tonight", "dining"),
+        _conversation("please book a hotel room for two tonight", "travel"),
+        _conversation("play my workout playlist on shuffle", "music"),
+        _conversation("what's the weather tomorrow in boston", "weather"),
+    ]
+    augmentation = AugmentationModule(
+        api_key="unused",
+        model_name="test-model",
+        paraphrase_probability=0.0,
+        noise_probability=0.0,
+        irrelevant_probability=0.0,
+        domain_mix_probability=1.0,
+        domain_mix_partners="similar",
+        domain_mix_candidates=1,
+        llm_client=LLMClient(api_key="unused", backend=UnusedBackend()),
+    )
+    pairs = {}
+
+    def record_pair(conversation, other):
+        pairs[conversation.domain] = other.domain
+        return AugmentedConversation(conversation=other, augmentation_type="domain_mix", label_score=0.1)
+
+    augmentation.create_domain_mixed_conversation = record_pair
+    augmented = augmentation.augment_conversations_with_mixing(conversations)
+    assert sum(a.augmentation_type == "domain_mix" for a in augmented) == 4
+    assert pairs["dining"] == "travel" and pairs["travel"] == "dining", pairs
+    print(f"[SUCCESS] Partners: {pairs}")
+
+    print("\n4. Testing the incremental partner index...")
+    indexed = len(augmentation.similarity_index)
+    later = [
+        _conversation("book a table for two at a restaurant tonight please", "travel"),
+        _conversation("play some jazz", "music"),
+    ]
+    pairs.clear()
+    augmentation.augment_conversations_with_mixing(later + conversations[2:])
+    assert len(augmentation.similarity_index) == indexed + 2
+    # The earlier dining conversation is found although it isn't in this batch
+    assert pairs["travel"] == "dining", pairs
+    print(f"[SUCCESS] Index grew from {indexed} to {len(augmentation.similarity_index)} conversations")
+
+    print("\n5. Testing partners from earlier batches...")
+    augmentation.similarity_index = None
+    topics = [
+        "reserve a hotel room in paris near the louvre",
+        "transfer fifty dollars from checking to savings",
+        "set an alarm for six thirty tomorrow morning",
+        "what is the forecast for snow in denver",
+        "order a large pepperoni pizza for delivery",
+        "rent a compact car at the airport on friday",
+    ]
+    earlier = []
+    for number, pair in enumerate(zip(topics[::2], topics[1::2])):
+        batch = [_conversation(text, f"batch{number}") for text in pair]
+        for conversation in batch:
+            conversation.action = f"action{len(earlier)}"
+            earlier.append(conversation)
+        augmentation.index_conversations(batch)
+        # Re-indexing a batch adds nothing
+        augmentation.index_conversations(batch)
+    assert len(augmentation.similarity_index) == len(augmentation._partners) == len(earlier)
+    assert len(augmentation._partner_digests) == len(earlier)
+
+    partners = {}
+
+    def record_partner(conversation, other):
+        partners[conversation.turns[0].content] = other
+        return AugmentedConversation(conversation=other, augmentation_type="domain_mix", label_score=0.1)
+
+    augmentation.create_domain_mixed_conversation = record_partner
+    queries = [_conversation(text + " please", f"query{i % 2}") for i, text in enumerate(topics)]
+    augmentation.augment_conversations_with_mixing(queries)
+    for query, conversation in zip(queries, earlier):
+        assert partners[query.turns[0].content] == conversation
+    print(f"[SUCCESS] {len(queries)} partners returned intact from {len(topics) // 2} earlier batches")
+
+
+if __name__ == "__main__":
+    test_similarity_index()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for speculative augmentation
+Tests overlapping augmentation with scoring, cancelling it on rejection,
+the adaptive pause below the break-even acceptance rate and the reported
+wasted-call rate
+"""
+
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.alignment import AlignmentScore
+from src.models.conversation import Conversation, ConversationTurn
+from src.phase2.augmentation_module import AugmentationModule
+from src.utils.llm_backends import LLMBackend
+from src.utils.llm_client import LLMClient
+from src.utils.metrics import MetricsRecorder
+from src.utils.speculation import SpeculativeAugmenter, format_speculation
+
+
+class CountingBackend(LLMBackend):
+    """Backend that counts calls and answers with unparseable content."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        with self._lock:
+            self.calls += 1
+        message = SimpleNamespace(content="not json")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=None,
+        )
+
+
+def _evaluate(aligned: bool, delay: float = 0.0):
+    def evaluate():
+        time.sleep(delay)
+        return AlignmentScore(score=1.0 if aligned else 0.0, reasoning="test", is_aligned=aligned)
+
+    return evaluate
+
+
+def _augment(branches: int, delay: float, started: list):
+    """Augmentation of `branches` calls of `delay` seconds each, gated by proceed."""
+
+    def augment(proceed):
+        variants = ["original"]
+        for branch in range(branches):
+            if not proceed():
+                break
+            started.append(branch)
+            time.sleep(delay)
+            variants.append(f"variant {branch}")
+        return variants
+
+    return augment
+
+
+def test_speculation():
+    """Test speculative augmentation overlapped with alignment scoring."""
+    print("=" * 50)
+    print("Testing Speculative Augmentation")
+    print("=" * 50)
+
+    print("1. Testing overlap with scoring...")
+    metrics = MetricsRecorder()
+    speculation = SpeculativeAugmenter(metrics=metrics)
+    started = []
+    start = time.perf_counter()
+    score, variants = speculation.run(_evaluate(True, 0.2), _augment(1, 0.2, started))
+    elapsed = time.perf_counter() - start
+    assert score.is_aligned and variants == ["original", "variant 0"]
+    assert elapsed < 0.35, elapsed
+    print(f"[SUCCESS] 0.2s scoring and 0.2s augmentation took {elapsed:.2f}s")
+
+    print("\n2. Testing cancellation of rejected items...")
+    started = []
+    score, variants = speculation.run(_evaluate(False, 0.05), _augment(3, 0.1, started))
+    assert not score.is_aligned and variants == []
+    speculation.close()
+    assert started == [0], started
+    summary = speculation.summary()
+    assert summary["items"] == {"accepted": 1, "rejected": 1, "serial": 0}
+    assert summary["calls"] == 2 and summary["wasted_calls"] == 1
+    assert summary["wasted_call_rate"] == 0.5
+    assert metrics.report()["speculation"] == {
+        "items": {"accepted": 1, "rejected": 1},
+        "calls": 2,
+        "wasted_calls": 1,
+        "wasted_call_rate": 0.5,
+    }
+    assert "speculative_calls_total" in metrics.prometheus_text()
+    print(format_speculation(summary))
+    print("[SUCCESS] Remaining branches are skipped and the started call counts as wasted")
+
+    print("\n3. Testing the adaptive pause and resume...")
+    speculation = SpeculativeAugmenter(break_even=0.5, min_observations=4, window=4)
+    started = []
+    for _ in range(4):
+        speculation.run(_evaluate(False), _augment(1, 0.0, started))
+    assert not speculation.speculating()
+    speculation.close()
+    wasted = len(started)
+    assert speculation.summary()["wasted_calls"] == wasted
+    score, variants = speculation.run(_evaluate(False), _augment(1, 0.0, started))
+    assert variants == [] and len(started) == wasted
+    score, variants = speculation.run(_evaluate(True), _augment(1, 0.0, started))
+    assert variants == ["original", "variant 0"]
+    for _ in range(2):
+        speculation.run(_evaluate(True), _augment(1, 0.0, started))
+    assert speculation.speculating()
+    assert speculation.summary()["items"]["serial"] == 3
+    speculation.close()
+    print("[SUCCESS] Rejected items aren't augmented while acceptance is below break-even")
+
+    print("\n4. Testing disabled speculation...")
+    speculation = SpeculativeAugmenter(enabled=False)
+    started = []
+    assert speculation.run(_evaluate(False), _augment(2, 0.0, started))[1] == []
+    assert speculation.run(_evaluate(True), _augment(2, 0.0, started))[1] == [
+        "original", "variant 0", "variant 1"
+    ]
+    assert speculation.summary()["calls"] == 0 and started == [0, 1]
+    print("[SUCCESS] Scores first and augments only aligned items")
+
+    print("\n5. Testing the augmentation module's proceed check...")
+    backend = CountingBackend()
+    augmentation = AugmentationModule(
+        api_key="offline",
+        model_name="test-model",
+        paraphrase_probability=1.0,
+        noise_probability=1.0,
+        irrelevant_probability=1.0,
+        llm_client=LLMClient(api_key="offline", backend=backend),
+    )
+    conversation = Conversation(
+        turns=[
+            ConversationTurn(role="user", content="I need to book a flight"),
+            ConversationTurn(role="assistant", content="Where would you like to go?"),
+        ],
+        domain="travel",
+        action="book_flight",
+        description="Book flights",
+    )
+    allowed = [True, False]
+    variants = augmentation.create_conversation_variants(
+        conversation, proceed=lambda: allowed.pop(0) if allowed else False
+    )
+    assert [v.augmentation_type for v in variants] == ["original"]
+    assert backend.calls == 1, backend.calls
+    augmentation.create_typed_variants(conversation, ["original", "noise"], proceed=lambda: False)
+    assert backend.calls == 1
+    print("[SUCCESS] No LLM calls are made once proceed returns False")
+
+
+if __name__ == "__main__":
+    test_speculation()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for spend budgets
+Tests hard caps, per-stage limits and low-priority wind-down
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.spend_budget import BudgetExceeded, SpendBudget
+
+
+def spend(budget: SpendBudget, stage: str, tokens: int = 100):
+    reservation = budget.reserve(stage, "", tokens)
+    budget.settle(reservation, prompt_tokens=0, completion_tokens=tokens)
+
+
+def test_spend_budget():
+    """Test request, token and cost limits."""
+    print("=" * 50)
+    print("Testing Spend Budget")
+    print("=" * 50)
+
+    print("1. Testing run request cap...")
+    budget = SpendBudget(max_requests=3)
+    for _ in range(3):
+        spend(budget, "conversation")
+    try:
+        spend(budget, "conversation")
+        raise AssertionError("Request over the cap was allowed")
+    except BudgetExceeded as e:
+        print(f"[SUCCESS] {e}")
+    assert budget.get_stats()["total"]["requests"] == 3
+    assert budget.refusals == 1
+
+    print("\n2. Testing wind-down order...")
+    budget = SpendBudget(max_tokens=1000, wind_down_at=0.8)
+    for _ in range(8):
+        spend(budget, "conversation")
+    assert not budget.can_spend("domain_mix")
+    assert budget.can_spend("paraphrase")
+    spend(budget, "conversation")
+    assert not budget.can_spend("paraphrase")
+    assert budget.can_spend("conversation")
+    print("[SUCCESS] Domain mixing stops first, then augmentation, then generation")
+
+    print("\n3. Testing reservations...")
+    budget = SpendBudget(max_tokens=1000)
+    reservation = budget.reserve("evaluation", "", 900)
+    try:
+        budget.reserve("evaluation", "", 200)
+        raise AssertionError("Reservation over the cap was allowed")
+    except BudgetExceeded:
+        pass
+    budget.settle(reservation, prompt_tokens=50, completion_tokens=50)
+    budget.reserve("evaluation", "", 200)
+    print("[SUCCESS] In-flight worst cases count until settled")
+
+    print("\n4. Testing stage and cost limits...")
+    budget = SpendBudget(
+        stage_limits={"noise": {"requests": 1}},
+        max_cost=0.001,
+        output_price_per_million_tokens=1.0,
+    )
+    spend(budget, "noise")
+    assert not budget.can_spend("noise")
+    assert budget.can_spend("conversation")
+    spend(budget, "conversation", 800)
+    try:
+        spend(budget, "conversation", 200)
+        raise AssertionError("Cost over the cap was allowed")
+    except BudgetExceeded:
+        pass
+    print(f"[SUCCESS] {budget.get_stats()['refused']}")
+
+
+if __name__ == "__main__":
+    test_spend_budget()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for adaptive token budgets and transcript compaction
+Runs offline, no API key required
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.token_budget import TokenBudget
+from src.utils.conversation_formatter import format_conversation_compact
+from src.models.conversation import Conversation, ConversationTurn
+
+
+def test_token_budget():
+    """Test per-call max_tokens derivation."""
+    print("=" * 50)
+    print("Testing Token Budget")
+    print("=" * 50)
+
+    budget = TokenBudget(tokens_per_turn=90, safety_margin=1.5, overhead_tokens=32)
+
+    print("1. Testing prior-based budget...")
+    max_tokens = budget.max_tokens_for("conversation", 4, 1000)
+    assert max_tokens == 4 * 90 * 1.5 + 32, max_tokens
+    print(f"[SUCCESS] 4 turns -> max_tokens={max_tokens}")
+
+    print("\n2. Testing ceiling...")
+    assert budget.max_tokens_for("conversation", 20, 1000) == 1000
+    print("[SUCCESS] Budget capped at configured max_tokens")
+
+    print("\n3. Testing observed distribution...")
+    for _ in range(10):
+        budget.observe("conversation", 200, 5)
+    max_tokens = budget.max_tokens_for("conversation", 4, 1000)
+    assert max_tokens == 4 * 40 * 1.5 + 32, max_tokens
+    print(f"[SUCCESS] 4 turns after observations -> max_tokens={max_tokens}")
+
+    print("\n4. Testing disabled budget...")
+    disabled = TokenBudget(enabled=False)
+    assert disabled.max_tokens_for("conversation", 4, 1000) == 1000
+    print("[SUCCESS] Disabled budget returns configured max_tokens")
+    print(f"   Stats: {budget.get_stats()}")
+
+
+def test_format_conversation_compact():
+    """Test transcript windowing for LLM-3."""
+    print("\n" + "=" * 50)
+    print("Testing Conversation Compaction")
+    print("=" * 50)
+
+    conversation = Conversation(
+        turns=[
+            ConversationTurn(
+                role="user" if i % 2 == 0 else "assistant", content=f"turn {i} " * 50
+            )
+            for i in range(12)
+        ],
+        domain="travel",
+        action="book_flight",
+        description="Assist users in booking flights.",
+    )
+
+    text = format_conversation_compact(conversation, max_turns=4, max_turn_chars=40)
+    lines = text.split("\n")
+    assert len(lines) == 5, lines
+    assert lines[2] == "... [8 turns omitted] ..."
+    assert lines[0].startswith("user: turn 0") and lines[-1].startswith(
+        "assistant: turn 11"
+    )
+    assert all(len(line) < 70 for line in lines)
+    print("[SUCCESS] Compacted transcript:")
+    for line in lines:
+        print(f"   {line}")
+
+
+if __name__ == "__main__":
+    test_token_budget()
+    test_format_conversation_compact()
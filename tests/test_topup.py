@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test script for top-up planning
+Tests the requested distribution and per-intent deficits of an existing dataset
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils.topup import (
+    allocate,
+    compute_deficits,
+    count_existing,
+    requested_distribution,
+)
+
+
+def test_topup_planning():
+    """Test deficit computation against the requested distribution."""
+    print("=" * 50)
+    print("Testing Top-up Planning")
+    print("=" * 50)
+
+    print("1. Testing allocation...")
+    counts = allocate(10, {"a": 1.0, "b": 1.0, "c": 1.0})
+    assert sum(counts.values()) == 10
+    assert sorted(counts.values()) == [3, 3, 4]
+    print(f"[SUCCESS] Allocated {counts}")
+
+    print("\n2. Testing requested distribution...")
+    config = Config(target_dataset_size=60, use_domain_mixing=False)
+    per_intent, type_totals = requested_distribution(config, ["a", "b"])
+    assert sum(type_totals.values()) == 60
+    assert "domain_mix" not in type_totals
+    assert per_intent["a"]["original"] + per_intent["b"]["original"] == type_totals["original"]
+    print(f"[SUCCESS] Requested {type_totals}")
+
+    print("\n3. Testing deficits...")
+    records = [
+        {"domain": "travel", "action": "book", "augmentation_type": "original"}
+    ] * per_intent["a"]["original"] + [
+        {"domain": "irrelevant", "action": "irrelevant_chat", "augmentation_type": "irrelevant"}
+    ] * 2
+    existing = count_existing(records, {("travel", "book"): "a"})
+    assert existing[2] == len(records)
+    intent_deficits, global_deficits = compute_deficits(
+        (per_intent, type_totals), existing
+    )
+    assert intent_deficits["a"]["original"] == 0
+    assert intent_deficits["b"]["original"] == per_intent["b"]["original"]
+    assert global_deficits["irrelevant"] == type_totals["irrelevant"] - 2
+    print(f"[SUCCESS] Deficits {intent_deficits} {global_deficits}")
+
+    print("\n4. Testing unattributed samples...")
+    unknown = [{"domain": "x", "action": "y", "augmentation_type": "original"}] * 30
+    intent_deficits, _ = compute_deficits(
+        (per_intent, type_totals), count_existing(unknown, {})
+    )
+    total_original = sum(d["original"] for d in intent_deficits.values())
+    assert total_original == max(0, type_totals["original"] - 30)
+    print("[SUCCESS] Unattributed samples cap per-intent deficits")
+
+
+if __name__ == "__main__":
+    test_topup_planning()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for trace export
+Tests spans, item links across threads, the disabled no-op path and the
+Chrome trace-event output
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.conversation import Conversation, ConversationTurn
+from src.utils.tracing import NULL_SPAN, Tracer
+
+
+def _conversation(text: str) -> Conversation:
+    return Conversation(
+        turns=[ConversationTurn(role="user", content=text)],
+        domain="banking",
+        action="transfer",
+        description="Transfers money",
+    )
+
+
+def test_tracing():
+    """Test span recording and export."""
+    print("=" * 50)
+    print("Testing Trace Export")
+    print("=" * 50)
+
+    print("1. Testing disabled tracer...")
+    tracer = Tracer()
+    with tracer.span("conversation") as span:
+        span.link(("conversation", _conversation("hi")))
+    tracer.complete("request", "http", 0.0, 1.0)
+    assert tracer.span("conversation") is NULL_SPAN
+    assert tracer.events() == []
+    print("[SUCCESS] Disabled tracer returns a no-op span and records nothing")
+
+    print("\n2. Testing spans and item links across threads...")
+    tracer = Tracer(enabled=True)
+    conversation = _conversation("I need to send money")
+    with tracer.span("scores", "stage"):
+        with tracer.span("evaluation") as span:
+            time.sleep(0.005)
+            span.link(("score", conversation))
+            span.set(score=0.95)
+
+    def augment():
+        with tracer.span("paraphrase") as span:
+            span.link(("sample", _conversation("send money please")), parent=("score", conversation))
+
+    worker = threading.Thread(target=augment, name="augment-worker")
+    worker.start()
+    worker.join()
+
+    events = tracer.events()
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    stage, evaluation, paraphrase = spans["scores"], spans["evaluation"], spans["paraphrase"]
+    assert evaluation["dur"] >= 5000
+    assert stage["ts"] <= evaluation["ts"] and evaluation["dur"] <= stage["dur"]
+    assert evaluation["args"]["score"] == 0.95
+    assert paraphrase["tid"] != evaluation["tid"]
+    assert paraphrase["args"]["parent"] == evaluation["args"]["items"][0]
+
+    start = next(e for e in events if e["ph"] == "s")
+    finish = next(e for e in events if e["ph"] == "f")
+    assert start["id"] == finish["id"]
+    assert start["tid"] == evaluation["tid"] and finish["tid"] == paraphrase["tid"]
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert "augment-worker" in names
+    print("[SUCCESS] Flow arrow links the score to the augmented sample on another thread")
+
+    print("\n3. Testing errors and caller-timed regions...")
+    try:
+        with tracer.span("policy"):
+            raise ValueError("bad JSON")
+    except ValueError:
+        pass
+    now = time.perf_counter()
+    tracer.complete("queued", "queue", now - 0.01, now, stage="noise")
+    spans = {e["name"]: e for e in tracer.events() if e["ph"] == "X"}
+    assert spans["policy"]["args"]["error"] == "ValueError"
+    assert 9000 <= spans["queued"]["dur"] <= 11000
+    print("[SUCCESS] Failed spans carry the error type")
+
+    print("\n4. Testing Chrome trace-event export...")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        trace_file = os.path.join(temp_dir, "trace.json")
+        tracer.write(trace_file)
+        with open(trace_file) as f:
+            trace = json.load(f)
+    assert len(trace["traceEvents"]) == len(tracer.events())
+    assert all({"ph", "pid", "tid"} <= set(e) for e in trace["traceEvents"])
+    print(f"[SUCCESS] Wrote {len(trace['traceEvents'])} trace events")
+
+
+if __name__ == "__main__":
+    test_tracing()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the lease-based work queue
+Tests leasing, heartbeats, lease expiry and concurrent workers
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.work_queue import WorkQueue
+
+
+def test_work_queue():
+    """Test the SQLite work queue."""
+    print("=" * 50)
+    print("Testing Work Queue")
+    print("=" * 50)
+
+    queue_dir = tempfile.mkdtemp()
+    queue_file = os.path.join(queue_dir, "queue.db")
+
+    try:
+        queue = WorkQueue(queue_file, lease_seconds=0.2, max_attempts=2)
+
+        print("1. Testing idempotent enqueue...")
+        assert queue.enqueue("intent", {"intent_name": "book_flight"}, "intent:book_flight")
+        assert not queue.enqueue("intent", {"intent_name": "book_flight"}, "intent:book_flight")
+        queue.enqueue("conversation", {"index": 0}, "conversation:0", priority=1)
+        print("[SUCCESS] Duplicate task ignored")
+
+        print("\n2. Testing priority and lease ownership...")
+        task = queue.lease("worker-a")[0]
+        assert task.kind == "conversation"
+        assert not queue.complete(task.id, "worker-b", {})
+        assert queue.heartbeat(task.id, "worker-a")
+        assert queue.complete(task.id, "worker-a", {"ok": True})
+        print("[SUCCESS] Only the lease owner can complete a task")
+
+        print("\n3. Testing lease expiry...")
+        task = queue.lease("worker-a")[0]
+        time.sleep(0.3)
+        retried = queue.lease("worker-b")[0]
+        assert retried.id == task.id and retried.attempts == 2
+        assert not queue.complete(task.id, "worker-a", {})
+        time.sleep(0.3)
+        assert queue.lease("worker-c") == []
+        assert queue.counts()["intent"] == {"failed": 1}
+        print("[SUCCESS] Expired lease re-queued, then failed after max attempts")
+
+        print("\n4. Testing concurrent workers...")
+        queue.enqueue_many(("work", {"n": n}, f"work:{n}", 0) for n in range(200))
+        completed = []
+
+        def work(worker_id):
+            worker_queue = WorkQueue(queue_file, lease_seconds=30)
+            while True:
+                tasks = worker_queue.lease(worker_id, kinds=["work"])
+                if not tasks:
+                    break
+                assert worker_queue.complete(tasks[0].id, worker_id, tasks[0].payload)
+                completed.append(tasks[0].id)
+            worker_queue.close()
+
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(completed) == len(set(completed)) == 200
+        assert sum(1 for _ in queue.results("work")) == 200
+        print(f"[SUCCESS] {len(completed)} tasks completed exactly once by 4 workers")
+        queue.close()
+    finally:
+        shutil.rmtree(queue_dir)
+
+
+if __name__ == "__main__":
+    test_work_queue()